@@ -0,0 +1,656 @@
+import os
+import stat
+import socket
+import struct
+import logging
+import threading
+import subprocess
+
+from functools import partial
+from pathlib import Path
+
+import pah_utils as pahu
+
+# === Native ADB host protocol client ===
+# Talks directly to the local adb server (port 5037) instead of spawning
+# an 'adb' client process for every device operation.
+
+ADB_HOST = "127.0.0.1"
+ADB_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+
+SYNC_CHUNK = 64 * 1024
+
+# shell protocol v2 packet ids
+SHELL_STDOUT = 1
+SHELL_STDERR = 2
+SHELL_EXIT = 3
+
+
+class AdbError(pahu.PAHError):
+    """Raised when the adb server or the device refuses a request."""
+    pass
+
+
+class ShellResult:
+    """Result of a device command (same fields as subprocess.CompletedProcess)."""
+
+    def __init__(self, returncode: int, stdout: str = "", stderr: str = ""):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+    def __repr__(self):
+        return f"ShellResult(returncode={self.returncode}, stdout={self.stdout!r}, stderr={self.stderr!r})"
+
+
+class DeviceProps:
+    """Device properties used by the install pre-flight checks (0 / empty : unknown)."""
+
+    def __init__(self, sdk: int = 0, abis: list[str] = (), density: int = 0, free_data: int = 0,
+                 locales: list[str] = ()):
+        self.sdk = sdk
+        self.abis = list(abis)  # preference order
+        self.density = density
+        self.free_data = free_data  # bytes available on /data
+        self.locales = list(locales)  # "fr-FR", "en-US"...
+
+    @property
+    def languages(self) -> set[str]:
+        return {locale.split("-")[0].lower() for locale in self.locales}
+
+    def __repr__(self):
+        return (f"DeviceProps(sdk={self.sdk}, abis={self.abis!r}, density={self.density}, "
+                f"free_data={self.free_data}, locales={self.locales!r})")
+
+
+def _to_int(value: str) -> int:
+    value = value.strip()
+    return int(value) if value.isdigit() else 0
+
+
+def parse_device_props(output: str) -> DeviceProps:
+    """Parse the output of PROPS_COMMAND."""
+    lines = output.splitlines() + [""] * 8
+    sdk, abilist, abi, density, locale, product_locale, system_locales = (line.strip() for line in lines[:7])
+    free_data = 0
+    # df -k /data : "Filesystem 1K-blocks Used Available Use% Mounted on" + one line
+    df_lines = [line.split() for line in lines[7:] if line.strip()]
+    if len(df_lines) >= 2 and len(df_lines[-1]) >= 4:
+        free_data = _to_int(df_lines[-1][3]) * 1024
+    return DeviceProps(
+        sdk=_to_int(sdk),
+        abis=[a for a in (abilist or abi).split(",") if a],
+        density=_to_int(density),
+        free_data=free_data,
+        # 'settings' prints "null" when the user never changed the language list
+        locales=list(dict.fromkeys(
+            l for l in [locale, product_locale, *system_locales.split(",")] if l and l != "null")),
+    )
+
+
+PROPS_COMMAND = ("getprop ro.build.version.sdk; getprop ro.product.cpu.abilist; getprop ro.product.cpu.abi; "
+                 "getprop ro.sf.lcd_density; getprop persist.sys.locale; getprop ro.product.locale; "
+                 "settings get system system_locales; df -k /data")
+
+
+def _join_command(cmd) -> str:
+    """Like 'adb shell a b c' : arguments are joined, not escaped (as ssh does)."""
+    if isinstance(cmd, (list, tuple)):
+        return " ".join(str(part) for part in cmd)
+    return str(cmd)
+
+
+class AdbConnection:
+    """One socket to the adb server, speaking the smart-socket framing."""
+
+    def __init__(self, host: str = ADB_HOST, port: int = ADB_PORT, timeout: float = None):
+        self.sock = socket.create_connection((host, port), timeout=10)
+        self.sock.settimeout(timeout)
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send(self, data: bytes) -> None:
+        self.sock.sendall(data)
+
+    def read_exact(self, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = self.sock.recv(min(size, SYNC_CHUNK))
+            if not chunk:
+                raise AdbError("Connection closed by adb server")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def read_all(self) -> bytes:
+        chunks = []
+        while True:
+            chunk = self.sock.recv(SYNC_CHUNK)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def read_hex_block(self) -> bytes:
+        length = int(self.read_exact(4), 16)
+        return self.read_exact(length)
+
+    def request(self, service: str) -> None:
+        """Send a host request ('<4 hex length><service>') and check OKAY/FAIL."""
+        payload = service.encode("utf-8")
+        self.send(b"%04x" % len(payload) + payload)
+        status = self.read_exact(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbError(self.read_hex_block().decode("utf-8", errors="replace"))
+        raise AdbError(f"Unexpected adb server answer {status!r} to {service}")
+
+
+class SyncConnection:
+    """'sync:' service : STAT / RECV / SEND on a reusable connection."""
+
+    def __init__(self, conn: AdbConnection):
+        self.conn = conn
+
+    def _send_request(self, cmd: bytes, arg: bytes) -> None:
+        self.conn.send(cmd + struct.pack("<I", len(arg)) + arg)
+
+    def _read_fail(self, length: int) -> None:
+        message = self.conn.read_exact(length).decode("utf-8", errors="replace")
+        raise AdbError(message)
+
+    def stat(self, remote: str) -> tuple[int, int, int]:
+        """Returns (mode, size, mtime) ; mode == 0 when the path does not exist."""
+        self._send_request(b"STAT", remote.encode("utf-8"))
+        header = self.conn.read_exact(16)
+        if header[:4] != b"STAT":
+            raise AdbError(f"Unexpected sync answer {header[:4]!r}")
+        return struct.unpack("<III", header[4:])
+
+    def recv(self, remote: str, out_file) -> int:
+        """Stream a remote file into out_file. Returns the byte count."""
+        self._send_request(b"RECV", remote.encode("utf-8"))
+        total = 0
+        while True:
+            header = self.conn.read_exact(8)
+            cmd, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if cmd == b"DATA":
+                out_file.write(self.conn.read_exact(length))
+                total += length
+            elif cmd == b"DONE":
+                return total
+            elif cmd == b"FAIL":
+                self._read_fail(length)
+            else:
+                raise AdbError(f"Unexpected sync answer {cmd!r}")
+
+    def send(self, in_file, remote: str, mode: int = 0o644, mtime: int = 0) -> int:
+        """Stream in_file to a remote path. Returns the byte count."""
+        self._send_request(b"SEND", f"{remote},{mode}".encode("utf-8"))
+        total = 0
+        while True:
+            chunk = in_file.read(SYNC_CHUNK)
+            if not chunk:
+                break
+            self.conn.send(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+            total += len(chunk)
+        self.conn.send(b"DONE" + struct.pack("<I", mtime))
+        header = self.conn.read_exact(8)
+        cmd, length = header[:4], struct.unpack("<I", header[4:])[0]
+        if cmd == b"FAIL":
+            self._read_fail(length)
+        if cmd != b"OKAY":
+            raise AdbError(f"Unexpected sync answer {cmd!r}")
+        return total
+
+    def quit(self) -> None:
+        try:
+            self._send_request(b"QUIT", b"")
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class ShellSession:
+    """Long-lived 'exec:sh' : commands are written one at a time on stdin and the
+    output of each one ends with an echoed marker line, so the results of a whole
+    batch come back over a single connection."""
+
+    MARKER = "__PAH_DONE__"
+
+    def __init__(self, conn: AdbConnection):
+        self.conn = conn
+        self._buffer = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, command: str) -> str:
+        """Run one command (stderr merged) and return its output."""
+        self.conn.send(f"{command} 2>&1; echo {self.MARKER}\n".encode("utf-8"))
+        lines = []
+        while True:
+            line = self._readline()
+            if line == self.MARKER:
+                return "\n".join(lines)
+            lines.append(line)
+
+    def _readline(self) -> str:
+        while b"\n" not in self._buffer:
+            chunk = self.conn.sock.recv(SYNC_CHUNK)
+            if not chunk:
+                raise AdbError("Shell session closed by the device")
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line.decode("utf-8", errors="replace").rstrip("\r")
+
+    def close(self) -> None:
+        try:
+            self.conn.send(b"exit\n")
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class AdbClient:
+    """In-process adb client bound to one device (serial=None : the only device)."""
+
+    def __init__(self, serial: str = None, host: str = ADB_HOST, port: int = ADB_PORT):
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self._features = None
+        self._props = None
+        self._sync_pool: list[SyncConnection] = []
+        self._lock = threading.Lock()
+
+    # --- connections ---
+
+    def _connect(self, timeout: float = None) -> AdbConnection:
+        try:
+            return AdbConnection(self.host, self.port, timeout)
+        except ConnectionRefusedError:
+            # Same behaviour as the adb client : start the server on demand
+            logging.info("adb server not running, starting it")
+            subprocess.run(["adb", "start-server"], capture_output=True)
+            return AdbConnection(self.host, self.port, timeout)
+
+    def _host_service(self, command: str) -> str:
+        prefix = f"host-serial:{self.serial}:" if self.serial else "host:"
+        return prefix + command
+
+    def _transport(self, timeout: float = None) -> AdbConnection:
+        conn = self._connect(timeout)
+        try:
+            conn.request(f"host:transport:{self.serial}" if self.serial else "host:transport-any")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def open_service(self, service: str, timeout: float = None) -> AdbConnection:
+        """Open a device service ('shell:', 'exec:', 'sync:'...) on a new connection."""
+        conn = self._transport(timeout)
+        try:
+            conn.request(service)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    # --- host queries ---
+
+    def devices(self) -> list[tuple[str, str]]:
+        """List (serial, state) of the devices known by the adb server."""
+        with self._connect(timeout=10) as conn:
+            conn.request("host:devices")
+            data = conn.read_hex_block().decode("utf-8", errors="replace")
+        devices = []
+        for line in data.splitlines():
+            parts = line.split("\t")
+            if len(parts) >= 2:
+                devices.append((parts[0], parts[1]))
+        return devices
+
+    def features(self) -> set[str]:
+        """Device features (shell_v2, cmd...). Cached only for a fixed serial,
+        'any device' may be another tablet on the next call."""
+        if self._features is not None:
+            return self._features
+        try:
+            with self._connect(timeout=10) as conn:
+                conn.request(self._host_service("features"))
+                data = conn.read_hex_block().decode("utf-8", errors="replace")
+        except AdbError as e:
+            logging.debug(f"adb features unavailable: {e}")
+            return set()
+        features = set(data.strip().split(","))
+        if self.serial:
+            self._features = features
+        return features
+
+    def device_props(self, refresh: bool = False) -> DeviceProps:
+        """SDK level, ABIs, density, locales and free space on /data, read with a single shell
+        command. Cached for a fixed serial until refresh=True or the device disconnects
+        (forget_disconnected) : free_data changes with every install."""
+        if self._props is not None and not refresh:
+            return self._props
+        props = parse_device_props(self.shell(PROPS_COMMAND, timeout=15).stdout)
+        if self.serial:
+            self._props = props
+        logging.debug(f"{self.serial or 'device'} : {props}")
+        return props
+
+    # --- shell / exec ---
+
+    def shell(self, cmd, timeout: float = None) -> ShellResult:
+        """Run a shell command. Exit status and stderr are only
+        available with the shell v2 protocol (Android 7+)."""
+        command = _join_command(cmd)
+        if "shell_v2" in self.features():
+            with self.open_service(f"shell,v2,raw:{command}", timeout) as conn:
+                return self._read_shell_v2(conn)
+        with self.open_service(f"shell:{command}", timeout) as conn:
+            out = conn.read_all()
+        return ShellResult(0, out.decode("utf-8", errors="replace"))
+
+    @staticmethod
+    def _read_shell_v2(conn: AdbConnection) -> ShellResult:
+        stdout, stderr = [], []
+        returncode = 0
+        while True:
+            try:
+                header = conn.read_exact(5)
+            except AdbError:
+                break
+            packet_id, length = header[0], struct.unpack("<I", header[1:])[0]
+            data = conn.read_exact(length)
+            if packet_id == SHELL_STDOUT:
+                stdout.append(data)
+            elif packet_id == SHELL_STDERR:
+                stderr.append(data)
+            elif packet_id == SHELL_EXIT:
+                returncode = data[0] if data else 0
+                break
+        return ShellResult(
+            returncode,
+            b"".join(stdout).decode("utf-8", errors="replace"),
+            b"".join(stderr).decode("utf-8", errors="replace"),
+        )
+
+    def exec_out(self, cmd, stdin=None, timeout: float = None) -> bytes:
+        """Raw binary 'exec:' service. stdin: optional file object streamed to the command."""
+        with self.open_service(f"exec:{_join_command(cmd)}", timeout) as conn:
+            if stdin is not None:
+                while True:
+                    chunk = stdin.read(SYNC_CHUNK)
+                    if not chunk:
+                        break
+                    conn.send(chunk)
+            return conn.read_all()
+
+    # --- sync (pooled) ---
+
+    def _acquire_sync(self) -> tuple[SyncConnection, bool]:
+        """Returns (connection, pooled)."""
+        with self._lock:
+            if self._sync_pool:
+                return self._sync_pool.pop(), True
+        return SyncConnection(self.open_service("sync:")), False
+
+    def _release_sync(self, sync: SyncConnection, healthy: bool) -> None:
+        if healthy:
+            with self._lock:
+                self._sync_pool.append(sync)
+        else:
+            sync.quit()
+
+    def _run_sync(self, sync: SyncConnection, func):
+        # adbd may end the sync session after a FAIL : only reuse after success
+        healthy = False
+        try:
+            result = func(sync)
+            healthy = True
+            return result
+        finally:
+            self._release_sync(sync, healthy)
+
+    def _with_sync(self, func, rewind=None, retry: bool = True):
+        """Run func(sync) on a pooled connection. A pooled connection may be dead
+        (device reconnected) : on failure, rewind() then one retry on a new connection."""
+        sync, pooled = self._acquire_sync()
+        try:
+            return self._run_sync(sync, func)
+        except (OSError, AdbError) as e:
+            if not pooled or not retry:
+                raise
+            logging.debug(f"Pooled sync connection failed ({e}), retrying on a new one")
+        if rewind is not None:
+            rewind()
+        return self._run_sync(SyncConnection(self.open_service("sync:")), func)
+
+    def stat(self, remote: str) -> tuple[int, int, int]:
+        return self._with_sync(lambda sync: sync.stat(remote))
+
+    def pull(self, remote: str, local: Path) -> int:
+        local = Path(local)
+        local.parent.mkdir(parents=True, exist_ok=True)
+        with open(local, "wb") as f:
+            return self._with_sync(lambda sync: sync.recv(remote, f),
+                                   rewind=lambda: (f.seek(0), f.truncate()))
+
+    def push(self, local: Path, remote: str) -> int:
+        """Push a file or a directory content (like 'adb push'). Returns the byte count."""
+        local = Path(local)
+        if local.is_dir():
+            total = 0
+            for path in sorted(local.rglob("*")):
+                if path.is_file():
+                    target = f"{remote.rstrip('/')}/{path.relative_to(local).as_posix()}"
+                    total += self._push_file(path, target)
+            return total
+
+        if remote.endswith("/"):
+            remote = remote + local.name
+        else:
+            mode, _, _ = self.stat(remote)
+            if stat.S_ISDIR(mode):
+                remote = f"{remote}/{local.name}"
+        return self._push_file(local, remote)
+
+    def _push_file(self, local: Path, remote: str) -> int:
+        st = local.stat()
+        with open(local, "rb") as f:
+            return self._with_sync(
+                lambda sync: sync.send(f, remote, stat.S_IMODE(st.st_mode) or 0o644, int(st.st_mtime)),
+                rewind=lambda: f.seek(0))
+
+    def push_stream(self, stream, remote: str, mode: int = 0o644) -> int:
+        """Push a readable binary stream (e.g. an .apks zip member) to a remote file path.
+        A non-seekable stream is not retried (already consumed)."""
+        seekable = stream.seekable()
+        start = stream.tell() if seekable else 0
+        return self._with_sync(lambda sync: sync.send(stream, remote, mode),
+                               rewind=lambda: stream.seek(start), retry=seekable)
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._sync_pool = self._sync_pool, []
+        for sync in pool:
+            sync.quit()
+
+    def reset(self) -> None:
+        """Forget the cached device state (device disconnected)."""
+        self._features = None
+        self._props = None
+        self.close()
+
+    # --- package manager ---
+
+    def _pm(self) -> str:
+        return "cmd package" if "cmd" in self.features() else "pm"
+
+    def install(self, apk: Path, args: list[str] = ()) -> ShellResult:
+        """Streamed install (like 'adb install'). returncode 0 only on 'Success'."""
+        apk = Path(apk)
+        size = apk.stat().st_size
+        with open(apk, "rb") as f:
+            out = self.exec_out(
+                [self._pm(), "install", *args, "-S", str(size)], stdin=f
+            ).decode("utf-8", errors="replace").strip()
+        return ShellResult(0 if "Success" in out else 1, out)
+
+    def install_multiple(self, apks: list[Path], args: list[str] = ()) -> ShellResult:
+        """Split install of local .apk files (like 'adb install-multiple')."""
+        apks = [Path(apk) for apk in apks]
+        return self.install_session(
+            [(apk.name, apk.stat().st_size, partial(open, apk, "rb")) for apk in apks], args)
+
+    def install_session(self, splits, args: list[str] = (), root: bool = False) -> ShellResult:
+        """Split install through a package manager session :
+        install-create, one install-write per split streamed over adb, install-commit.
+        splits: (name, size, open_stream) ; open_stream() returns a readable binary stream
+        (local file, .apks zip member...) usable as a context manager.
+        root: pm runs through 'su -c' (downgrade with -r -d)."""
+        pm = self._pm()
+        session, out = self._create_session(args, root)
+        if session is None:
+            return ShellResult(1, out)
+
+        for index, (name, size, open_stream) in enumerate(splits):
+            try:
+                with open_stream() as stream:
+                    out = self._pm_exec([pm, "install-write", "-S", str(size), session, f"{index}_{name}", "-"],
+                                        root, stdin=stream)
+            except Exception:
+                self._pm_exec([pm, "install-abandon", session], root)
+                raise
+            if "Success" not in out:
+                self._pm_exec([pm, "install-abandon", session], root)
+                return ShellResult(1, out.strip())
+
+        return self._commit_session(session, root)
+
+    def install_staged(self, remote_apks: list[str], args: list[str] = (), root: bool = False) -> ShellResult:
+        """Install .apk files already pushed to the device (base first) in one pm session :
+        install-write reads them by path, no transfer at this stage."""
+        session, out = self._create_session(args, root)
+        if session is None:
+            return ShellResult(1, out)
+
+        error = self._write_staged(session, remote_apks, root)
+        if error is not None:
+            self._pm_exec([self._pm(), "install-abandon", session], root)
+            return ShellResult(1, error)
+
+        return self._commit_session(session, root)
+
+    def install_staged_multi(self, packages: list[list[str]], args: list[str] = (), root: bool = False) -> ShellResult:
+        """Atomic install of several staged packages (like 'adb install-multi-package') :
+        one child session per package, attached to a --multi-package parent, a single commit.
+        Needs Android 10+ ; on any failure nothing is installed."""
+        pm = self._pm()
+        parent, out = self._create_session(["--multi-package", *args], root)
+        if parent is None:
+            return ShellResult(1, out)
+
+        children = []
+        error = None
+        for remote_apks in packages:
+            child, out = self._create_session(args, root)
+            if child is None:
+                error = out
+                break
+            children.append(child)
+            error = self._write_staged(child, remote_apks, root)
+            if error is not None:
+                break
+            out = self._pm_exec([pm, "install-add-session", parent, child], root)
+            if "Failure" in out or "Error" in out or "Exception" in out:
+                error = out.strip()
+                break
+
+        if error is not None:
+            for session in [*children, parent]:
+                self._pm_exec([pm, "install-abandon", session], root)
+            return ShellResult(1, error)
+        return self._commit_session(parent, root)
+
+    def _write_staged(self, session: str, remote_apks: list[str], root: bool) -> str:
+        """install-write of staged files into a session. Returns the pm output on failure, else None."""
+        pm = self._pm()
+        for remote in remote_apks:
+            out = self._pm_exec([pm, "install-write", session, remote.rsplit("/", 1)[-1], remote], root)
+            if "Success" not in out:
+                return out.strip()
+        return None
+
+    def _pm_exec(self, cmd, root: bool = False, stdin=None) -> str:
+        if root:
+            cmd = ["su", "-c", f"'{_join_command(cmd)}'"]
+        return self.exec_out(cmd, stdin=stdin).decode("utf-8", errors="replace")
+
+    def _create_session(self, args, root: bool) -> tuple[str, str]:
+        """Returns (session id, output) ; session id None on failure."""
+        out = self._pm_exec([self._pm(), "install-create", *args], root)
+        if "Success" not in out or "[" not in out:
+            return None, out.strip()
+        return out[out.index("[") + 1:out.index("]")], out.strip()
+
+    def _commit_session(self, session: str, root: bool) -> ShellResult:
+        out = self._pm_exec([self._pm(), "install-commit", session], root).strip()
+        return ShellResult(0 if "Success" in out else 1, out)
+
+    def uninstall(self, package_name: str) -> ShellResult:
+        out = self.exec_out([self._pm(), "uninstall", package_name]).decode("utf-8", errors="replace").strip()
+        return ShellResult(0 if "Success" in out else 1, out)
+
+    def shell_session(self) -> ShellSession:
+        return ShellSession(self.open_service("exec:sh"))
+
+    def uninstall_many(self, package_names, should_stop=None):
+        """Batched uninstall through one ShellSession. Yields (package_name, ShellResult)
+        as each 'pm uninstall' completes ; should_stop() is checked between commands."""
+        pm = self._pm()
+        with self.shell_session() as session:
+            for package_name in package_names:
+                if should_stop is not None and should_stop():
+                    return
+                out = session.run(f"{pm} uninstall {package_name}").strip()
+                yield package_name, ShellResult(0 if "Success" in out else 1, out)
+
+
+_clients: dict = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(serial: str = None) -> AdbClient:
+    """Shared client per serial (None : ANDROID_SERIAL or the only device)."""
+    serial = serial or os.environ.get("ANDROID_SERIAL") or None
+    with _clients_lock:
+        client = _clients.get(serial)
+        if client is None:
+            client = _clients[serial] = AdbClient(serial)
+        return client
+
+
+def forget_disconnected(connected) -> None:
+    """Reset the clients of the serials no longer connected : a device that comes
+    back gets fresh properties and new sync connections."""
+    with _clients_lock:
+        clients = [client for serial, client in _clients.items() if serial and serial not in connected]
+    for client in clients:
+        client.reset()
@@ -25,6 +25,11 @@ def set_progress_determinate(main_window):
 def reset_progress(main_window):
     main_window.progressBar.setRange(0, 100)
     main_window.progressBar.setValue(0)
+    main_window.progressBar.setToolTip("")
+
+def set_progress_tooltip(main_window, text: str):
+    """Détail (ex : progression par appareil) affiché au survol de la barre."""
+    main_window.progressBar.setToolTip(text)
 
 def update_scan_message(main_window, message: str):
     set_status(main_window, message)
@@ -1,22 +1,145 @@
 import logging
 import json
+import bisect
+import sys
 
 from pathlib import Path
-from dataclasses import dataclass, asdict
-from typing import Dict, Tuple, Optional
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Tuple, Optional
 
 import pah_utils as pahu
 
+# Backend de persistance du PackageMap : "sqlite" (incrémental) ou "json"
+STORAGE_BACKEND = "sqlite"
 
-@dataclass
+# Bits de PackageInfo.flags
+FLAG_ANDROID = 1
+FLAG_LOCAL = 2
+FLAG_CHECKED = 4
+
+
+@dataclass(slots=True, init=False, repr=False)
 class PackageInfo:
-    """Structure de données pour un package."""
+    """Structure de données pour un package (compacte : slots, flags en bitfield, hash brut).
+    android / local / checked / file_hash restent accessibles comme attributs."""
     label: str
-    android: bool
-    local: bool
-    checked: bool = False
-    file_hash: str = ""  # Hash rapide pour identification fallback
-    file_name: str = ""  # Nom de fichier local associé
+    flags: int
+    hash_bytes: bytes  # Hash rapide (16 octets bruts) pour identification fallback
+    file_name: str  # Nom de fichier local associé
+    min_sdk: int  # minSdkVersion du fichier local (0 : inconnu)
+    abis_str: str  # ABIs du code natif, séparées par des virgules ("" : aucun code natif / inconnu)
+
+    def __init__(self, label: str, android: bool, local: bool, checked: bool = False,
+                 file_hash: str = "", file_name: str = "", min_sdk: int = 0, abis: str = ""):
+        self.label = label
+        self.flags = ((FLAG_ANDROID if android else 0)
+                      | (FLAG_LOCAL if local else 0)
+                      | (FLAG_CHECKED if checked else 0))
+        self.hash_bytes = bytes.fromhex(file_hash) if file_hash else b""
+        self.file_name = file_name
+        self.min_sdk = min_sdk
+        self.abis = abis
+
+    def _set_flag(self, flag: int, value: bool) -> None:
+        self.flags = self.flags | flag if value else self.flags & ~flag
+
+    @property
+    def android(self) -> bool:
+        return bool(self.flags & FLAG_ANDROID)
+
+    @android.setter
+    def android(self, value: bool) -> None:
+        self._set_flag(FLAG_ANDROID, value)
+
+    @property
+    def local(self) -> bool:
+        return bool(self.flags & FLAG_LOCAL)
+
+    @local.setter
+    def local(self, value: bool) -> None:
+        self._set_flag(FLAG_LOCAL, value)
+
+    @property
+    def checked(self) -> bool:
+        return bool(self.flags & FLAG_CHECKED)
+
+    @checked.setter
+    def checked(self, value: bool) -> None:
+        self._set_flag(FLAG_CHECKED, value)
+
+    @property
+    def file_hash(self) -> str:
+        return self.hash_bytes.hex()
+
+    @file_hash.setter
+    def file_hash(self, value: str) -> None:
+        self.hash_bytes = bytes.fromhex(value) if value else b""
+
+    @property
+    def abis(self) -> str:
+        return self.abis_str
+
+    @abis.setter
+    def abis(self, value: str) -> None:
+        # Quelques combinaisons partagées par toutes les entrées, quel que soit le chemin d'écriture
+        self.abis_str = sys.intern(value)
+
+    def to_dict(self) -> dict:
+        """Format JSON historique (équivalent à l'ancien asdict)."""
+        return {
+            "label": self.label,
+            "android": self.android,
+            "local": self.local,
+            "checked": self.checked,
+            "file_hash": self.file_hash,
+            "file_name": self.file_name,
+            "min_sdk": self.min_sdk,
+            "abis": self.abis,
+        }
+
+    def __repr__(self) -> str:
+        return (f"PackageInfo(label={self.label!r}, android={self.android}, local={self.local}, "
+                f"checked={self.checked}, file_hash={self.file_hash!r}, file_name={self.file_name!r}, "
+                f"min_sdk={self.min_sdk}, abis={self.abis!r})")
+
+@dataclass
+class ScanDelta:
+    """Changements produits par un scan, appliqués au PackageMap vivant (thread UI)."""
+    added: Dict[Tuple[str, int], PackageInfo] = field(default_factory=dict)
+    removed: List[Tuple[str, int]] = field(default_factory=list)
+    modified: Dict[Tuple[str, int], Dict[str, object]] = field(default_factory=dict)
+
+    # Champs issus du scan (checked est un état UI)
+    FIELDS = ("label", "android", "local", "file_hash", "file_name", "min_sdk", "abis")
+
+    @classmethod
+    def from_maps(cls, baseline: Dict[Tuple[str, int], PackageInfo], scanned) -> "ScanDelta":
+        """Diff entre l'état de départ et le PackageMap de travail du scan."""
+        delta = cls()
+        for key, info in scanned.items():
+            before = baseline.get(key)
+            if before is None:
+                delta.added[key] = info
+                continue
+            changes = {
+                name: getattr(info, name)
+                for name in cls.FIELDS
+                if getattr(info, name) != getattr(before, name)
+            }
+            if changes:
+                delta.modified[key] = changes
+        delta.removed = [key for key in baseline if not scanned.exists(key[0], key[1])]
+        return delta
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.modified)
+
+    def changed_packages(self) -> set[str]:
+        """Noms des packages touchés (pour recalculer les couleurs de version)."""
+        return {pkg for pkg, _ in (*self.added, *self.removed, *self.modified)}
+
+    def __str__(self) -> str:
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.modified)} modified"
 
 class PackageMap:
     """Gestionnaire centralisé des données de packages.
@@ -27,18 +150,63 @@ class PackageMap:
     def __init__(self):
         self._data: Dict[Tuple[str, int], PackageInfo] = {}
         self._dirty: set[Tuple[str, int]] = set()  # Track modifications
+        self._removed: set[Tuple[str, int]] = set()  # Suppressions à persister
+        self.store = None  # Backend de persistance (SqlitePackageStore) ou None = JSON
+        # Index secondaires (lookup O(1) pendant le scan local)
+        self._hash_index: Dict[bytes, Tuple[str, int]] = {}
+        self._name_index: Dict[str, Tuple[str, int]] = {}
+        # pkg -> version codes triés (flags android/local lus dans PackageInfo)
+        self._versions: Dict[str, List[int]] = {}
+        # pkg -> version codes installés triés : le flag android passe par _set_android()
+        self._installed: Dict[str, List[int]] = {}
+
+    def _index(self, key: Tuple[str, int], info: PackageInfo) -> None:
+        if info.hash_bytes:
+            self._hash_index[info.hash_bytes] = key
+        if info.file_name:
+            self._name_index[info.file_name] = key
+
+    def _unindex(self, key: Tuple[str, int], info: PackageInfo) -> None:
+        if info.hash_bytes and self._hash_index.get(info.hash_bytes) == key:
+            del self._hash_index[info.hash_bytes]
+        if info.file_name and self._name_index.get(info.file_name) == key:
+            del self._name_index[info.file_name]
+
+    def _index_installed(self, key: Tuple[str, int], installed: bool) -> None:
+        versions = self._installed.setdefault(key[0], [])
+        pos = bisect.bisect_left(versions, key[1])
+        present = pos < len(versions) and versions[pos] == key[1]
+        if installed and not present:
+            versions.insert(pos, key[1])
+        elif not installed and present:
+            del versions[pos]
+        if not versions:
+            del self._installed[key[0]]
+
+    def _set_android(self, key: Tuple[str, int], info: PackageInfo, android: bool) -> None:
+        """Flag android d'une entrée de la map, index des versions installées compris."""
+        info.android = android
+        self._index_installed(key, bool(android))
 
     def add(self, pkg: str, vcode: str, **info) -> None:
+        pkg = sys.intern(pkg)  # une seule copie du nom partagée par les clés / index
         key = (pkg, int(vcode))
         if key not in self._data:
             self._data[key] = PackageInfo(**info)
+            bisect.insort(self._versions.setdefault(pkg, []), key[1])
+            self._index_installed(key, self._data[key].android)
+            self._removed.discard(key)
         else:
+            self._unindex(key, self._data[key])
             for field, value in info.items():
                 if field == "label":
                     if value:  # ⬅️ NE PAS écraser si vide
                         self._data[key].label = value
+                elif field == "android":
+                    self._set_android(key, self._data[key], value)
                 elif hasattr(self._data[key], field):
                     setattr(self._data[key], field, value)
+        self._index(key, self._data[key])
         self._dirty.add(key)
 
     def get(self, pkg: str, vcode: str) -> Optional[PackageInfo]:
@@ -46,6 +214,10 @@ class PackageMap:
         key = (pkg, int(vcode))
         return self._data.get(key)
 
+    def get_by_key(self, key: Tuple[str, int]) -> Optional[PackageInfo]:
+        """Lookup direct par clé (pkg, vcode_int), sans conversion (chemin chaud du modèle Qt)."""
+        return self._data.get(key)
+
     def set_check(self, pkg: str, vcode: str, is_checked: bool) -> None:
         key = (pkg, int(vcode))
         found_package = self._data.get(key)
@@ -53,13 +225,34 @@ class PackageMap:
             logging.warning(f"set_check: package not found {pkg} {vcode}")
             return
         found_package.checked = is_checked
+        self._dirty.add(key)
+
+    def set_flags(self, pkg: str, vcode: str, android: bool = None, local: bool = None) -> None:
+        """Met à jour les flags android / local et marque l'entrée à persister."""
+        key = (pkg, int(vcode))
+        info = self._data.get(key)
+        if not info:
+            return
+        if android is not None:
+            self._set_android(key, info, android)
+        if local is not None:
+            info.local = local
+        self._dirty.add(key)
 
     def remove(self, pkg: str, vcode: str) -> bool:
         """Supprime un package. Retourne True si supprimé."""
         key = (pkg, int(vcode))
         if key in self._data:
-            del self._data[key]
+            self._unindex(key, self._data.pop(key))
+            self._index_installed(key, False)
             self._dirty.discard(key)
+            self._removed.add(key)
+            versions = self._versions.get(pkg, [])
+            pos = bisect.bisect_left(versions, key[1])
+            if pos < len(versions) and versions[pos] == key[1]:
+                del versions[pos]
+            if not versions:
+                self._versions.pop(pkg, None)
             return True
         return False
 
@@ -77,42 +270,87 @@ class PackageMap:
         """
         if not file_hash:
             return None
+        try:
+            hash_bytes = bytes.fromhex(file_hash)
+        except ValueError:
+            return None
 
-        for (pkg, vcode_int), info in self._data.items():
-            if info.file_hash == file_hash:
-                return (pkg, vcode_int)
+        key = self._hash_index.get(hash_bytes)
+        info = self._data.get(key) if key else None
+        if info and info.hash_bytes == hash_bytes:
+            return key
         return None
 
     def find_by_filename(self, file_name: str) -> Optional[Tuple[str, int]]:
         if not file_name:
             return None
 
-        for (pkg, vcode_int), info in self._data.items():
-            if info.file_name == file_name:
-                return (pkg, vcode_int)
+        key = self._name_index.get(file_name)
+        info = self._data.get(key) if key else None
+        if info and info.file_name == file_name:
+            return key
         return None
 
     def update_file_hash(self, pkg: str, vcode: str, file_hash: str) -> None:
         """Met à jour le hash de fichier pour un package."""
-        info = self.get(pkg, vcode)
+        key = (pkg, int(vcode))
+        info = self._data.get(key)
         if info:
+            self._unindex(key, info)
             info.file_hash = file_hash
-            self._dirty.add((pkg, int(vcode)))
+            self._index(key, info)
+            self._dirty.add(key)
 
     def update_file_name(self, pkg: str, vcode: str, file_name: str) -> None:
         """Met à jour le nom de fichier local pour un package."""
-        info = self.get(pkg, vcode)
+        key = (pkg, int(vcode))
+        info = self._data.get(key)
         if info:
+            self._unindex(key, info)
             info.file_name = file_name
-            self._dirty.add((pkg, int(vcode)))
+            self._index(key, info)
+            self._dirty.add(key)
 
     def get_all_packages(self) -> Dict[Tuple[str, int], PackageInfo]:
         """Retourne une copie des packages."""
         return self._data.copy()
 
+    def items(self):
+        """Vue (sans copie) sur les packages. Ne pas modifier la map pendant l'itération."""
+        return self._data.items()
+
+    # --- Index des versions par package ---
+
+    def get_versions(self, pkg: str) -> List[Tuple[int, PackageInfo]]:
+        """Toutes les versions d'un package, triées par version code croissant."""
+        return [(v, self._data[(pkg, v)]) for v in self._versions.get(pkg, ())]
+
+    def version_codes(self, pkg: str) -> List[int]:
+        """Version codes triés d'un package (liste interne : ne pas modifier)."""
+        return self._versions.get(pkg, [])
+
+    def highest_installed_vcode(self, pkg: str) -> Optional[int]:
+        """Version code installé le plus élevé, ou None."""
+        installed = self._installed.get(pkg)
+        return installed[-1] if installed else None
+
+    def has_newer_installed(self, pkg: str, vcode: str) -> bool:
+        """Une version plus récente que vcode est-elle installée ?"""
+        installed = self._installed.get(pkg, ())
+        return bisect.bisect_right(installed, int(vcode)) < len(installed)
+
+    def has_older_installed(self, pkg: str, vcode: str) -> bool:
+        """Une version plus ancienne que vcode est-elle installée ?"""
+        return bisect.bisect_left(self._installed.get(pkg, ()), int(vcode)) > 0
+
     def clear_dirty(self) -> None:
         """Marque toutes les entrées comme synchronisées."""
         self._dirty.clear()
+        self._removed.clear()
+
+    def get_dirty(self) -> Tuple[set[Tuple[str, int]], set[Tuple[str, int]]]:
+        """Clés modifiées et clés supprimées depuis la dernière sauvegarde."""
+        return set(self._dirty), set(self._removed)
 
     def is_dirty(self, pkg: str, vcode: str) -> bool:
         """Vérifie si une entrée a été modifiée."""
@@ -121,31 +359,69 @@ class PackageMap:
 
     def clear(self) -> None:
         """Vide toutes les données."""
+        self._removed.update(self._data)
         self._data.clear()
         self._dirty.clear()
+        self._hash_index.clear()
+        self._name_index.clear()
+        self._versions.clear()
+        self._installed.clear()
+
+    def load_entry(self, pkg: str, vcode_int: int, info: PackageInfo) -> None:
+        """Insère une entrée chargée depuis le stockage (non marquée dirty)."""
+        pkg = sys.intern(pkg)
+        key = (pkg, vcode_int)
+        if key in self._data:
+            self._unindex(key, self._data[key])
+        else:
+            bisect.insort(self._versions.setdefault(pkg, []), vcode_int)
+        self._data[key] = info
+        self._index(key, info)
+        self._index_installed(key, info.android)
+
+    def attach_store(self, store) -> None:
+        """Utilise un backend de persistance incrémentale à la place du JSON."""
+        self.store = store
+
+    def load(self) -> int:
+        """Charge depuis le backend attaché, sinon depuis packagemap.json."""
+        if self.store is not None:
+            return self.store.load_into(self)
+        return self.load_from_file(self.get_save_file_path())
+
+    def iter_load(self):
+        """Comme load(), par pages : produit le nombre d'entrées chargées après chaque page."""
+        if self.store is not None:
+            yield from self.store.iter_load(self)
+        else:
+            yield self.load()
+
+    def save(self) -> None:
+        """Persiste les changements : lignes dirty seulement avec un store, sinon JSON complet."""
+        if self.store is not None:
+            self.store.save_dirty(self)
+        else:
+            self.save_to_file(self.get_save_file_path())
+            self.clear_dirty()
 
     def save_to_file(self, file_path: Path) -> None:
-        """Sauvegarde PackageMap dans un fichier JSON.
+        """Sauvegarde (ou exporte) PackageMap dans un fichier JSON.
 
         Args:
             file_path: Chemin du fichier de sauvegarde
         """
         try:
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            # Convertir les clés tuple en strings pour JSON
-            serializable_data = {}
-            for (pkg, vcode_int), info in self._data.items():
-                key = f"{pkg}#{vcode_int}"  # Séparateur unique
-                serializable_data[key] = asdict(info)
-
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(serializable_data, f, indent=2, ensure_ascii=False)
-
+            pahu.write_json_atomic(file_path, self.to_serializable(), indent=2)
             logging.info(f"PackageMap saved to {file_path}")
 
         except Exception as e:
             logging.error(f"Failed to save PackageMap: {e}")
 
+    def to_serializable(self) -> Dict[str, dict]:
+        """Snapshot JSON-sérialisable (indépendant de la map, utilisable depuis un autre thread)."""
+        # Convertir les clés tuple en strings pour JSON (séparateur unique #)
+        return {f"{pkg}#{vcode_int}": info.to_dict() for (pkg, vcode_int), info in self._data.items()}
+
     def load_from_file(self, file_path: Path) -> int:
         """Charge PackageMap depuis un fichier JSON.
 
@@ -162,7 +438,17 @@ class PackageMap:
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 serializable_data = json.load(f)
+            if not isinstance(serializable_data, dict):
+                raise ValueError(f"unexpected JSON {type(serializable_data).__name__}")
+        except (json.JSONDecodeError, UnicodeDecodeError, ValueError) as e:
+            # Fichier tronqué / corrompu (JSON invalide, octets non UTF-8) :
+            # le mettre de côté plutôt que de l'écraser au prochain save
+            corrupt_file = file_path.with_name(file_path.name + ".corrupt")
+            file_path.replace(corrupt_file)
+            logging.error(f"PackageMap file {file_path} is corrupt ({e}), moved to {corrupt_file}")
+            return 0
 
+        try:
             loaded_count = 0
             for key, info_dict in serializable_data.items():
                 # Reconvertir les clés string en tuple
@@ -170,7 +456,7 @@ class PackageMap:
                     pkg, vcode_str = key.split('#', 1)
                     vcode_int = int(vcode_str)
 
-                    self._data[(pkg, vcode_int)] = PackageInfo(**info_dict)
+                    self.load_entry(pkg, vcode_int, PackageInfo(**info_dict))
                     loaded_count += 1
                 except Exception as e:
                     logging.warning(f"Invalid entry {key}: {e}")
@@ -201,6 +487,8 @@ class PackageMap:
         # Reset UNIQUEMENT android (source volatile)
         for info in self._data.values():
             info.android = False
+        self._installed.clear()
+        self._dirty.update(self._data)
 
         for (pkg, vcode_int), info in scanned_items:
             vcode_str = str(vcode_int)
@@ -208,17 +496,21 @@ class PackageMap:
             existing = self.get(pkg, vcode_str)
 
             if existing:
-                existing.android = info.android
+                self._set_android((pkg, vcode_int), existing, info.android)
                 existing.local = info.local
 
                 if info.label and not existing.label:
                     existing.label = info.label
 
                 if not existing.file_hash and info.file_hash:
-                    existing.file_hash = info.file_hash
+                    self.update_file_hash(pkg, vcode_str, info.file_hash)
 
                 if not existing.file_name and info.file_name:
-                    existing.file_name = info.file_name
+                    self.update_file_name(pkg, vcode_str, info.file_name)
+
+                if info.min_sdk or info.abis:
+                    existing.min_sdk = info.min_sdk
+                    existing.abis = info.abis
 
             else:
                 # Nouvelle entrée
@@ -231,8 +523,45 @@ class PackageMap:
                     checked=False,
                     file_hash=info.file_hash,
                     file_name=info.file_name,
+                    min_sdk=info.min_sdk,
+                    abis=info.abis,
                 )
 
+    def apply_delta(self, delta: ScanDelta) -> None:
+        """Applique un ScanDelta (thread UI) en conservant les index."""
+        for pkg, vcode_int in delta.removed:
+            self.remove(pkg, str(vcode_int))
+
+        for (pkg, vcode_int), changes in delta.modified.items():
+            key = (pkg, vcode_int)
+            info = self._data.get(key)
+            if info is None:
+                continue
+            for name, value in changes.items():
+                if name == "file_hash":
+                    self.update_file_hash(pkg, str(vcode_int), value)
+                elif name == "file_name":
+                    self.update_file_name(pkg, str(vcode_int), value)
+                elif name == "android":
+                    self._set_android(key, info, value)
+                else:
+                    setattr(info, name, value)
+            self._dirty.add(key)
+
+        for (pkg, vcode_int), info in delta.added.items():
+            self.add(
+                pkg,
+                str(vcode_int),
+                label=info.label,
+                android=info.android,
+                local=info.local,
+                checked=False,
+                file_hash=info.file_hash,
+                file_name=info.file_name,
+                min_sdk=info.min_sdk,
+                abis=info.abis,
+            )
+
     def remove_orphans(self) -> None:
         """
         Supprime uniquement les entrées réellement mortes :
@@ -247,6 +576,147 @@ class PackageMap:
         for pkg, vcode_int in to_remove:
             self.remove(pkg, str(vcode_int))
 
+@dataclass
+class ScanRecord:
+    """Entrée du cache de scan local (clé : stat du fichier)."""
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    file_hash: str = ""
+    pkg: str = ""
+    vcode: str = ""
+    label: str = ""
+    min_sdk: int = -1  # -1 : exigences pas encore lues (cache antérieur)
+    abis: str = ""
+
+    def matches(self, stat) -> bool:
+        """Vérifie que le fichier n'a pas changé depuis l'enregistrement."""
+        return (self.size, self.mtime_ns, self.inode) == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+class ScanCache:
+    """Cache incrémental du scan local, persisté à côté de packagemap.json.
+    Un fichier dont le stat (size, mtime_ns, inode) est inchangé n'est
+    ni re-hashé ni re-parsé.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, ScanRecord] = {}
+
+    def lookup(self, file_name: str, stat) -> Optional[ScanRecord]:
+        """Retourne l'enregistrement si le fichier n'a pas changé, sinon None."""
+        record = self._records.get(file_name)
+        if record and record.matches(stat):
+            return record
+        return None
+
+    def store(self, file_name: str, stat, file_hash: str = "",
+              pkg: str = "", vcode: str = "", label: str = "",
+              min_sdk: int = -1, abis: str = "") -> None:
+        self._records[file_name] = ScanRecord(
+            path=file_name,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            inode=stat.st_ino,
+            file_hash=file_hash,
+            pkg=pkg,
+            vcode=str(vcode),
+            label=label,
+            min_sdk=min_sdk,
+            abis=abis,
+        )
+
+    def prune(self, existing_files: set[str]) -> None:
+        """Oublie les fichiers qui ne sont plus présents."""
+        for file_name in list(self._records):
+            if file_name not in existing_files:
+                del self._records[file_name]
+
+    def clear(self) -> None:
+        self._records.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def save_to_file(self, file_path: Path) -> None:
+        try:
+            serializable_data = {name: asdict(record) for name, record in self._records.items()}
+            pahu.write_json_atomic(file_path, serializable_data)
+            logging.debug(f"ScanCache saved to {file_path}")
+        except Exception as e:
+            logging.error(f"Failed to save ScanCache: {e}")
+
+    def load_from_file(self, file_path: Path) -> int:
+        if not file_path.exists():
+            return 0
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                serializable_data = json.load(f)
+            for name, record_dict in serializable_data.items():
+                try:
+                    self._records[name] = ScanRecord(**record_dict)
+                except TypeError as e:
+                    logging.warning(f"Invalid scan cache entry {name}: {e}")
+            return len(self._records)
+        except Exception as e:
+            logging.error(f"Failed to load ScanCache: {e}")
+            return 0
+
+    def get_save_file_path(self) -> Path:
+        """Retourne le chemin par défaut du cache (à côté de packagemap.json)."""
+        return Path(__file__).parent / "extracted_apks" / "scancache.json"
+
+class LabelCache:
+    """Cache persistant package -> label (inventaire Android sans miniapp)."""
+
+    def __init__(self):
+        self._labels: Dict[str, str] = {}
+        self._modified = False
+
+    def get(self, pkg: str) -> str:
+        return self._labels.get(pkg, "")
+
+    def __contains__(self, pkg: str) -> bool:
+        return pkg in self._labels
+
+    def update(self, pkg: str, label: str) -> None:
+        """Un label vide marque le package comme vu (sans écraser un label connu)."""
+        if pkg not in self._labels or (label and self._labels[pkg] != label):
+            self._labels[pkg] = label
+            self._modified = True
+
+    def seed_from_map(self, package_map) -> None:
+        """Récupère les labels déjà connus du PackageMap (sans écraser)."""
+        for (pkg, _), info in package_map.items():
+            if info.label and pkg not in self._labels:
+                self._labels[pkg] = info.label
+                self._modified = True
+
+    def save_to_file(self, file_path: Path) -> None:
+        if not self._modified:
+            return
+        try:
+            pahu.write_json_atomic(file_path, self._labels)
+            self._modified = False
+            logging.debug(f"LabelCache saved to {file_path}")
+        except Exception as e:
+            logging.error(f"Failed to save LabelCache: {e}")
+
+    def load_from_file(self, file_path: Path) -> int:
+        if not file_path.exists():
+            return 0
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                self._labels.update(json.load(f))
+            return len(self._labels)
+        except Exception as e:
+            logging.error(f"Failed to load LabelCache: {e}")
+            return 0
+
+    def get_save_file_path(self) -> Path:
+        """Retourne le chemin par défaut du cache (à côté de packagemap.json)."""
+        return Path(__file__).parent / "extracted_apks" / "labelcache.json"
+
 def map_apk_files_to_packages(package_map, apk_dir: Path, files_to_hash: list[Path]) -> Dict[str, Tuple[str, str, str]]:
     """Map les fichiers APK vers les packages avec fallback hash.
 
@@ -294,19 +764,69 @@ def map_apk_files_to_packages(package_map, apk_dir: Path, files_to_hash: list[Pa
     return mapping
 
 # array building
-def on_scan_finished(main_window, scan_result):
+def on_scan_finished(main_window, delta: ScanDelta):
     if getattr(main_window, "progress_dialog", None):
         main_window.progress_dialog.close()
         main_window.progress_dialog = None
 
-    # 🔥 remplace complètement le modèle
-    main_window.package_map = scan_result
-    main_window.table_adapter.pkg_map = main_window.package_map
+    # applique uniquement les changements au modèle vivant
+    main_window.package_map.apply_delta(delta)
 
     # UI
-    main_window.table_adapter.refresh()
+    main_window.table_adapter.apply_delta(delta)
     main_window.table_adapter.clear_all_checked()
 
-    # persist
-    save_file = main_window.package_map.get_save_file_path()
-    main_window.package_map.save_to_file(save_file)
\ No newline at end of file
+    # persist (rien à écrire si le scan n'a rien changé)
+    if not delta.is_empty():
+        main_window.package_map.save()
+
+# === Micro-benchmark : scan matching cost vs map size ===
+# Usage : python pah_data.py
+if __name__ == "__main__":
+    import time
+
+    for size in (1_000, 10_000, 100_000):
+        bench_map = PackageMap()
+        for i in range(size):
+            bench_map.add(f"com.bench.app{i}", str(i), label=f"App {i}", android=False, local=True,
+                          file_hash=f"{i:032x}", file_name=f"com.bench.app{i}_{i}.apk")
+
+        lookups = 10_000
+        start = time.perf_counter()
+        for i in range(lookups):
+            j = (i * 7919) % size
+            bench_map.find_by_hash(f"{j:032x}")
+            bench_map.find_by_filename(f"com.bench.app{j}_{j}.apk")
+        elapsed = time.perf_counter() - start
+        print(f"{size:>7} entries : {elapsed / lookups * 1e6:.2f} µs per file match")
+
+    # === Mémoire : 100k entrées, ancien layout (dataclass + hash hex) vs PackageInfo compact ===
+    import tracemalloc
+
+    @dataclass
+    class LegacyPackageInfo:
+        label: str
+        android: bool
+        local: bool
+        checked: bool = False
+        file_hash: str = ""
+        file_name: str = ""
+
+    def build_entries(info_cls, intern):
+        # 20k packages x 5 versions, noms recréés à chaque entrée comme lors d'un parsing
+        entries = {}
+        for i in range(100_000):
+            pkg = f"com.bench.app{i // 5}"
+            if intern:
+                pkg = sys.intern(pkg)
+            entries[(pkg, i)] = info_cls(label=f"App {i // 5}", android=bool(i % 2), local=True,
+                                         file_hash=f"{i:032x}", file_name=f"app{i}.apk")
+        return entries
+
+    for name, info_cls, intern in (("before", LegacyPackageInfo, False), ("after", PackageInfo, True)):
+        tracemalloc.start()
+        entries = build_entries(info_cls, intern)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>6} : {current / 1e6:.1f} MB for {len(entries)} entries")
+        del entries
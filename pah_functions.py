@@ -1,6 +1,7 @@
 import logging
 import subprocess
 import pah_utils as pahu
+import pah_adb as pahad
 
 from pathlib import Path
 
@@ -51,11 +52,12 @@ def restore_backup_archive(archive: Path, target_path: str, tmpdir: Path) -> boo
         (tmpdir / "data.tar").unlink()
         # push and copy
         # Simplication needed
-        subprocess.run(["adb", "shell", "su", "-c", f"mkdir -p '/storage/emulated/0/neo_tmp/'"])
-        subprocess.run(["adb", "push", str(tmpdir / "."), "/storage/emulated/0/neo_tmp/"])
-        subprocess.run(["adb", "shell", "su", "-c", f"mkdir -p '{target_path}'"])
-        subprocess.run(["adb", "shell", "su", "-c", f"cp -r /storage/emulated/0/neo_tmp/. '{target_path}'"])
-        subprocess.run(["adb", "shell", "su", "-c", "rm -rf /storage/emulated/0/neo_tmp"])
+        adb = pahad.get_client()
+        adb.shell(["su", "-c", f"mkdir -p '/storage/emulated/0/neo_tmp/'"])
+        adb.push(tmpdir, "/storage/emulated/0/neo_tmp/")
+        adb.shell(["su", "-c", f"mkdir -p '{target_path}'"])
+        adb.shell(["su", "-c", f"cp -r /storage/emulated/0/neo_tmp/. '{target_path}'"])
+        adb.shell(["su", "-c", "rm -rf /storage/emulated/0/neo_tmp"])
         pahu.clean_tmp_dir(tmpdir)
     return True
 
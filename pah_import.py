@@ -2,11 +2,13 @@ import logging
 import os
 import subprocess
 
+from functools import partial
 from pathlib import Path
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 
 import pah_callbacks as pahc
 import pah_utils as pahu
+import pah_adb as pahad
 
 
 class BackupWorker(QThread):
@@ -67,17 +69,13 @@ def on_backup_clicked(main_window):
     apk_dir = Path(__file__).parent / 'extracted_apks'
     backup_list = []
 
-    # Checking PackageMap instead of table
-    for (pkg, vcode_int), info in main_window.package_map.get_all_packages().items():
+    # Filtering : only checked packages (one pass over the selection)
+    for pkg, vcode_int in main_window.table_adapter.checked_keys():
         vcode = str(vcode_int)
-        is_checked = main_window.table_adapter.is_checked(pkg, vcode)
+        info = main_window.package_map.get_by_key((pkg, vcode_int))
 
-        # Filtering :
-        # Excluding unchecked packages,
-        if not is_checked:
-            continue
         # Excluding not installed packages,
-        elif not info.android:
+        if not info.android:
             logging.error(
                 f"\nNo android package to import for {pkg} vcode {vcode}. Consider android rescan")
             continue
@@ -100,9 +98,11 @@ def on_backup_clicked(main_window):
         )
     )
     main_window.worker.success.connect(
-        lambda pkg_name_bak, vcode_bak: _mark_saved(main_window, pkg_name_bak, vcode_bak))
+        lambda pkg_name_bak, vcode_bak: main_window.update_bus.post(
+            partial(_mark_saved, main_window), pkg_name_bak, vcode_bak))
     main_window.worker.finished.connect(
         lambda: (
+            main_window.update_bus.flush(),
             pahc.reset_progress(main_window),
             QTimer.singleShot(0, main_window.table_adapter.clear_selection)
         )
@@ -125,11 +125,11 @@ def on_delete_clicked(main_window):
     # Listing the entries to delete
     del_list = []  # tuples (package_name, version_code, file_path)
 
-    # Checking PackageMap instead of table
-    for (pkg, vcode_int), info in list(pkg_map.get_all_packages().items()):
+    # Checked and saved packages only
+    for pkg, vcode_int in main_window.table_adapter.checked_keys():
         vcode = str(vcode_int)
-        is_saved_and_checked = info.local and main_window.table_adapter.is_checked(pkg, vcode)
-        if is_saved_and_checked:
+        info = pkg_map.get_by_key((pkg, vcode_int))
+        if info.local:
             fname = f"{pkg}_{vcode}.apk"
             # trying .apk
             file_path = apk_dir / fname
@@ -151,6 +151,7 @@ def on_delete_clicked(main_window):
         return errcode
 
     # Deleting file and UI + pkg_map Update
+    deleted_packages = set()
     for pkg, vcode, path in del_list:
         try:
             os.remove(path)
@@ -165,38 +166,35 @@ def on_delete_clicked(main_window):
         # Update data in table AND PackageMap
         # If the pkg,vcode is not installed and deleted on PC, delete from pkg_map and table
         _mark_deleted(main_window, pkg, vcode)
+        deleted_packages.add(pkg)
         if pkg_map.exists(pkg, vcode) and not pkg_map.get(pkg, vcode).android and not pkg_map.get(pkg, vcode).local:
             logging.warning(
                 f"\nInconsistent values for {pkg} vcode {vcode} :\nconsider android or local rescan")
             errcode = 2
 
+    # une seule mise à jour ciblée du modèle et une seule sauvegarde pour tout le lot
+    main_window.table_adapter.refresh_packages(deleted_packages)
+    pkg_map.save()
     main_window.table_adapter.clear_selection()
-    main_window.table_adapter.refresh()
     return errcode
 
 def _mark_saved(main_window, pkg: str, vcode: str) -> None:
+    """Applique une sauvegarde réussie au PackageMap (UI + sauvegarde : ModelUpdateBus)."""
     pkg_map = main_window.package_map
     info = pkg_map.get(pkg, vcode)
 
     if info:
-        info.local = True
-
-    main_window.table_adapter.refresh()
-    pkg_map.save_to_file(pkg_map.get_save_file_path())
+        pkg_map.set_flags(pkg, vcode, local=True)
 
 def _mark_deleted(main_window, pkg: str, vcode: str) -> None:
     pkg_map = main_window.package_map
     info = pkg_map.get(pkg, vcode)
     if info:
-        info.local = False
-        info.file_name = ""
-        info.file_hash = ""
+        pkg_map.set_flags(pkg, vcode, local=False)
+        pkg_map.update_file_name(pkg, vcode, "")
+        pkg_map.update_file_hash(pkg, vcode, "")
         if not info.android:
             pkg_map.remove(pkg, vcode)
-    if hasattr(main_window, "table_adapter"):
-        main_window.table_adapter.refresh()
-    save_file = pkg_map.get_save_file_path()
-    pkg_map.save_to_file(save_file)
 
 # === APK Extraction related functions ===
 
@@ -204,14 +202,14 @@ def extract_single_apk(package: str, apk_path: str, out_dir: Path) -> Path:
     """Pull a single APK via adb and return (apk_file) path."""
     out_dir.mkdir(parents=True, exist_ok=True)
     dst = out_dir / f"{package}.apk"
-    process = subprocess.run(["adb", "pull", apk_path, str(dst)],
-               capture_output=True,text=True)
     # Single apk extraction
-    if process.stdout:
-        logging.debug(f"[adb pull stdout] {process.stdout.strip()}")
-    if process.stderr:
-        logging.error(f"[adb pull stderr] {process.stderr.strip()}")
-    return dst if process.returncode == 0 else False
+    try:
+        size = pahad.get_client().pull(apk_path, dst)
+        logging.debug(f"[adb pull] {apk_path}: {size} bytes")
+    except (OSError, pahad.AdbError) as e:
+        logging.error(f"[adb pull] {apk_path}: {e}")
+        return False
+    return dst
 
 def extract_split_apks(package: str, apk_paths: list[str], out_dir: Path) -> Path:
     """Pull split APK, concatenate to .apks, and return (apks_file) path."""
@@ -220,13 +218,12 @@ def extract_split_apks(package: str, apk_paths: list[str], out_dir: Path) -> Pat
     split_files = []
     for idx, path in enumerate(apk_paths, start=1):
         dst = out_dir / f"{package}_split{idx}.apk"
-        process = subprocess.run(["adb", "pull", path, str(dst)],
-                       capture_output=True,text=True)
         # APKs extraction
-        if process.stdout:
-            logging.debug(f"[adb pull stdout] {process.stdout.strip()}")
-        if process.stderr:
-            logging.error(f"[adb pull stderr] {process.stderr.strip()}")
+        try:
+            size = pahad.get_client().pull(path, dst)
+            logging.debug(f"[adb pull] {path}: {size} bytes")
+        except (OSError, pahad.AdbError) as e:
+            logging.error(f"[adb pull] {path}: {e}")
         split_files.append(dst)
     # APKS Concatenation
     apks_dst = out_dir / f"{package}.apks"
@@ -246,9 +243,9 @@ def extract_split_apks(package: str, apk_paths: list[str], out_dir: Path) -> Pat
 def extract_package(package: str, versioncode: str, out_dir: Path) -> str:
     """Extract APK or APKS from android via adb and return the apk_file path."""
     # get paths via adb
-    result = subprocess.run([
-        "adb", "shell", "pm", "path", package],
-        capture_output=True, text=True, check=True)
+    result = pahad.get_client().shell(["pm", "path", package])
+    if result.returncode != 0:
+        pahu.raise_error(f"pm path failed for {package}: {result.stderr.strip()}")
     if result.stdout:
         logging.debug(f"[adb pm stdout] {result.stdout.strip()}")
     if result.stderr:
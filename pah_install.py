@@ -1,49 +1,85 @@
 import logging
+import queue
 import tempfile
-import subprocess
+import threading
+import time
+import zipfile
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from PyQt5.QtCore import QTimer, QThread, pyqtSignal
+from PyQt5.QtWidgets import QInputDialog
 
 import pah_callbacks as pahc
 import pah_utils as pahu
+import pah_adb as pahad
+import pah_manifest as pahmf
+
+# Pipeline d'installation : transfert vers la zone de staging de l'appareil
+# pendant que pm installe les paquets déjà transférés
+PIPELINED_INSTALL = True
+PIPELINE_DEPTH = 2  # paquets transférés d'avance (en plus du groupe en cours), par appareil
+STAGING_DIR = "/data/local/tmp/pah_staging"
+# Part de l'espace libre de /data utilisable par le staging : pm recopie chaque paquet
+# dans sa session, il faut garder au moins autant de place pour l'installation
+STAGING_FREE_SPACE_SHARE = 0.5
+# Désinstallation : commandes pm enchaînées dans un seul shell adb
+BATCHED_UNINSTALL = True
+# Install / update : paquets regroupés dans une session multi-package atomique (1 : désactivé)
+INSTALL_GROUP_SIZE = 10
 
 class InstallWorker(QThread):
-    progress = pyqtSignal(str)  # message, percentage
-    success = pyqtSignal(str, str)  # package_name, version_code
+    """Installe la même liste sur un ou plusieurs appareils :
+    une file et un thread par serial, exécutés en parallèle."""
+    progress = pyqtSignal(str, int)  # message, percentage (tous appareils)
+    device_progress = pyqtSignal(str, int, int)  # serial, installés sur cet appareil, total
+    device_success = pyqtSignal(str, str, str)  # serial, package_name, version_code
+    success = pyqtSignal(str, str)  # package_name, version_code : installé sur tous les appareils
     error = pyqtSignal(str)
     finished = pyqtSignal()
 
-    def __init__(self, install_list, tmp_dir, downgrade_flag=False):
+    def __init__(self, install_list, tmp_dir, downgrade_flag=False, serials=None, pipelined=PIPELINED_INSTALL,
+                 group_size=1):
         super().__init__()
         self.install_list = install_list
         self.tmp_dir = tmp_dir
         self.downgrade_flag = downgrade_flag
+        self.pipelined = pipelined
+        self.group_size = max(1, group_size)  # groupes multi-package (mode pipeline)
+        self.serials = list(serials) if serials else [None]  # None : appareil par défaut
+        # serial -> {(package_name, version_code): bool}
+        self.results = {serial: {} for serial in self.serials}
+        self._installed_on = {}  # (package_name, version_code) -> nb d'appareils OK
+        self._device_installed = {serial: 0 for serial in self.serials}
+        self._installed = 0
+        self._done = 0
+        self._start_time = 0.0
+        self._end_time = None
+        # serial -> [durée transfert, durée pm install] cumulées (mode pipeline)
+        self._stage_times = {serial: [0.0, 0.0] for serial in self.serials}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _device_name(serial) -> str:
+        return serial or "device"
 
     def run(self):
         try:
             if not self.install_list:
-                self.progress.emit("Nothing to install")
-                self.finished.emit()
+                self.progress.emit("Nothing to install", 100)
                 return
 
-            total = len(self.install_list)
+            self._start_time = time.monotonic()
+            with ThreadPoolExecutor(max_workers=len(self.serials), thread_name_prefix="pah-install") as pool:
+                futures = [pool.submit(self._run_device_queue, serial) for serial in self.serials]
+                for future in futures:
+                    future.result()
+            self._end_time = time.monotonic()
 
-            for i, (apk_path, pkg_name, version_code) in enumerate(self.install_list):
-                self.progress.emit(f"Installing {pkg_name} ({i}/{total})...")
-
-                success = install_package(
-                    Path(apk_path),
-                    Path(self.tmp_dir),
-                    self.downgrade_flag
-                )
-                if success:
-                    self.success.emit(pkg_name, version_code)
-                    logging.info(f"{pkg_name} v{version_code} : Installed")
-                else:
-                    self.error.emit(f"{pkg_name} v{version_code} : Failed")
-
-            self.progress.emit("Installation complete")
+            self.progress.emit(self.summary(), 100)
+            for line in self.device_summary().splitlines():
+                logging.info(line)
 
         except Exception as e:
             self.error.emit(f"Installation error: {str(e)}")
@@ -51,35 +87,239 @@ class InstallWorker(QThread):
         finally:
             self.finished.emit()
 
+    def _device_tmp_dir(self, serial) -> Path:
+        return Path(self.tmp_dir) / self._device_name(serial).replace(":", "_")
+
+    def _run_device_queue(self, serial) -> None:
+        if self.pipelined:
+            self._run_device_pipeline(serial)
+        else:
+            self._run_device_sequential(serial)
+
+    def _run_device_sequential(self, serial) -> None:
+        """File d'un appareil : transfert + installation, un paquet après l'autre."""
+        tmp_dir = self._device_tmp_dir(serial)
+        for apk_path, pkg_name, version_code in self.install_list:
+            if self.isInterruptionRequested():
+                return
+            success = install_package(Path(apk_path), tmp_dir, self.downgrade_flag, serial=serial)
+            self._record(serial, pkg_name, version_code, success)
+
+    def _run_device_pipeline(self, serial) -> None:
+        """File d'un appareil en deux étages : un thread transfère les paquets dans
+        STAGING_DIR (au plus PIPELINE_DEPTH d'avance) pendant que celui-ci lance pm install
+        sur les paquets déjà transférés, par groupes de group_size. Le volume transféré
+        et pas encore installé est borné par STAGING_FREE_SPACE_SHARE de l'espace libre :
+        si la borne est atteinte, le groupe en cours est installé sans attendre d'être complet.
+        Chaque paquet est effacé de l'appareil après installation, le dossier de staging
+        en fin de file (y compris sur annulation)."""
+        adb = pahad.get_client(serial)
+        tmp_dir = self._device_tmp_dir(serial)
+        staged = queue.Queue(maxsize=PIPELINE_DEPTH)
+        stop = threading.Event()
+        flush = object()  # marqueur : installer le groupe en cours pour libérer de la place
+        budget = int(_free_data(adb) * STAGING_FREE_SPACE_SHARE)  # 0 : pas de borne
+        space = threading.Condition()
+        sizes = {}  # index -> taille transférée (comptée jusqu'à l'effacement)
+
+        def stopping() -> bool:
+            return stop.is_set() or self.isInterruptionRequested()
+
+        def over_budget(size: int) -> bool:
+            used = sum(sizes.values())
+            return bool(budget) and used > 0 and used + size > budget
+
+        def reserve(i: int, size: int) -> bool:
+            with space:
+                if not over_budget(size):
+                    sizes[i] = size
+                    return True
+            staged.put(flush)
+            with space:
+                while over_budget(size) and not stopping():
+                    space.wait(0.5)
+                sizes[i] = size
+            return not stopping()
+
+        def release(group) -> None:
+            with space:
+                for entry in group:
+                    sizes.pop(entry[0], None)
+                space.notify_all()
+
+        def push_stage():
+            try:
+                for i, (apk_path, pkg_name, version_code) in enumerate(self.install_list):
+                    if stopping() or not reserve(i, Path(apk_path).stat().st_size):
+                        return
+                    remote_dir = f"{STAGING_DIR}/{i}"
+                    start = time.monotonic()
+                    try:
+                        remote_apks = stage_package(adb, Path(apk_path), remote_dir, tmp_dir)
+                    except Exception as e:
+                        logging.error(f"Transfer error for {Path(apk_path).name}: {e}")
+                        remote_apks = []
+                    self._stage_times[serial][0] += time.monotonic() - start
+                    staged.put((i, pkg_name, version_code, remote_dir, remote_apks))
+            finally:
+                staged.put(None)
+
+        pusher = threading.Thread(target=push_stage, name=f"pah-push-{self._device_name(serial)}", daemon=True)
+        pusher.start()
+        try:
+            group = []
+            while (entry := staged.get()) is not None:
+                if self.isInterruptionRequested():
+                    continue  # on vide la file : le staging est effacé en sortie
+                if entry is not flush:
+                    group.append(entry)
+                if group and (entry is flush or len(group) >= self.group_size):
+                    self._install_group(adb, serial, group)
+                    release(group)
+                    group = []
+            if group and not self.isInterruptionRequested():
+                self._install_group(adb, serial, group)
+        finally:
+            stop.set()
+            with space:
+                space.notify_all()
+            while pusher.is_alive():
+                try:
+                    staged.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            _remove_staged(adb, STAGING_DIR)
+
+    def _install_group(self, adb, serial, group) -> None:
+        """Installe un groupe de paquets transférés : une session multi-package (tout ou
+        rien) s'il y en a plusieurs, repli paquet par paquet si elle échoue.
+        Les résultats restent par paquet (success émis pour chacun)."""
+        start = time.monotonic()
+        results = {}
+        ready = [entry for entry in group if entry[4]]
+        if len(ready) > 1:
+            if install_staged_group(adb, [entry[4] for entry in ready], self.downgrade_flag):
+                results = dict.fromkeys((entry[0] for entry in ready), True)
+            else:
+                logging.warning(f"Multi-package install of {len(ready)} packages failed on "
+                                f"{self._device_name(serial)}, installing them one by one")
+        for i, pkg_name, version_code, remote_dir, remote_apks in group:
+            if i not in results:
+                results[i] = bool(remote_apks) and install_staged(adb, remote_apks, self.downgrade_flag)
+        self._stage_times[serial][1] += time.monotonic() - start
+
+        for i, pkg_name, version_code, remote_dir, remote_apks in group:
+            _remove_staged(adb, remote_dir)
+            self._record(serial, pkg_name, version_code, results[i])
+
+    def _record(self, serial, pkg_name: str, version_code: str, success: bool) -> None:
+        key = (pkg_name, version_code)
+        with self._lock:
+            self.results[serial][key] = success
+            self._done += 1
+            done = self._done
+            if success:
+                installed_on = self._installed_on[key] = self._installed_on.get(key, 0) + 1
+                self._installed += 1
+                self._device_installed[serial] += 1
+            device_installed = self._device_installed[serial]
+
+        device = self._device_name(serial)
+        if success:
+            logging.info(f"{pkg_name} v{version_code} : Installed on {device}")
+            self.device_success.emit(serial or "", pkg_name, version_code)
+            if installed_on == len(self.serials):
+                self.success.emit(pkg_name, version_code)
+        else:
+            self.error.emit(f"{pkg_name} v{version_code} : Failed on {device}")
+        self.device_progress.emit(serial or "", device_installed, len(self.install_list))
+
+        total = len(self.install_list) * len(self.serials)
+        self.progress.emit(
+            f"Installing {done}/{total} on {len(self.serials)} device(s), "
+            f"{self.throughput():.1f} apps/min - {device}: {pkg_name}",
+            int(done / total * 100),
+        )
+
+    def throughput(self) -> float:
+        """Installations réussies par minute, tous appareils confondus."""
+        elapsed = (self._end_time or time.monotonic()) - self._start_time
+        if elapsed <= 0:
+            return 0.0
+        return self._installed / elapsed * 60
+
+    def sequential_throughput(self) -> float:
+        """Estimation du mode séquentiel à partir des étages mesurés du pipeline :
+        transfert et installation mis bout à bout, sur l'appareil le plus lent."""
+        elapsed = max(push + install for push, install in self._stage_times.values())
+        if elapsed <= 0:
+            return 0.0
+        return self._installed / elapsed * 60
+
+    def summary(self) -> str:
+        total = len(self.install_list) * len(self.serials)
+        text = (f"Installation complete : {self._installed}/{total} "
+                f"on {len(self.serials)} device(s), {self.throughput():.1f} apps/min")
+        if self.pipelined:
+            text += f" (pipelined, sequential ~{self.sequential_throughput():.1f} apps/min)"
+        return text
+
+    def device_summary(self) -> str:
+        """Une ligne par appareil : installés / total, échecs."""
+        total = len(self.install_list)
+        lines = []
+        with self._lock:
+            for serial, results in self.results.items():
+                failed = sum(1 for ok in results.values() if not ok)
+                lines.append(f"{self._device_name(serial)} : {self._device_installed[serial]}/{total} installed, "
+                             f"{failed} failed")
+        return "\n".join(lines)
+
 class UninstallWorker(QThread):
     progress = pyqtSignal(str,int)
     success = pyqtSignal(str, str)
     error = pyqtSignal(str)
     finished = pyqtSignal()
+    cancelled = pyqtSignal()
 
-    def __init__(self, uninstall_list):
+    def __init__(self, uninstall_list, batched=BATCHED_UNINSTALL):
         super().__init__()
         self.uninstall_list = uninstall_list
+        self.batched = batched  # un seul shell adb pour tout le lot
+        self._cancel_requested = False
+
+    def request_cancel(self):
+        self._cancel_requested = True
+
+    def _stop_requested(self) -> bool:
+        return self._cancel_requested or self.isInterruptionRequested()
 
     def run(self):
         try:
             if not self.uninstall_list:
                 self.progress.emit("Nothing to uninstall", 100)
-                self.finished.emit()
                 return
 
             total = len(self.uninstall_list)
+            packages = [pkg_name for pkg_name, _ in self.uninstall_list]
+            if self.batched:
+                results = uninstall_packages_batched(packages, self._stop_requested)
+            else:
+                results = _uninstall_one_by_one(packages, self._stop_requested)
 
-            for i, (pkg_name, version_code) in enumerate(self.uninstall_list):
-                percent = int(i / total * 100)
+            for i, (pkg_name, success) in enumerate(results):
+                version_code = self.uninstall_list[i][1]
+                percent = int((i + 1) / total * 100)
                 self.progress.emit(f"Uninstalling {pkg_name} ({i+1}/{total})...",percent)
-                success = uninstall_package(pkg_name)
                 if success:
                     self.success.emit(pkg_name, version_code)
                     logging.info(f"Uninstalled {pkg_name} v{version_code}")
                 else:
                     self.error.emit(f"Failed {pkg_name} v{version_code}")
 
+            if self._stop_requested():
+                self.cancelled.emit()
+                return
             self.progress.emit("Uninstallation complete",100)
 
         except Exception as e:
@@ -103,6 +343,94 @@ def _resolve_local_backup_path(apk_dir: Path, info, pkg: str, vcode: str):
 
     return None
 
+def _select_target_devices(main_window) -> list[str]:
+    """Appareils cibles : le seul connecté, ou choix (un appareil / tous) si plusieurs.
+    Liste vide : aucun appareil ou choix annulé."""
+    serials = pahu.connected_devices()
+    if len(serials) <= 1:
+        return serials
+    all_devices = f"All connected devices ({len(serials)})"
+    choice, ok = QInputDialog.getItem(
+        main_window, "Target devices", "Install on :", [all_devices] + serials, 0, False)
+    if not ok:
+        return []
+    return serials if choice == all_devices else [choice]
+
+def preflight_reason(info, apk_path: Path, props: pahad.DeviceProps, batch_size: int = 0) -> str:
+    """Why the install would fail on this device ('' : compatible, or unknown).
+    batch_size: octets des paquets déjà retenus pour ce lot."""
+    if info.min_sdk and props.sdk and info.min_sdk > props.sdk:
+        return f"requires Android API {info.min_sdk}, device is API {props.sdk}"
+    if info.abis and props.abis and not set(info.abis.split(",")) & set(props.abis):
+        return f"native code for {info.abis} only, device supports {','.join(props.abis)}"
+    if props.free_data and batch_size + apk_path.stat().st_size > props.free_data:
+        return f"not enough free space on /data for the batch ({props.free_data // 2**20} MiB left)"
+    return ""
+
+def _preflight(main_window, install_list, serials) -> list:
+    """Retire de install_list les paquets voués à l'échec sur un des appareils cibles
+    (minSdk, ABI, espace libre pour le total du lot), avant tout transfert.
+    Propriétés relues à chaque lot. Raisons affichées dans la table."""
+    pkg_map = main_window.package_map
+    device_props = {}
+    for serial in serials:
+        try:
+            device_props[serial] = pahad.get_client(serial).device_props(refresh=True)
+        except (OSError, pahad.AdbError) as e:
+            logging.warning(f"Device properties unavailable for {serial}: {e}")
+
+    kept = []
+    reasons = {}
+    batch_size = 0  # octets des paquets retenus
+    for apk_path, pkg, vcode in install_list:
+        info = pkg_map.get(pkg, vcode)
+        for serial, props in device_props.items():
+            reason = preflight_reason(info, Path(apk_path), props, batch_size)
+            if reason:
+                reasons[(pkg, int(vcode))] = f"{serial}: {reason}" if len(serials) > 1 else reason
+                logging.warning(f"{pkg} v{vcode} skipped : {reasons[(pkg, int(vcode))]}")
+                break
+        else:
+            kept.append((apk_path, pkg, vcode))
+            batch_size += Path(apk_path).stat().st_size
+
+    main_window.table_adapter.set_rejected(reasons)
+    if reasons:
+        pahc.set_status(main_window, f"{len(reasons)} incompatible package(s) skipped (see table)")
+    return kept
+
+def _start_install_worker(main_window, install_list, tmp_dir, serials, downgrade_flag,
+                          action: str, finished_message: str, group_size: int = 1) -> None:
+    """Lance InstallWorker (install / update / downgrade) et branche l'UI."""
+    pahc.set_progress_determinate(main_window)
+    pahc.set_progress_value(main_window, 0)
+
+    worker = main_window.worker = InstallWorker(
+        install_list, tmp_dir, downgrade_flag=downgrade_flag, serials=serials, group_size=group_size)
+    worker.progress.connect(lambda msg, percent: (
+        pahc.set_status(main_window, msg),
+        pahc.set_progress_value(main_window, percent)
+        )
+    )
+    worker.device_progress.connect(
+        lambda serial, installed, total: pahc.set_progress_tooltip(main_window, worker.device_summary()))
+    worker.error.connect(lambda errmsg: pahc.on_action_failed(main_window, action, errmsg))
+    # PackageMap mis à jour dès la première installation réussie, même si
+    # d'autres appareils cibles échouent (success : tous les appareils)
+    worker.device_success.connect(
+        lambda serial, pkg_installed, vcode_installed: main_window.update_bus.post(
+            partial(_mark_installed, main_window), pkg_installed, vcode_installed))
+    worker.finished.connect(
+        lambda: (
+            main_window.update_bus.flush(),
+            pahc.set_status(main_window, f"{finished_message} - {worker.summary()}"),
+            pahc.reset_progress(main_window),
+            QTimer.singleShot(0, main_window.table_adapter.clear_selection)
+        )
+    )
+    # START WORKER SAFELY
+    QTimer.singleShot(50, worker.start)
+
 def on_install_clicked(main_window):
     logging.debug("on_install_clicked triggered")
 
@@ -116,13 +444,10 @@ def on_install_clicked(main_window):
     tmp_dir = Path(tempfile.mkdtemp())
     install_list = []  # List of (apk_path, package_name, version_code)
 
-    # Checking PackageMap instead of table
-    for (pkg, vcode_int), info in pkg_map.get_all_packages().items():
+    # UI STATE ONLY : sélection prise en une passe, données lues dans PackageMap
+    for pkg, vcode_int in main_window.table_adapter.checked_keys():
         vcode = str(vcode_int)
-
-        # UI STATE ONLY
-        if not main_window.table_adapter.is_checked(pkg, vcode):
-            continue
+        info = pkg_map.get_by_key((pkg, vcode_int))
 
         # model state (still valid)
         if info.android:
@@ -133,11 +458,7 @@ def on_install_clicked(main_window):
             logging.error(f"{pkg} v{vcode} : No local APK backup, skipping.")
             continue
 
-        newer_versions_installed = any(
-            (other_pkg == pkg and other_vcode_int > vcode_int and other_info.android)
-            for (other_pkg, other_vcode_int), other_info in pkg_map.get_all_packages().items()
-        )
-        if newer_versions_installed:
+        if pkg_map.has_newer_installed(pkg, vcode):
             logging.info(f"{pkg} v{vcode} : newer version installed, skipping")
             continue
 
@@ -152,49 +473,38 @@ def on_install_clicked(main_window):
         logging.info("No packages to install.")
         return
 
-    # UI INIT
-    pahc.set_progress_indeterminate(main_window)
-    pahc.set_status(main_window, "Starting installation via ADB (Unlocking may help) ...")
+    serials = _select_target_devices(main_window)
+    if not serials:
+        logging.info("No target device : installation canceled")
+        return
 
-    # 3 Lauching worker
-    main_window.worker = InstallWorker(install_list, tmp_dir, downgrade_flag=False)
-    main_window.worker.progress.connect(lambda msg: pahc.set_status(main_window, msg))
-    main_window.worker.error.connect(lambda errmsg: pahc.on_action_failed(main_window, "Install", errmsg))
-    main_window.worker.success.connect(
-        lambda pkg_installed, vcode_installed: _mark_installed(main_window, pkg_installed, vcode_installed))
-    main_window.worker.finished.connect(
-        lambda: (
-            pahc.set_status(main_window, "Installation finished"),
-            pahc.reset_progress(main_window),
-            QTimer.singleShot(0, main_window.table_adapter.clear_selection)
-        )
-    )
-    # 4 START WORKER SAFELY
-    QTimer.singleShot(50, main_window.worker.start)
+    install_list = _preflight(main_window, install_list, serials)
+    if not install_list:
+        logging.info("No compatible package to install.")
+        return
+
+    pahc.set_status(main_window, "Starting installation via ADB (Unlocking may help) ...")
+    _start_install_worker(main_window, install_list, tmp_dir, serials, False, "Install", "Installation finished",
+                          group_size=INSTALL_GROUP_SIZE)
 
 def _mark_installed(main_window, pkg: str, vcode: str) -> None:
+    """Applique une installation réussie au PackageMap (UI + sauvegarde : ModelUpdateBus)."""
     pkg_map = main_window.package_map
     target_vcode = int(vcode)
 
     if not pkg_map.exists(pkg, vcode):
         pkg_map.add(pkg, vcode, label="", android=True, local=False, checked=False)
 
-    for (other_pkg, other_vcode), info in pkg_map.get_all_packages().items():
-        if other_pkg != pkg:
-            continue
-
+    for other_vcode, info in pkg_map.get_versions(pkg):
         if other_vcode == target_vcode:
-            info.android = True
+            pkg_map.set_flags(pkg, str(other_vcode), android=True)
             main_window.table_adapter.set_checked(pkg, str(other_vcode), False)
-        else:
-            info.android = False
-
-    for (other_pkg, other_vcode), info in list(pkg_map.get_all_packages().items()):
-        if other_pkg == pkg and not info.local and not info.android:
-            pkg_map.remove(other_pkg, str(other_vcode))
+        elif info.android:
+            pkg_map.set_flags(pkg, str(other_vcode), android=False)
 
-    main_window.table_adapter.refresh()
-    pkg_map.save_to_file(pkg_map.get_save_file_path())
+    for other_vcode, info in pkg_map.get_versions(pkg):
+        if not info.local and not info.android:
+            pkg_map.remove(pkg, str(other_vcode))
 
 def on_update_clicked(main_window):
     logging.debug("Update clicked")
@@ -209,18 +519,12 @@ def on_update_clicked(main_window):
     tmp_dir = Path(tempfile.mkdtemp())
     update_list = []  # List of (apk_path, package_name, version_code)
 
-    for (pkg, vcode_int), info in pkg_map.get_all_packages().items():
+    for pkg, vcode_int in main_window.table_adapter.checked_keys():
         vcode = str(vcode_int)
-
-        if not main_window.table_adapter.is_checked(pkg, vcode):
-            continue
+        info = pkg_map.get_by_key((pkg, vcode_int))
 
         # On met à jour seulement si une version plus ancienne est déjà installée
-        older_installed = any(
-            other_pkg == pkg and other_vcode_int < vcode_int and other_info.android
-            for (other_pkg, other_vcode_int), other_info in pkg_map.get_all_packages().items()
-        )
-        if not older_installed:
+        if not pkg_map.has_older_installed(pkg, vcode):
             logging.info(f"{pkg} v{vcode}: No older version installed — skipping")
             continue
 
@@ -242,28 +546,19 @@ def on_update_clicked(main_window):
         logging.info("No packages to update.")
         return
 
-    pahc.set_progress_indeterminate(main_window)
-    pahc.set_status(main_window, "Starting update via ADB (Unlocking may help) ...")
+    serials = _select_target_devices(main_window)
+    if not serials:
+        logging.info("No target device : update canceled")
+        return
 
-    # Lauching worker
-    main_window.worker = InstallWorker(update_list, tmp_dir, downgrade_flag=False)
-    main_window.worker.progress.connect(lambda msg: pahc.set_status(main_window, msg))
-    main_window.worker.error.connect(
-        lambda errmsg: pahc.on_action_failed(main_window, "Update", errmsg)
-    )
-    main_window.worker.success.connect(
-        lambda pkg_updt, vcode_updt: _mark_installed(main_window, pkg_updt, vcode_updt)
-    )
-    main_window.worker.finished.connect(
-        lambda: (
-            pahc.set_status(main_window, "Update finished"),
-            pahc.reset_progress(main_window),
-            QTimer.singleShot(0, main_window.table_adapter.clear_selection)
-        )
-    )
+    update_list = _preflight(main_window, update_list, serials)
+    if not update_list:
+        logging.info("No compatible package to update.")
+        return
 
-    # 4 START WORKER SAFELY
-    QTimer.singleShot(50, main_window.worker.start)
+    pahc.set_status(main_window, "Starting update via ADB (Unlocking may help) ...")
+    _start_install_worker(main_window, update_list, tmp_dir, serials, False, "Update", "Update finished",
+                          group_size=INSTALL_GROUP_SIZE)
 
 
 def on_downgrade_clicked(main_window):
@@ -276,23 +571,16 @@ def on_downgrade_clicked(main_window):
     apk_dir = Path(__file__).parent / 'extracted_apks'
     tmp_dir = Path(tempfile.mkdtemp())
     downgrade_list = []  # List of (apk_path, package_name, version_code)
-    # Checking PackageMap instead of table
-    for (pkg, vcode_int), info in pkg_map.get_all_packages().items():
+    # Only checked packages
+    for pkg, vcode_int in main_window.table_adapter.checked_keys():
         vcode = str(vcode_int)
-
-        # Only checked packages
-        if not main_window.table_adapter.is_checked(pkg, vcode):
-            continue
+        info = pkg_map.get_by_key((pkg, vcode_int))
         if info.android:
             continue
         if not info.local:
             logging.error(f"{pkg} v{vcode} : No local Apk(s) file")
             continue
-        newer_versions_installed = any(
-            (other_pkg == pkg and other_vcode_int > vcode_int and other_info.android)
-            for (other_pkg, other_vcode_int), other_info in pkg_map.get_all_packages().items()
-        )
-        if not newer_versions_installed:
+        if not pkg_map.has_newer_installed(pkg, vcode):
             logging.info(
                 f"{pkg} v{vcode}: No newer installed version (or not at all)."
                 f"use the install function instead"
@@ -310,121 +598,211 @@ def on_downgrade_clicked(main_window):
         logging.info("No packages to downgrade.")
         return
 
-    # Displaying progress bar
-    pahc.set_progress_determinate(main_window)
-    pahc.set_progress_value(main_window, 0)
-    pahc.set_status(main_window, "Starting downgrade...")
-
-    # launching worker
-    main_window.worker = InstallWorker(downgrade_list, tmp_dir, downgrade_flag=True)
-    main_window.worker.progress.connect(lambda msg: pahc.set_status(main_window, msg))
-    main_window.worker.error.connect(lambda errmsg: pahc.on_action_failed(main_window, "Downgrade", errmsg))
-    main_window.worker.success.connect(
-        lambda pkg_downed, vcode_downed: _mark_installed(main_window, pkg_downed, vcode_downed))
+    serials = _select_target_devices(main_window)
+    if not serials:
+        logging.info("No target device : downgrade canceled")
+        return
 
-    main_window.worker.finished.connect(
-        lambda: (
-            pahc.set_status(main_window, "Installation finished"),
-            pahc.reset_progress(main_window),
-            QTimer.singleShot(0, main_window.table_adapter.clear_selection)
-        )
-    )
+    downgrade_list = _preflight(main_window, downgrade_list, serials)
+    if not downgrade_list:
+        logging.info("No compatible package to downgrade.")
+        return
 
-    # 4 START WORKER SAFELY
-    QTimer.singleShot(50, main_window.worker.start)
+    pahc.set_status(main_window, "Starting downgrade...")
+    _start_install_worker(main_window, downgrade_list, tmp_dir, serials, True, "Downgrade", "Downgrade finished")
 
-def install_package(file: Path, tmpdir: Path, down_flag) -> bool:
-    """Install an .apk or .apks file via adb. Returns True on success."""
+def install_package(file: Path, tmpdir: Path, down_flag, serial: str = None) -> bool:
+    """Install an .apk or .apks file via adb (on serial, or the default device). Returns True on success."""
     try:
+        adb = pahad.get_client(serial)
         if file.suffix == ".apk":
             if not down_flag:
-                logging.debug(f"ADB : adb install {file}")
-                process = subprocess.run(
-                    ["adb", "install", str(file)],
-                    capture_output=True,
-                    text=True,
-                )
+                logging.debug(f"ADB : install {file}")
+                process = adb.install(file)
             else:
                 logging.debug(f"Downgrade {file} : may be unstable")
-                logging.debug(f"ADB : adb push {file} /data/local/tmp")
-                subprocess.run(
-                    ["adb", "push", str(file), "/data/local/tmp"],
-                    capture_output=True,
-                    text=True,
-                )
-                logging.debug(f"ADB : adb shell su -c  pm install -r -d /data/local/tmp/{file.name}")
-                process = subprocess.run(
-                    ["adb", "shell", "su", "-c", f"pm install -r -d /data/local/tmp/{file.name}"],
-                    capture_output=True,
-                    text=True,
-                )
+                logging.debug(f"ADB : push {file} /data/local/tmp")
+                adb.push(file, "/data/local/tmp")
+                logging.debug(f"ADB : shell su -c  pm install -r -d /data/local/tmp/{file.name}")
+                process = adb.shell(["su", "-c", f"pm install -r -d /data/local/tmp/{file.name}"])
 
         elif file.suffix == ".apks":
-            logging.debug(f"apks file : preparing install-multiple")
-            pahu.clean_tmp_dir(tmpdir)
-            pahu.unzip_apks_to_tmpdir(file, tmpdir)
-            apks_list = [str(p) for p in tmpdir.glob("*.apk")]
-
-            if not down_flag:
-                logging.debug(f"ADB : adb install-multiple [...]")
-                process = subprocess.run(
-                    ["adb", "install-multiple"] + apks_list,
-                    capture_output=True,
-                    text=True,
-                )
-            else:
+            if down_flag:
                 logging.debug(f"Downgrade {file} : may be unstable")
-                logging.debug(f"ADB : adb push {file} /data/local/tmp")
-                subprocess.run(
-                    ["adb", "push", str(file), "/data/local/tmp"],
-                    capture_output=True,
-                    text=True,
-                )
-                logging.debug(f"ADB : adb shell su -c  pm install-multiple -r -d /data/local/tmp/{file.name}")
-                process = subprocess.run(
-                    ["adb", "shell", "su", "-c", f"pm install-multiple -r -d /data/local/tmp/{file.name}"],
-                    capture_output=True,
-                    text=True,
-                )
-            pahu.clean_tmp_dir(tmpdir)
+            logging.debug(f"ADB : pm install session for {file.name}")
+            process = _install_apks(adb, file, tmpdir, ["-r", "-d"] if down_flag else [], root=down_flag)
         else:
             logging.error(f"Unsupported file type: {file}")
             return False
 
-        out = (process.stdout or "").strip()
-        err = (process.stderr or "").strip()
+        return _install_succeeded(file.name, process)
+
+    except Exception as e:
+        logging.error(f"Install error for {file.name}: {e}")
+        return False
+
+def _install_succeeded(name: str, process) -> bool:
+    out = (process.stdout or "").strip()
+    err = (process.stderr or "").strip()
 
-        if out:
-            logging.debug(f"[adb stdout]\n{out}")
-        if err:
-            logging.debug(f"[adb stderr]\n{err}")
+    if out:
+        logging.debug(f"[adb stdout]\n{out}")
+    if err:
+        logging.debug(f"[adb stderr]\n{err}")
 
-        # adb can sent "Success" to stdout
-        if process.returncode == 0 and ("Success" in out or not err):
-            logging.debug(f"install successful")
-            return True
+    # adb can sent "Success" to stdout
+    if process.returncode == 0 and ("Success" in out or not err):
+        logging.debug(f"install successful")
+        return True
 
-        logging.error(f"Install failed for {file.name}: {out or err}")
+    logging.error(f"Install failed for {name}: {out or err}")
+    return False
+
+def _install_apks(adb, file: Path, tmpdir: Path, args: list[str], root: bool) -> pahad.ShellResult:
+    """Install an .apks bundle through a pm session. The splits are streamed from the
+    zip members over adb, nothing is written on the host ; bundles that are not zip
+    archives (7z) fall back to an extraction in tmpdir."""
+    try:
+        with zipfile.ZipFile(file) as apks:
+            members = _zip_splits(adb, file, apks)
+            if not members:
+                return pahad.ShellResult(1, "No .apk found inside the .apks archive.")
+            logging.debug(f"{file.name}: {len(members)} splits streamed from the archive")
+            return adb.install_session(
+                [(Path(m.filename).name, m.file_size, partial(apks.open, m)) for m in members],
+                args, root=root)
+    except zipfile.BadZipFile:
+        logging.debug(f"{file.name}: not a zip archive, 7z fallback")
+
+    pahu.clean_tmp_dir(tmpdir)
+    try:
+        pahu.unzip_apks_to_tmpdir(file, tmpdir)
+        apks_list = _extracted_splits(adb, file, tmpdir)
+        if not apks_list:
+            return pahad.ShellResult(1, "No .apk found inside the .apks archive.")
+        return adb.install_session(
+            [(apk.name, apk.stat().st_size, partial(open, apk, "rb")) for apk in apks_list],
+            args, root=root)
+    finally:
+        pahu.clean_tmp_dir(tmpdir)
+
+def stage_package(adb, file: Path, remote_dir: str, tmpdir: Path) -> list[str]:
+    """Push an .apk, or the splits of an .apks, to remote_dir on the device.
+    Splits are streamed from the zip members (7z fallback through tmpdir).
+    Returns the remote .apk paths, base first."""
+    adb.shell(["mkdir", "-p", remote_dir])
+    if file.suffix == ".apk":
+        remote = f"{remote_dir}/base.apk"
+        with open(file, "rb") as f:
+            adb.push_stream(f, remote)
+        return [remote]
+    if file.suffix != ".apks":
+        logging.error(f"Unsupported file type: {file}")
+        return []
+
+    remote_apks = []
+    try:
+        with zipfile.ZipFile(file) as apks:
+            members = _zip_splits(adb, file, apks)
+            for index, member in enumerate(members):
+                remote = f"{remote_dir}/{index}_{Path(member.filename).name}"
+                with apks.open(member) as f:
+                    adb.push_stream(f, remote)
+                remote_apks.append(remote)
+        return remote_apks
+    except zipfile.BadZipFile:
+        logging.debug(f"{file.name}: not a zip archive, 7z fallback")
+
+    pahu.clean_tmp_dir(tmpdir)
+    try:
+        pahu.unzip_apks_to_tmpdir(file, tmpdir)
+        apks_list = _extracted_splits(adb, file, tmpdir)
+        for index, apk in enumerate(apks_list):
+            remote = f"{remote_dir}/{index}_{apk.name}"
+            with open(apk, "rb") as f:
+                adb.push_stream(f, remote)
+            remote_apks.append(remote)
+    finally:
+        pahu.clean_tmp_dir(tmpdir)
+    return remote_apks
+
+def install_staged(adb, remote_apks: list[str], down_flag) -> bool:
+    """Install a package already pushed by stage_package(). Returns True on success."""
+    name = remote_apks[0].rsplit("/", 2)[-2]
+    try:
+        if down_flag:
+            logging.debug(f"ADB : su -c pm install session -r -d {name} (staged)")
+            process = adb.install_staged(remote_apks, ["-r", "-d"], root=True)
+        else:
+            logging.debug(f"ADB : pm install session {name} (staged)")
+            process = adb.install_staged(remote_apks)
+        return _install_succeeded(name, process)
+    except Exception as e:
+        logging.error(f"Install error for staged {name}: {e}")
         return False
 
+def install_staged_group(adb, packages: list[list[str]], down_flag) -> bool:
+    """Install several staged packages in one atomic multi-package session. Returns True on success."""
+    try:
+        logging.debug(f"ADB : pm install-create --multi-package ({len(packages)} packages, staged)")
+        if down_flag:
+            process = adb.install_staged_multi(packages, ["-r", "-d"], root=True)
+        else:
+            process = adb.install_staged_multi(packages)
+        return _install_succeeded(f"multi-package group of {len(packages)}", process)
     except Exception as e:
-        logging.error(f"Install error for {file.name}: {e}")
+        logging.error(f"Multi-package install error: {e}")
         return False
 
+def _free_data(adb) -> int:
+    """Espace libre sur /data (octets), 0 si inconnu."""
+    try:
+        return adb.device_props().free_data
+    except (OSError, pahad.AdbError) as e:
+        logging.debug(f"Free space unavailable: {e}")
+        return 0
+
+def _remove_staged(adb, remote_path: str) -> None:
+    try:
+        adb.shell(["rm", "-rf", remote_path])
+    except Exception as e:
+        logging.debug(f"Staging cleanup failed for {remote_path}: {e}")
+
+def _zip_splits(adb, file: Path, apks: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    """Split members of an opened .apks to install on the device, base first."""
+    return _select_splits(adb, file, [
+        (pahmf.read_split_name(apks, member), member) for member in pahmf.list_split_members(apks)])
+
+def _extracted_splits(adb, file: Path, tmpdir: Path) -> list[Path]:
+    """Same as _zip_splits() for the splits extracted in tmpdir by the 7z fallback."""
+    return _select_splits(adb, file, [
+        (pahmf.read_split_name_from_file(apk), apk) for apk in pahmf.list_split_files(tmpdir)])
+
+def _select_splits(adb, file: Path, named_splits: list) -> list:
+    """Base + splits matching the device config (ABI, density, locales) : the unused
+    config splits are neither transferred nor installed. All splits if the device
+    properties are unavailable."""
+    try:
+        props = adb.device_props()
+    except (OSError, pahad.AdbError) as e:
+        logging.debug(f"Device properties unavailable ({e}), installing every split of {file.name}")
+        return [item for _, item in named_splits]
+    selected = pahmf.select_splits(named_splits, props.abis, props.density, props.languages)
+    if len(selected) < len(named_splits):
+        logging.debug(f"{file.name}: {len(selected)}/{len(named_splits)} splits selected for the device")
+    return selected
+
 def _mark_uninstalled(main_window, pkg: str, vcode: str) -> None:
+    """Applique une désinstallation réussie au PackageMap (UI + sauvegarde : ModelUpdateBus)."""
     pkg_map = main_window.package_map
-    target_vcode = str(vcode)
-
-    for (other_pkg, other_vcode), info in pkg_map.get_all_packages().items():
-        if other_pkg == pkg and str(other_vcode) == target_vcode:
-            info.android = False
+    info = pkg_map.get(pkg, vcode)
 
-            # 🔥 si plus rien ne justifie l'existence
-            if not info.local:
-                pkg_map.remove(other_pkg, other_vcode)
+    if info:
+        pkg_map.set_flags(pkg, vcode, android=False)
 
-    main_window.table_adapter.refresh()
-    pkg_map.save_to_file(pkg_map.get_save_file_path())
+        # 🔥 si plus rien ne justifie l'existence
+        if not info.local:
+            pkg_map.remove(pkg, vcode)
 
 def on_uninstall_clicked(main_window, invert=False):
     logging.debug("Uninstall clicked")
@@ -433,20 +811,20 @@ def on_uninstall_clicked(main_window, invert=False):
         logging.error("\nNo adb connection detected : operation canceled")
         return 1
 
-    uninstall_list = []
-
-    # Checking PackageMap instead of table
-    for (pkg, vcode_int), info in main_window.package_map.get_all_packages().items():
-        vcode = str(vcode_int)
-        is_installed = info.android
-        is_checked = main_window.table_adapter.is_checked(pkg, vcode)
-
-        should_uninstall = (
-                (not invert and is_installed and is_checked) or
-                (invert and is_installed and not is_checked)
-        )
-        if should_uninstall:
-            uninstall_list.append((pkg, vcode))
+    pkg_map = main_window.package_map
+    checked_keys = main_window.table_adapter.checked_keys()
+    if not invert:
+        uninstall_list = [
+            (pkg, str(vcode_int)) for pkg, vcode_int in checked_keys
+            if pkg_map.get_by_key((pkg, vcode_int)).android
+        ]
+    else:
+        # Keep only : tout ce qui est installé et non coché
+        checked = set(checked_keys)
+        uninstall_list = [
+            (pkg, str(vcode_int)) for (pkg, vcode_int), info in pkg_map.items()
+            if info.android and (pkg, vcode_int) not in checked
+        ]
 
     if not uninstall_list:
         logging.info("No package to uninstall.")
@@ -465,11 +843,13 @@ def on_uninstall_clicked(main_window, invert=False):
         )
     )
     main_window.worker.success.connect(
-        lambda pkg_name_del, vcode_del: _mark_uninstalled(main_window, pkg_name_del, vcode_del))
+        lambda pkg_name_del, vcode_del: main_window.update_bus.post(
+            partial(_mark_uninstalled, main_window), pkg_name_del, vcode_del))
     main_window.worker.error.connect(
         lambda errmsg: pahc.on_action_failed(main_window, "Uninstall", errmsg))
     main_window.worker.finished.connect(
         lambda: (
+            main_window.update_bus.flush(),
             pahc.set_status(main_window, "Uninstall finished"),
             pahc.reset_progress(main_window),
             QTimer.singleShot(0, main_window.table_adapter.clear_selection)
@@ -481,40 +861,58 @@ def on_uninstall_clicked(main_window, invert=False):
 def uninstall_package(package_name: str) -> bool:
     """Uninstall an app via adb using its package name. Returns True on success."""
     try:
-        process = subprocess.run(
-            ["adb", "uninstall", package_name],
-            capture_output=True,
-            text=True
-        )
+        process = pahad.get_client().uninstall(package_name)
+        return _uninstall_succeeded(package_name, process)
+
+    except Exception as e:
+        logging.error(f"Uninstall exception for {package_name}: {e}")
+        return False
 
-        output = (process.stdout or "").strip()
-        error = (process.stderr or "").strip()
+def uninstall_packages_batched(package_names: list[str], should_stop=None):
+    """Uninstall apps through one long-lived adb shell ('Success' / 'Failure [...]' per command).
+    Yields (package_name, success) ; should_stop() is checked between commands.
+    If the session breaks, the remaining packages are uninstalled one by one."""
+    done = 0
+    try:
+        for package_name, process in pahad.get_client().uninstall_many(package_names, should_stop):
+            done += 1
+            yield package_name, _uninstall_succeeded(package_name, process)
+        return
+    except (OSError, pahad.AdbError) as e:
+        logging.error(f"Uninstall session error: {e}, going on one package at a time")
+    yield from _uninstall_one_by_one(package_names[done:], should_stop)
 
-        logging.debug(f"[adb uninstall stdout] {output}")
-        if error:
-            logging.debug(f"[adb uninstall stderr] {error}")
+def _uninstall_one_by_one(package_names: list[str], should_stop=None):
+    for package_name in package_names:
+        if should_stop is not None and should_stop():
+            return
+        yield package_name, uninstall_package(package_name)
 
-        if process.returncode == 0 and "Success" in output:
-            return True
+def _uninstall_succeeded(package_name: str, process) -> bool:
+    output = (process.stdout or "").strip()
+    error = (process.stderr or "").strip()
 
-        logging.error(f"Uninstall failed for {package_name}: {output or error}")
-        return False
+    logging.debug(f"[adb uninstall stdout] {output}")
+    if error:
+        logging.debug(f"[adb uninstall stderr] {error}")
 
-    except Exception as e:
-        logging.error(f"Uninstall exception for {package_name}: {e}")
-        return False
+    if process.returncode == 0 and "Success" in output:
+        return True
+
+    logging.error(f"Uninstall failed for {package_name}: {output or error}")
+    return False
 
 ## NOT USED
 def uninstall_package_from_list(del_list: list[str], installed_list: list[str]) -> None:
     """Uninstall packages in both del_list (marked to uninstall) and installed_list (present on the device)."""
     for pkg in del_list:
         if pkg in installed_list:
-            subprocess.run(["adb", "uninstall", pkg])
+            pahad.get_client().uninstall(pkg)
 ## NOT USED
 def uninstall_package_not_in_list(keep_list: list[str], installed_list: list[str]) -> None:
     """Uninstall packages not in keep_list from installed_list."""
     for pkg in installed_list:
         if pkg not in keep_list:
-            subprocess.run(["adb", "uninstall", pkg])
+            pahad.get_client().uninstall(pkg)
 
 
@@ -9,11 +9,13 @@ from PyQt5.QtCore import QTimer, Qt, QModelIndex, QItemSelectionModel
 from PyQt5.QtGui import QKeySequence
 from PyQt5.QtWidgets import QHeaderView, QMainWindow, QApplication, QShortcut, QFileDialog
 from functools import partial
+from pathlib import Path
 
 import pah_scan as pahsc
 import pah_install as pahi
 import pah_import as pahimp
 import pah_data as pahd
+import pah_store as pahst
 import pah_viewer as pahvw
 import pah_callbacks as pahc
 
@@ -35,21 +37,18 @@ class MainWindow(QMainWindow):
 
         # --- PackageMap centralisé ---
         self.package_map = pahd.PackageMap()
-
-        # Charger les données sauvegardées depuis le JSON
-        save_file = self.package_map.get_save_file_path()
-        loaded_count = self.package_map.load_from_file(save_file)
-        if loaded_count > 0:
-            logging.info(f"Loaded {loaded_count} packages from save file")
+        if pahd.STORAGE_BACKEND == "sqlite":
+            self.package_map.attach_store(pahst.SqlitePackageStore())
+        else:
+            self.package_map.attach_store(pahst.JsonPackageStore())
 
         # --- Init PackageTableAdapter ---
         self.table_adapter = pahvw.PackageTableAdapter(
             self.tableWidget_2,
             self.package_map
         )
-
-        # Rafraîchir la table pour afficher les données chargées
-        self.table_adapter.refresh()
+        # Bus de mises à jour des workers (application groupée, ~10 Hz)
+        self.update_bus = pahvw.ModelUpdateBus(self.package_map, self.table_adapter)
 
         # Connection lineEdit_search
         self.lineEdit_search.textChanged.connect(
@@ -77,6 +76,7 @@ class MainWindow(QMainWindow):
         self.actionRefresh.triggered.connect(lambda: self.table_adapter.refresh())
         self.actionClear_filter.triggered.connect(lambda: self.clear_filter())
         self.actionExport_table.triggered.connect(lambda: self.on_export_clicked())
+        self.actionExport_json.triggered.connect(lambda: self.on_export_json_clicked())
         self.actionClose.triggered.connect(lambda: self.close_window())
 
         # Edit
@@ -117,20 +117,43 @@ class MainWindow(QMainWindow):
         # --- Display window ---
         self.show()
 
-        # --- Initial scan ---
+        # --- Chargement différé par pages (la fenêtre s'affiche avant la lecture du stockage),
+        # puis scan initial une fois le PackageMap complet ---
         QTimer.singleShot(
             0,
-            lambda: pahsc.on_scan_device_clicked(
-                self,
-                scan_android=True,
-                scan_local=True,
+            lambda: self.load_package_map(
+                then=lambda: pahsc.on_scan_device_clicked(
+                    self,
+                    scan_android=True,
+                    scan_local=True,
+                ),
             ),
         )
 
     # Initialization methods
+    def load_package_map(self, then=None) -> None:
+        """Charge le PackageMap une page par tour de boucle d'événements."""
+        pages = self.package_map.iter_load()
+        loaded_count = 0
+
+        def next_page():
+            nonlocal loaded_count
+            page_count = next(pages, None)
+            if page_count is not None:
+                loaded_count = page_count
+                pahc.set_status(self, f"Loading packages... {loaded_count}")
+                QTimer.singleShot(0, next_page)
+                return
+            if loaded_count > 0:
+                logging.info(f"Loaded {loaded_count} packages from save file")
+            self.table_adapter.refresh()
+            if then is not None:
+                then()
+
+        next_page()
+
 
     def init_main_tablewidget(self) -> None:
-        self.tableWidget_2.setSortingEnabled(False)
         self.tableWidget_2.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.tableWidget_2.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
 
@@ -194,15 +217,19 @@ class MainWindow(QMainWindow):
             sel.setCurrentIndex(QModelIndex(), QItemSelectionModel.NoUpdate)
 
     def close_window(self):
+        self.close()  # arrêt et sauvegarde : closeEvent
+
+    def closeEvent(self, event):
+        """Toute fermeture (menu, bouton de titre, Alt-F4) : arrêt du worker puis
+        sauvegarde du PackageMap (flush des écritures différées)."""
         if hasattr(self, "worker") and self.worker.isRunning():
             self.worker.requestInterruption()
             self.worker.wait()
-        
-        # Sauvegarder PackageMap avant de fermer
-        save_file = self.package_map.get_save_file_path()
-        self.package_map.save_to_file(save_file)
-        
-        self.close()
+
+        self.update_bus.flush()
+        self.package_map.save()
+        self.package_map.store.close()
+        super().closeEvent(event)
 
     def on_export_clicked(self):
         options = QFileDialog.Options()
@@ -233,6 +260,20 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logging.error(f"\nError during CSV export:\n{e}")
 
+    def on_export_json_clicked(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export data (JSON)",
+            "",
+            "JSON Files (*.json);;All files (*)",
+        )
+        if not file_path:
+            return  # User canceled
+        if not file_path.lower().endswith('.json'):
+            file_path += '.json'
+        # Même format que packagemap.json (réimportable)
+        self.package_map.save_to_file(Path(file_path))
+
     def on_explore_apk_clicked(self):
         from pathlib import Path
         dir_path = Path(__file__).parent / 'extracted_apks'
@@ -0,0 +1,633 @@
+import io
+import logging
+import struct
+import zipfile
+
+from pathlib import Path
+
+import pah_utils as pahu
+
+# === Binary AndroidManifest.xml / resources.arsc reader ===
+# In-process replacement for 'aapt dump badging' (package, versionCode, label).
+
+ANDROID_NS = "http://schemas.android.com/apk/res/android"
+
+# Chunk types (ResourceTypes.h)
+RES_STRING_POOL_TYPE = 0x0001
+RES_TABLE_TYPE = 0x0002
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+RES_TABLE_PACKAGE_TYPE = 0x0200
+RES_TABLE_TYPE_TYPE = 0x0201
+
+# Res_value data types
+TYPE_REFERENCE = 0x01
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+
+# Android attribute resource ids (used when attribute names are stripped)
+ATTR_IDS = {
+    0x01010001: "label",
+    0x0101021b: "versionCode",
+    0x0101020c: "minSdkVersion",
+}
+
+NO_INDEX = 0xFFFFFFFF
+UTF8_FLAG = 0x100
+
+
+class ManifestError(pahu.PAHError):
+    """Raised when a binary manifest or resource table cannot be decoded."""
+    pass
+
+
+class StringPool:
+    """ResStringPool chunk, decoded lazily."""
+
+    def __init__(self, data: bytes, offset: int):
+        _, header_size, self.size = struct.unpack_from("<HHI", data, offset)
+        count, _, flags, strings_start, _ = struct.unpack_from("<IIIII", data, offset + 8)
+        self._data = data
+        self._utf8 = bool(flags & UTF8_FLAG)
+        self._strings_start = offset + strings_start
+        self._offsets = struct.unpack_from(f"<{count}I", data, offset + header_size)
+        self._cache: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def get(self, index: int) -> str:
+        if index == NO_INDEX or index >= len(self._offsets):
+            return ""
+        cached = self._cache.get(index)
+        if cached is not None:
+            return cached
+        pos = self._strings_start + self._offsets[index]
+        data = self._data
+        if self._utf8:
+            # utf16 length then utf8 byte length, each on 1 or 2 bytes
+            if data[pos] & 0x80:
+                pos += 2
+            else:
+                pos += 1
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 2
+            else:
+                pos += 1
+            value = data[pos:pos + length].decode("utf-8", errors="replace")
+        else:
+            length = struct.unpack_from("<H", data, pos)[0]
+            if length & 0x8000:
+                low = struct.unpack_from("<H", data, pos + 2)[0]
+                length = ((length & 0x7FFF) << 16) | low
+                pos += 4
+            else:
+                pos += 2
+            value = data[pos:pos + length * 2].decode("utf-16-le", errors="replace")
+        self._cache[index] = value
+        return value
+
+
+def iter_xml_elements(data: bytes):
+    """Yield (tag, attrs) for every start element of a binary XML document.
+    attrs: {name: (data_type, data, string_value)}
+    """
+    try:
+        chunk_type, header_size, total = struct.unpack_from("<HHI", data, 0)
+    except struct.error as e:
+        raise ManifestError(f"Truncated binary XML: {e}") from e
+    if chunk_type != RES_XML_TYPE:
+        raise ManifestError(f"Not a binary XML document (chunk type {chunk_type:#x})")
+
+    strings = None
+    resource_ids: tuple = ()
+    offset = header_size
+    end = min(total, len(data))
+    while offset + 8 <= end:
+        chunk_type, header_size, size = struct.unpack_from("<HHI", data, offset)
+        if size < 8:
+            raise ManifestError(f"Invalid chunk size {size} at {offset}")
+
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = StringPool(data, offset)
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            count = (size - header_size) // 4
+            resource_ids = struct.unpack_from(f"<{count}I", data, offset + header_size)
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            if strings is None:
+                raise ManifestError("Start element before string pool")
+            ext = offset + header_size
+            _, name_idx, attr_start, attr_size, attr_count = struct.unpack_from("<IIHHH", data, ext)
+            attrs = {}
+            attr_offset = ext + attr_start
+            for _ in range(attr_count):
+                _, a_name, a_raw, _, _, a_type, a_data = struct.unpack_from("<IIIHBBI", data, attr_offset)
+                attr_offset += attr_size
+                name = strings.get(a_name)
+                if a_name < len(resource_ids) and resource_ids[a_name] in ATTR_IDS:
+                    name = ATTR_IDS[resource_ids[a_name]]
+                if not name:
+                    continue
+                if a_raw != NO_INDEX:
+                    value = strings.get(a_raw)
+                elif a_type == TYPE_STRING:
+                    value = strings.get(a_data)
+                else:
+                    value = ""
+                attrs[name] = (a_type, a_data, value)
+            yield strings.get(name_idx), attrs
+
+        offset += size
+
+
+class ResourceTable:
+    """Minimal resources.arsc reader : resolves a resource id to a simple value."""
+
+    def __init__(self, data: bytes):
+        chunk_type, header_size, total = struct.unpack_from("<HHI", data, 0)
+        if chunk_type != RES_TABLE_TYPE:
+            raise ManifestError(f"Not a resource table (chunk type {chunk_type:#x})")
+        self._data = data
+        self.strings = None
+        self._packages: dict[int, int] = {}  # package id -> chunk offset
+
+        offset = header_size
+        end = min(total, len(data))
+        while offset + 8 <= end:
+            chunk_type, _, size = struct.unpack_from("<HHI", data, offset)
+            if size < 8:
+                break
+            if chunk_type == RES_STRING_POOL_TYPE and self.strings is None:
+                self.strings = StringPool(data, offset)
+            elif chunk_type == RES_TABLE_PACKAGE_TYPE:
+                package_id = struct.unpack_from("<I", data, offset + 8)[0]
+                self._packages[package_id] = offset
+            offset += size
+
+    def _entry_offset(self, chunk: int, header_size: int, entry_id: int) -> int | None:
+        """Entry offset (relative to entriesStart) in a type chunk, or None."""
+        data = self._data
+        flags = data[chunk + 9]
+        entry_count, = struct.unpack_from("<I", data, chunk + 12)
+        index_start = chunk + header_size
+        if flags & 0x01:  # FLAG_SPARSE : (idx, offset / 4) pairs
+            for i in range(entry_count):
+                idx, off = struct.unpack_from("<HH", data, index_start + i * 4)
+                if idx == entry_id:
+                    return off * 4
+            return None
+        if entry_id >= entry_count:
+            return None
+        if flags & 0x02:  # FLAG_OFFSET16
+            off, = struct.unpack_from("<H", data, index_start + entry_id * 2)
+            return None if off == 0xFFFF else off * 4
+        off, = struct.unpack_from("<I", data, index_start + entry_id * 4)
+        return None if off == NO_INDEX else off
+
+    def _values(self, res_id: int):
+        """Yield (language, data_type, data) for each configuration of res_id."""
+        data = self._data
+        package_chunk = self._packages.get(res_id >> 24)
+        if package_chunk is None:
+            return
+        type_id = (res_id >> 16) & 0xFF
+        entry_id = res_id & 0xFFFF
+
+        _, header_size, size = struct.unpack_from("<HHI", data, package_chunk)
+        offset = package_chunk + header_size
+        end = package_chunk + size
+        while offset + 8 <= end:
+            chunk_type, chunk_header, chunk_size = struct.unpack_from("<HHI", data, offset)
+            if chunk_size < 8:
+                break
+            if chunk_type == RES_TABLE_TYPE_TYPE and data[offset + 8] == type_id:
+                entry_off = self._entry_offset(offset, chunk_header, entry_id)
+                if entry_off is not None:
+                    entries_start, = struct.unpack_from("<I", data, offset + 16)
+                    entry = offset + entries_start + entry_off
+                    e_size, e_flags = struct.unpack_from("<HH", data, entry)
+                    language = data[offset + 28:offset + 30]
+                    if e_flags & 0x0008:  # FLAG_COMPACT
+                        yield language, e_flags >> 8, struct.unpack_from("<I", data, entry + 4)[0]
+                    elif not e_flags & 0x0001:  # FLAG_COMPLEX entries are not simple values
+                        _, _, v_type, v_data = struct.unpack_from("<HBBI", data, entry + e_size)
+                        yield language, v_type, v_data
+            offset += chunk_size
+
+    def resolve_string(self, res_id: int, depth: int = 0) -> str:
+        """Resolve a string resource, preferring the default configuration."""
+        if depth > 5 or self.strings is None:
+            return ""
+        fallback = ""
+        for language, v_type, v_data in self._values(res_id):
+            if v_type == TYPE_STRING:
+                value = self.strings.get(v_data)
+            elif v_type == TYPE_REFERENCE:
+                value = self.resolve_string(v_data, depth + 1)
+            else:
+                continue
+            if language == b"\x00\x00" and value:
+                return value
+            fallback = fallback or value
+        return fallback
+
+
+def _attr_int(attr) -> str:
+    if not attr:
+        return ""
+    a_type, a_data, value = attr
+    if a_type in (TYPE_INT_DEC, TYPE_INT_HEX):
+        return str(a_data)
+    return value.strip()
+
+
+def read_manifest(apk: zipfile.ZipFile, resolve_label: bool = True) -> dict:
+    """Decode AndroidManifest.xml of an opened APK.
+    Returns a dict with package, versionCode, label (resolved), split and minSdk.
+    """
+    try:
+        manifest = apk.read("AndroidManifest.xml")
+    except KeyError as e:
+        raise ManifestError("AndroidManifest.xml not found") from e
+
+    info = {"package": "", "versionCode": "", "label": "", "split": "", "minSdk": ""}
+    label_attr = None
+    try:
+        for tag, attrs in iter_xml_elements(manifest):
+            if tag == "manifest":
+                info["package"] = attrs.get("package", (0, 0, ""))[2]
+                info["versionCode"] = _attr_int(attrs.get("versionCode"))
+                info["split"] = attrs.get("split", (0, 0, ""))[2]
+            elif tag == "uses-sdk":
+                info["minSdk"] = _attr_int(attrs.get("minSdkVersion"))
+            elif tag == "application":
+                label_attr = attrs.get("label")
+                break
+    except (struct.error, IndexError) as e:
+        raise ManifestError(f"Corrupted binary manifest: {e}") from e
+
+    if label_attr and resolve_label:
+        a_type, a_data, value = label_attr
+        if a_type == TYPE_REFERENCE:
+            info["label"] = _resolve_label(apk, a_data)
+        else:
+            info["label"] = value
+    return info
+
+
+def _resolve_label(apk: zipfile.ZipFile, res_id: int) -> str:
+    try:
+        table = ResourceTable(apk.read("resources.arsc"))
+        return table.resolve_string(res_id)
+    except KeyError:
+        return ""
+    except (struct.error, IndexError, ManifestError) as e:
+        logging.debug(f"resources.arsc unreadable: {e}")
+        return ""
+
+
+def read_pkg_version_label(apk_file) -> tuple[str, str, str]:
+    """In-process equivalent of parse_aapt_output(aapt dump badging).
+    Args:
+        apk_file: Path or seekable file object of an .apk
+    Returns:
+        Tuple of (package_name, version_code, label).
+    Raises:
+        ManifestError if the archive or manifest cannot be decoded.
+    """
+    try:
+        with zipfile.ZipFile(apk_file) as apk:
+            info = read_manifest(apk)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ManifestError(f"Unable to open {apk_file}: {e}") from e
+    return info["package"], info["versionCode"], info["label"]
+
+
+class _MemberView(io.RawIOBase):
+    """Bounded, seekable, read-only view of a byte range of the outer archive file."""
+
+    def __init__(self, fp, offset: int, size: int):
+        super().__init__()
+        self._fp = fp
+        self._offset = offset
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += self._size
+        self._pos = min(max(pos, 0), self._size)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._size - self._pos)
+        if size <= 0:
+            return 0
+        self._fp.seek(self._offset + self._pos)
+        data = self._fp.read(size)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def _member_data_offset(apks: zipfile.ZipFile, member: zipfile.ZipInfo) -> int:
+    """Offset of the member data in the outer file, after its local file header."""
+    apks.fp.seek(member.header_offset)
+    header = apks.fp.read(30)
+    if len(header) != 30 or header[:4] != b"PK\x03\x04":
+        raise zipfile.BadZipFile(f"Bad local file header for {member.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    return member.header_offset + 30 + name_length + extra_length
+
+
+def open_nested_apk(apks: zipfile.ZipFile, member: zipfile.ZipInfo) -> zipfile.ZipFile:
+    """Open an .apk stored inside an .apks without extracting it to disk.
+    Stored members are read in place through a bounded view of the outer file
+    (only the central directory and the entries actually read are fetched),
+    compressed members are inflated in memory.
+    """
+    if member.compress_type == zipfile.ZIP_STORED and not member.flag_bits & 0x1:
+        offset = _member_data_offset(apks, member)
+        return zipfile.ZipFile(_MemberView(apks.fp, offset, member.compress_size))
+    return zipfile.ZipFile(io.BytesIO(apks.read(member)))
+
+
+def _split_paths(paths: list[str]) -> list[str]:
+    """Split .apk paths of a bundle, base.apk (manifest carrier) first :
+    bundletool's splits/ directory, else the top-level .apk files (flat bundles).
+    standalones/ and universal.apk are full APKs, not splits : universal.apk is only
+    kept when the archive holds nothing else (bundletool --mode=universal)."""
+    apk_paths = [path for path in paths if path.endswith(".apk")]
+    selected = [path for path in apk_paths if path.startswith("splits/")]
+    if not selected:
+        selected = [path for path in apk_paths if "/" not in path and path != "universal.apk"]
+    if not selected:
+        selected = [path for path in apk_paths if path == "universal.apk"]
+
+    def rank(path: str):
+        name = Path(path).name
+        if name == "base.apk" or name.startswith("base-master"):
+            return 0, name
+        if name.startswith("base"):
+            return 1, name
+        return 2, name
+
+    return sorted(selected, key=rank)
+
+
+def list_split_members(apks: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    """List the split .apk members of an .apks, base.apk first (see _split_paths)."""
+    members = {m.filename: m for m in apks.infolist() if not m.is_dir()}
+    return [members[path] for path in _split_paths(list(members))]
+
+
+def list_split_files(directory: Path) -> list[Path]:
+    """Same as list_split_members() for an .apks extracted in directory (7z fallback)."""
+    paths = [path.relative_to(directory).as_posix() for path in directory.rglob("*.apk") if path.is_file()]
+    return [directory / path for path in _split_paths(paths)]
+
+
+def read_apks_pkg_version_label(apks_file) -> tuple[str, str, str]:
+    """In-place reader for .apks bundles : nothing is written to disk.
+    Reads base.apk first, then the other splits until package, versionCode
+    and label are all known.
+    Raises:
+        ManifestError if the bundle cannot be opened or holds no .apk.
+    """
+    package_name = version_code = label = ""
+    try:
+        with zipfile.ZipFile(apks_file) as apks:
+            members = list_split_members(apks)
+            if not members:
+                raise ManifestError("No .apk found inside the .apks archive.")
+            for member in members:
+                try:
+                    with open_nested_apk(apks, member) as apk:
+                        info = read_manifest(apk)
+                except (zipfile.BadZipFile, ManifestError) as e:
+                    logging.debug(f"{member.filename}: {e}")
+                    continue
+                package_name = package_name or info["package"]
+                version_code = version_code or info["versionCode"]
+                label = label or info["label"]
+                if package_name and version_code and label:
+                    break
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ManifestError(f"Unable to open {apks_file}: {e}") from e
+    return package_name, version_code, label
+
+
+def _native_abis(apk: zipfile.ZipFile) -> set[str]:
+    """ABIs with native libraries (lib/<abi>/...) in an APK."""
+    return {name.split("/")[1] for name in apk.namelist() if name.startswith("lib/") and name.count("/") >= 2}
+
+
+def _min_sdk(apk: zipfile.ZipFile) -> int:
+    try:
+        min_sdk = read_manifest(apk, resolve_label=False)["minSdk"]
+    except ManifestError as e:
+        logging.debug(f"minSdkVersion unavailable: {e}")
+        return 0
+    return int(min_sdk) if min_sdk.isdigit() else 0
+
+
+# === Split selection (ABI / density / language config splits) ===
+
+ABI_QUALIFIERS = {
+    "armeabi": "armeabi", "armeabi_v7a": "armeabi-v7a", "arm64_v8a": "arm64-v8a",
+    "x86": "x86", "x86_64": "x86_64", "mips": "mips", "mips64": "mips64",
+}
+DENSITY_QUALIFIERS = {
+    "ldpi": 120, "mdpi": 160, "tvdpi": 213, "hdpi": 240, "xhdpi": 320, "xxhdpi": 480, "xxxhdpi": 640,
+}
+
+
+def split_name_from_file(file_name: str) -> str:
+    """Split name guessed from the file name : split_config.arm64_v8a.apk (pulled from a device)
+    or bundletool's base-xxhdpi.apk / feature-fr.apk. '' for the base."""
+    stem = Path(file_name).stem
+    if stem.startswith("split_"):
+        return stem[len("split_"):]
+    module, sep, qualifier = stem.partition("-")
+    if not sep:
+        return "" if stem == "base" else stem
+    prefix = "" if module == "base" else f"{module}."
+    if qualifier == "master":
+        return prefix.rstrip(".")
+    return f"{prefix}config.{qualifier}"
+
+
+def read_split_name(apks: zipfile.ZipFile, member: zipfile.ZipInfo) -> str:
+    """Split name from the manifest (split="config.xxhdpi", '' for the base).
+    Compressed members are not inflated just for this : the file name is used."""
+    if member.compress_type == zipfile.ZIP_STORED:
+        try:
+            with open_nested_apk(apks, member) as apk:
+                return read_manifest(apk, resolve_label=False)["split"]
+        except (zipfile.BadZipFile, ManifestError) as e:
+            logging.debug(f"{member.filename}: {e}")
+    return split_name_from_file(member.filename)
+
+
+def read_split_name_from_file(apk_file: Path) -> str:
+    try:
+        with zipfile.ZipFile(apk_file) as apk:
+            return read_manifest(apk, resolve_label=False)["split"]
+    except (zipfile.BadZipFile, OSError, ManifestError) as e:
+        logging.debug(f"{apk_file}: {e}")
+    return split_name_from_file(apk_file.name)
+
+
+def split_dimension(split_name: str) -> tuple[str, str, str]:
+    """(dimension, module, value) of a config split : dimension is "abi", "density"
+    or "language" ; '' for the base, feature modules and unknown qualifiers."""
+    module, sep, qualifier = split_name.rpartition("config.")
+    if not sep:
+        return "", split_name, ""
+    if qualifier in ABI_QUALIFIERS:
+        return "abi", module, ABI_QUALIFIERS[qualifier]
+    if qualifier in DENSITY_QUALIFIERS:
+        return "density", module, qualifier
+    language = qualifier.replace("-", "_").split("_")[0]
+    if 2 <= len(language) <= 3 and language.isalpha():
+        return "language", module, language.lower()
+    return "", split_name, ""
+
+
+def _pick_configs(dimension: str, values: set[str], abis, density: int, languages) -> set[str]:
+    """Values of a config dimension the device would use (all of them when unknown)."""
+    if dimension == "abi":
+        for abi in abis:
+            if abi in values:
+                return {abi}
+        return values
+    if dimension == "density":
+        if not density:
+            return values
+        # Android prefers the nearest density above, then the highest below
+        higher = [v for v in values if DENSITY_QUALIFIERS[v] >= density]
+        if higher:
+            return {min(higher, key=DENSITY_QUALIFIERS.get)}
+        return {max(values, key=DENSITY_QUALIFIERS.get)}
+    if not languages:
+        return values
+    return values & set(languages)  # none : the base default strings are used
+
+
+def select_splits(named_splits: list, abis=(), density: int = 0, languages=()) -> list:
+    """Keep the base, feature modules and the config splits matching the device
+    (ABI in preference order, nearest density, device languages).
+    named_splits: [(split_name, item), ...] ; returns the selected items, in order."""
+    groups = {}  # (dimension, module) -> values found
+    dimensions = []
+    for split_name, _ in named_splits:
+        dimension, module, value = split_dimension(split_name)
+        dimensions.append((dimension, module, value))
+        if dimension:
+            groups.setdefault((dimension, module), set()).add(value)
+
+    chosen = {
+        group: _pick_configs(group[0], values, abis, density, languages)
+        for group, values in groups.items()
+    }
+    return [
+        item for (dimension, module, value), (_, item) in zip(dimensions, named_splits)
+        if not dimension or value in chosen[(dimension, module)]
+    ]
+
+
+def read_requirements(apk_file) -> tuple[int, str]:
+    """Install requirements of an .apk or .apks (zip) : (minSdkVersion, native ABIs).
+    ABIs are comma separated ; empty when the package has no native code. (0, "") when unknown.
+    For an .apks only the base is opened : minSdk comes from its manifest, ABIs from its
+    lib/ entries and the config.<abi> split names (no other split is inflated).
+    """
+    min_sdk = 0
+    abis = set()
+    try:
+        with zipfile.ZipFile(apk_file) as archive:
+            if Path(str(apk_file)).suffix != ".apks":
+                return _min_sdk(archive), ",".join(sorted(_native_abis(archive)))
+
+            members = list_split_members(archive)
+            names = [read_split_name(archive, member) for member in members]
+            for name in names:
+                dimension, _, value = split_dimension(name)
+                if dimension == "abi":
+                    abis.add(value)
+            # base first ; without a recognisable base, first non-config split with a minSdk
+            candidates = [m for m, name in zip(members, names) if name == ""]
+            candidates += [m for m, name in zip(members, names) if name != "" and not split_dimension(name)[0]]
+            for member in candidates:
+                try:
+                    with open_nested_apk(archive, member) as apk:
+                        abis |= _native_abis(apk)
+                        min_sdk = _min_sdk(apk)
+                except zipfile.BadZipFile as e:
+                    logging.debug(f"{member.filename}: {e}")
+                    continue
+                if min_sdk:
+                    break
+    except (zipfile.BadZipFile, OSError) as e:
+        logging.debug(f"Requirements unavailable for {apk_file}: {e}")
+        return 0, ""
+    return min_sdk, ",".join(sorted(abis))
+
+
+# === Benchmark : in-process reader vs aapt ===
+# Usage : python pah_manifest.py [apk_dir]
+if __name__ == "__main__":
+    import sys
+    import time
+    import subprocess
+
+    logging.basicConfig(level=logging.INFO)
+    apk_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "extracted_apks"
+    apk_files = sorted(apk_dir.glob("*.apk"))
+    if not apk_files:
+        sys.exit(f"No .apk found in {apk_dir}")
+
+    def parse_aapt(apk_path: Path) -> tuple[str, str, str]:
+        from pah_scan import parse_aapt_output
+        result = subprocess.run(["aapt", "dump", "badging", str(apk_path)],
+                                capture_output=True, text=True)
+        return parse_aapt_output(result.stdout)
+
+    timings = {}
+    outputs = {}
+    for name, reader in (("in-process", read_pkg_version_label), ("aapt", parse_aapt)):
+        start = time.perf_counter()
+        outputs[name] = []
+        for apk_path in apk_files:
+            try:
+                outputs[name].append(reader(apk_path))
+            except Exception as e:
+                outputs[name].append(("", "", f"error: {e}"))
+        timings[name] = time.perf_counter() - start
+
+    mismatches = [
+        (apk_path.name, a, b)
+        for apk_path, a, b in zip(apk_files, outputs["in-process"], outputs["aapt"])
+        if a != b
+    ]
+    for name, elapsed in timings.items():
+        print(f"{name:>10} : {elapsed:.3f}s for {len(apk_files)} files "
+              f"({elapsed / len(apk_files) * 1000:.2f} ms/file)")
+    print(f"{len(mismatches)} mismatch(es)")
+    for file_name, a, b in mismatches:
+        print(f"  {file_name}: in-process={a} aapt={b}")
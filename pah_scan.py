@@ -1,13 +1,18 @@
+import os
+import shutil
 import logging
 import subprocess
-import time
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
 from PyQt5.QtCore import QTimer, QThread, pyqtSignal
 
 import pah_callbacks as pahc
 import pah_utils as pahu
 import pah_data as pahd
+import pah_manifest as pahmf
+import pah_adb as pahad
 
 class ScanWorker(QThread):
     progress = pyqtSignal(str)
@@ -19,66 +24,187 @@ class ScanWorker(QThread):
     finished = pyqtSignal(str)
 
     def __init__(self, apk_installer_path: Path, package_map=None,
-                 parent=None, android_scan=True, local_scan=True, rebuild_aapt_dict=False):
+                 parent=None, android_scan=True, local_scan=True, rebuild_aapt_dict=False,
+                 max_workers=None, fast_inventory=True):
         super().__init__(parent)
         self.apk_installer_path = apk_installer_path
         self.package_map = package_map
         self.android_scan = android_scan
         self.local_scan = local_scan
         self.rebuild_aapt_dict = rebuild_aapt_dict
+        # Android inventory : pm + label cache (miniapp only for unknown labels)
+        self.fast_inventory = fast_inventory
+        # Pool size for the aapt/7z extraction stage (default: one per CPU)
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        # Stat-keyed cache : unchanged files are neither hashed nor parsed
+        self.scan_cache = pahd.ScanCache()
 
 
     # -----------------------------
     # APK processing (LOCAL ONLY)
     # -----------------------------
-    def _process_apk_file(self, working_map, apk_file: Path):
-        try:
-            filename = apk_file.name
+    def _match_apk_file(self, working_map, apk_file: Path, file_hash: str = None):
+        """Fast match (hash / filename) against the working map.
+        file_hash: hash already known from the scan cache (skips hashing).
+        Returns (matched_key, file_hash) : unmatched files go to the extraction pool.
+        """
+        filename = apk_file.name
+        if file_hash is None:
             file_hash = pahu.get_fast_apk_hash(apk_file)
 
-            # 1. fast match (filename / hash)
-            matched_key = None
-            if not self.rebuild_aapt_dict:
-                if file_hash:
-                    matched_key = working_map.find_by_hash(file_hash)
-                if matched_key is None:
-                    matched_key = working_map.find_by_filename(filename)
+        if self.rebuild_aapt_dict:
+            return None, file_hash
+
+        matched_key = None
+        if file_hash:
+            matched_key = working_map.find_by_hash(file_hash)
+        if matched_key is None:
+            matched_key = working_map.find_by_filename(filename)
+        if matched_key is None:
+            return None, file_hash
+
+        pkg, vcode_int = matched_key
+        info = working_map.get(pkg, str(vcode_int))
+        if info:
+            info.local = True
+            working_map.update_file_name(pkg, str(vcode_int), filename)
+            if file_hash:
+                working_map.update_file_hash(pkg, str(vcode_int), file_hash)
+        return matched_key, file_hash
+
+    @staticmethod
+    def _extract_apk_file(apk_file: Path, scratch_dir: Path) -> tuple[str, str, str, int, str]:
+        """Manifest/aapt/7z extraction with an isolated scratch directory (pool thread).
+        The scratch directory is only created by the 7z fallback.
+        Returns (package, versionCode, label, minSdk, abis).
+        """
+        try:
+            return (*extract_pkg_version_label(apk_file, scratch_dir), *pahmf.read_requirements(apk_file))
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def _merge_apk_file(self, working_map, apk_file: Path, file_hash: str,
+                        extracted: tuple[str, str, str, int, str]) -> None:
+        """Merge an extraction result into the working map (scan thread only)."""
+        filename = apk_file.name
+        pkg, vcode, label, min_sdk, abis = extracted
+        existing = working_map.get(pkg, vcode)
+
+        if existing and not self.rebuild_aapt_dict:
+            existing.label = label or existing.label
+            existing.local = True
+            existing.min_sdk = min_sdk
+            existing.abis = abis
+            working_map.update_file_name(pkg, vcode, filename)
+            if file_hash:
+                working_map.update_file_hash(pkg, vcode, file_hash)
+        else:
+            working_map.add(
+                pkg,
+                vcode,
+                label=label,
+                android=False,
+                local=True,
+                checked=False,
+                file_hash=file_hash,
+                file_name=filename,
+                min_sdk=min_sdk,
+                abis=abis,
+            )
+
+    def _scan_apk_files(self, working_map, apk_files: list[Path], tmp_dir: Path) -> None:
+        """Local scan : fast match in this thread, aapt/7z extraction in a bounded pool.
+        Extraction results are merged back in apk_files order.
+        """
+        total = len(apk_files)
+        done = 0
+
+        def report(apk_file: Path) -> None:
+            nonlocal done
+            done += 1
+            percent = int((done / total) * 100) if total else 0
+            self.progress_percent.emit(f"Scanning {apk_file.name} ({done}/{total})...", percent)
+
+        # 1. scan cache (unchanged stat) then fast match (filename / hash)
+        to_extract = []  # (apk_file, file_hash, stat)
+        to_read = []  # (apk_file, pkg, vcode, store) : minSdk / ABIs only, store(min_sdk, abis)
+        for apk_file in apk_files:
+            try:
+                stat = apk_file.stat()
+                record = None if self.rebuild_aapt_dict else self.scan_cache.lookup(apk_file.name, stat)
+                if record and record.pkg:
+                    self._merge_apk_file(working_map, apk_file, record.file_hash,
+                                         (record.pkg, record.vcode, record.label,
+                                          max(record.min_sdk, 0), record.abis))
+                    if record.min_sdk < 0:
+                        # cache antérieur aux exigences minSdk / ABI : lues une fois (pool)
+                        to_read.append((apk_file, record.pkg, record.vcode, partial(
+                            self.scan_cache.store, apk_file.name, stat, record.file_hash,
+                            record.pkg, record.vcode, record.label)))
+                    else:
+                        report(apk_file)
+                    continue
 
+                matched_key, file_hash = self._match_apk_file(
+                    working_map, apk_file, record.file_hash if record else None)
                 if matched_key:
                     pkg, vcode_int = matched_key
                     info = working_map.get(pkg, str(vcode_int))
-                    if info:
-                        info.local = True
-                        info.file_name = filename
-                        if file_hash:
-                            info.file_hash = file_hash
-                    return
-
-            # 2. fallback aapt extraction
-            tmp_dir = Path(__file__).parent / "tmp"
-            pkg, vcode, label = extract_pkg_version_label(apk_file, tmp_dir)
-            existing = working_map.get(pkg, vcode)
-
-            if existing and not self.rebuild_aapt_dict:
-                existing.label = label or existing.label
-                existing.local = True
-                existing.file_name = filename
-                if file_hash:
-                    existing.file_hash = file_hash
-            else:
-                working_map.add(
-                    pkg,
-                    vcode,
-                    label=label,
-                    android=False,
-                    local=True,
-                    checked=False,
-                    file_hash=file_hash,
-                    file_name=filename,
-                )
-
-        except Exception as e:
-            logging.error(f"Error scanning {apk_file.name}: {e}")
+                    to_read.append((apk_file, pkg, str(vcode_int), partial(
+                        self.scan_cache.store, apk_file.name, stat, file_hash,
+                        pkg, str(vcode_int), info.label if info else "")))
+                else:
+                    to_extract.append((apk_file, file_hash, stat))
+            except Exception as e:
+                logging.error(f"Error scanning {apk_file.name}: {e}")
+                report(apk_file)
+
+        if not to_extract and not to_read:
+            return
+
+        # 2. fallback aapt extraction and minSdk / ABIs of the matched files (parallel)
+        results = [None] * len(to_extract)
+        requirements = [None] * len(to_read)
+        logging.debug(f"Extracting {len(to_extract)} files, reading requirements of {len(to_read)} "
+                      f"with {self.max_workers} workers")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self._extract_apk_file, apk_file, tmp_dir / f"scan_{idx}"): (results, idx, apk_file)
+                for idx, (apk_file, _, _) in enumerate(to_extract)
+            }
+            futures.update({
+                pool.submit(pahmf.read_requirements, apk_file): (requirements, idx, apk_file)
+                for idx, (apk_file, _, _, _) in enumerate(to_read)
+            })
+            for future in as_completed(futures):
+                target, idx, apk_file = futures[future]
+                try:
+                    target[idx] = future.result()
+                except Exception as e:
+                    logging.error(f"Error scanning {apk_file.name}: {e}")
+                report(apk_file)
+                if self.isInterruptionRequested():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+        for (apk_file, pkg, vcode, store), requirement in zip(to_read, requirements):
+            if requirement is None:
+                continue
+            info = working_map.get(pkg, vcode)
+            if info:
+                info.min_sdk, info.abis = requirement
+            store(*requirement)
+
+        # 3. ordered merge
+        for (apk_file, file_hash, stat), extracted in zip(to_extract, results):
+            if extracted is None:
+                continue
+            try:
+                self._merge_apk_file(working_map, apk_file, file_hash, extracted)
+                self.scan_cache.store(apk_file.name, stat, file_hash, *extracted)
+            except Exception as e:
+                logging.error(f"Error scanning {apk_file.name}: {e}")
 
     # -----------------------------
     # MAIN
@@ -89,8 +215,10 @@ class ScanWorker(QThread):
             # 0. WORKING COPY (CRITICAL FIX)
             # =========================================================
             working_map = pahd.PackageMap()
+            # baseline : shallow dict (shared PackageInfo), only used for the final diff
+            baseline = self.package_map.get_all_packages()
 
-            for (pkg, vcode_int), info in self.package_map.get_all_packages().items():
+            for (pkg, vcode_int), info in baseline.items():
                 working_map.add(
                     pkg,
                     str(vcode_int),
@@ -100,6 +228,8 @@ class ScanWorker(QThread):
                     checked=False,
                     file_hash=info.file_hash,
                     file_name=info.file_name,
+                    min_sdk=info.min_sdk,
+                    abis=info.abis,
                 )
 
             apk_dir = Path(__file__).parent / "extracted_apks"
@@ -118,9 +248,19 @@ class ScanWorker(QThread):
                 self.progress.emit("Scanning Android installed applications...")
 
                 if is_adb_connected:
-                    self.installed_list = extract_packages_labels_version(
-                        self.apk_installer_path
-                    )
+                    if self.fast_inventory:
+                        label_cache = pahd.LabelCache()
+                        label_file = label_cache.get_save_file_path()
+                        label_cache.load_from_file(label_file)
+                        label_cache.seed_from_map(working_map)
+                        self.installed_list = extract_packages_fast(
+                            self.apk_installer_path, label_cache
+                        )
+                        label_cache.save_to_file(label_file)
+                    else:
+                        self.installed_list = extract_packages_labels_version(
+                            self.apk_installer_path
+                        )
                     self.android_scan_finished.emit("Android scan complete")
                 else:
                     logging.error("No adb connection detected")
@@ -137,7 +277,7 @@ class ScanWorker(QThread):
                     existing = working_map.get(pkg, vcode)
 
                     if existing:
-                        existing.android = True
+                        working_map.set_flags(pkg, vcode, android=True)
                         if label and not existing.label:
                             existing.label = label
                     else:
@@ -154,8 +294,8 @@ class ScanWorker(QThread):
 
                 installed_keys = {(pkg, int(vcode)) for pkg, vcode, _ in self.installed_list}
                 for (pkg, vcode_int), info in working_map.get_all_packages().items():
-                    if (pkg, vcode_int) not in installed_keys:
-                        info.android = False
+                    if (pkg, vcode_int) not in installed_keys and info.android:
+                        working_map.set_flags(pkg, str(vcode_int), android=False)
                 self.progress.emit(f"Android scan successful")
 
 
@@ -170,25 +310,26 @@ class ScanWorker(QThread):
                 self.progress_switch_percent.emit()
 
                 apk_files = list(apk_dir.glob("*.apk")) + list(apk_dir.glob("*.apks"))
-                total = len(apk_files)
                 existing_files = {f.name for f in apk_files}
 
                 # purge des références mortes
-                for (_, _), info in working_map.get_all_packages().items():
+                for (pkg, vcode_int), info in working_map.get_all_packages().items():
                     if info.file_name and info.file_name not in existing_files:
-                        info.file_name = ""
-                        info.file_hash = ""
+                        working_map.update_file_name(pkg, str(vcode_int), "")
+                        working_map.update_file_hash(pkg, str(vcode_int), "")
                         info.local = False
 
                 # reset local flag ONLY
                 for (_, _), info in working_map.get_all_packages().items():
                     info.local = False
 
-                for i, apk_file in enumerate(apk_files, 1):
-                    self._process_apk_file(working_map, apk_file)
+                cache_file = self.scan_cache.get_save_file_path()
+                if not self.rebuild_aapt_dict:
+                    self.scan_cache.load_from_file(cache_file)
+                self.scan_cache.prune(existing_files)
 
-                    percent = int((i / total) * 100) if total else 0
-                    self.progress_percent.emit(f"Scanning {apk_file.name} ({i}/{total})...", percent)
+                self._scan_apk_files(working_map, apk_files, tmp_dir)
+                self.scan_cache.save_to_file(cache_file)
 
                 self.saved_list = [
                     (pkg, str(vcode_int), info.label)
@@ -203,24 +344,13 @@ class ScanWorker(QThread):
             working_map.remove_orphans()
 
             # =========================================================
-            # 4. EMIT RESULT (SAFE COPY)
+            # 4. EMIT RESULT (CHANGE SET ONLY)
             # =========================================================
-            result_map = pahd.PackageMap()
+            delta = pahd.ScanDelta.from_maps(baseline, working_map)
+            del baseline, working_map
+            logging.debug(f"Scan delta : {delta}")
 
-            for (pkg, vcode_int), info in working_map.get_all_packages().items():
-                result_map.add(
-                    pkg,
-                    str(vcode_int),
-                    label=info.label,
-                    android=info.android,
-                    local=info.local,
-                    checked=info.checked,
-                    file_hash=info.file_hash,
-                    file_name=info.file_name,
-                )
-
-
-            self.result_ready.emit(result_map)
+            self.result_ready.emit(delta)
             if self.android_scan and self.local_scan:
                 self.finished.emit(
                     f"Combined scan finished : "
@@ -242,7 +372,8 @@ class ScanWorker(QThread):
             logging.error(f"Scan error: {str(e)}")
 
 # === Name, Label, VersionCode functions ===
-def on_scan_device_clicked(main_window, scan_android=True, scan_local=True, reset_appt_dict=False):
+def on_scan_device_clicked(main_window, scan_android=True, scan_local=True, reset_appt_dict=False,
+                           scan_workers=None, fast_inventory=True):
 
     pahc.set_progress_indeterminate(main_window)  # ← dès le départ
     pahc.set_status(main_window, "Starting applications scan...")
@@ -256,6 +387,8 @@ def on_scan_device_clicked(main_window, scan_android=True, scan_local=True, rese
         android_scan=scan_android,
         local_scan=scan_local,
         rebuild_aapt_dict=reset_appt_dict,
+        max_workers=scan_workers,
+        fast_inventory=fast_inventory,
     )
 
     main_window.worker.progress.connect(
@@ -310,10 +443,34 @@ def parse_aapt_output(aapt_output: str) -> tuple[str, str, str]:
             label = line.split(":", 1)[1].strip().strip("'")
     return package_name, version_code, label
 
+def read_apk_badging(apk_file: Path) -> tuple[str, str, str]:
+    """
+    Read (package_name, version_code, label) from a single .apk.
+    Uses the in-process manifest reader, falls back to 'aapt dump badging'
+    when the manifest cannot be decoded or package/versionCode are missing.
+    (config splits legitimately have no label)
+    """
+    try:
+        package_name, version_code, label = pahmf.read_pkg_version_label(apk_file)
+        if package_name and version_code:
+            return package_name, version_code, label
+        logging.debug(f"{apk_file.name}: incomplete manifest data, aapt fallback")
+    except pahmf.ManifestError as e:
+        logging.debug(f"{apk_file.name}: {e}, aapt fallback")
+        package_name = version_code = label = ""
+
+    result = subprocess.run(
+        ["aapt", "dump", "badging", str(apk_file)],
+        capture_output=True, text=True
+    )
+    p, v, l = parse_aapt_output(result.stdout)
+    return package_name or p, version_code or v, label or l
+
 def extract_pkg_version_label(apk_file: Path, tmpdir: Path) -> tuple[str, str, str]:
     """
     Extract package name, version code, and application label from a local .apk or .apks file.
-    For .apks, unzip and analyze all .apk inside.
+    For .apks, the splits are read in place from the archive; tmpdir is only
+    used by the 7z fallback (unzip and analyze all .apk inside).
     Args:
     - apk_file: Path to the .apk or .apks file.
     - tmpdir: Path to a temporary directory for extraction.
@@ -322,73 +479,138 @@ def extract_pkg_version_label(apk_file: Path, tmpdir: Path) -> tuple[str, str, s
     Raises:
     - PAHError if extraction fails.
     """
-    pahu.clean_tmp_dir(tmpdir)
-    
     # Variables locales à cette fonction - réinitialisées à chaque appel
     package_name = ""
     version_code = ""
     label = ""
 
     if apk_file.suffix == ".apk":
-        result = subprocess.run(
-            ["aapt", "dump", "badging", str(apk_file)],
-            capture_output=True, text=True, check=True
-        )
-        aapt_output = result.stdout
-        package_name, version_code, label = parse_aapt_output(aapt_output)
+        package_name, version_code, label = read_apk_badging(apk_file)
 
     elif apk_file.suffix == ".apks":
-        pahu.unzip_apks_to_tmpdir(apk_file, tmpdir)
-        apk_files_inside = list(tmpdir.glob("*.apk"))
-        if not apk_files_inside:
-            pahu.clean_tmp_dir(tmpdir)
-            pahu.raise_error("No .apk found inside the .apks archive.")
-
-        # Loop on all extracted APKs to find info (stop early if all found)
-        for apk_inside in apk_files_inside:
-            result = subprocess.run(
-                ["aapt", "dump", "badging", str(apk_inside)],
-                capture_output=True, text=True
-            )
-            aapt_output = result.stdout
-            p, v, l = parse_aapt_output(aapt_output)
-            if not package_name and p:
-                package_name = p
-            if not version_code and v:
-                version_code = v
-            if not label and l:
-                label = l
-            if package_name and version_code and label:
-                break
+        try:
+            package_name, version_code, label = pahmf.read_apks_pkg_version_label(apk_file)
+        except pahmf.ManifestError as e:
+            logging.debug(f"{apk_file.name}: {e}, 7z fallback")
+
+        if not (package_name and version_code):
+            package_name, version_code, label = _extract_apks_with_7z(apk_file, tmpdir)
     else:
         pahu.raise_error(f"Unsupported file type: {apk_file.suffix}")
-    logging.debug(f"cleaning tmpdir")
-    pahu.clean_tmp_dir(tmpdir)
     if not package_name:
         pahu.raise_error("Failed to extract package name.")
     if not version_code:
         logging.warning(f"VersionCode not found in {apk_file}. Version check disabled.")
-    if not version_code:
+    if not label:
         logging.warning(f"label not found in {apk_file}.")
     return package_name, version_code, label
 
+def _extract_apks_with_7z(apk_file: Path, tmpdir: Path) -> tuple[str, str, str]:
+    """Fallback for .apks : unzip with 7z and analyze all .apk inside."""
+    pahu.clean_tmp_dir(tmpdir)
+
+    package_name = ""
+    version_code = ""
+    label = ""
+
+    pahu.unzip_apks_to_tmpdir(apk_file, tmpdir)
+    apk_files_inside = list(tmpdir.glob("*.apk"))
+    if not apk_files_inside:
+        pahu.clean_tmp_dir(tmpdir)
+        pahu.raise_error("No .apk found inside the .apks archive.")
+
+    # Loop on all extracted APKs to find info (stop early if all found)
+    for apk_inside in apk_files_inside:
+        p, v, l = read_apk_badging(apk_inside)
+        if not package_name and p:
+            package_name = p
+        if not version_code and v:
+            version_code = v
+        if not label and l:
+            label = l
+        if package_name and version_code and label:
+            break
+    logging.debug(f"cleaning tmpdir")
+    pahu.clean_tmp_dir(tmpdir)
+    return package_name, version_code, label
+
 def extract_user_packages_list() -> list[str]:
     """Return a list of all user-installed packages on the connected device."""
     adb_connect = pahu.check_adb_connection()
     if adb_connect:
-        result = subprocess.run(
-            ["adb", "shell", "pm", "list", "packages", "-3"],
-            capture_output=True, text=True
-        )
+        result = pahad.get_client().shell(["pm", "list", "packages", "-3"])
         lines = result.stdout.strip().splitlines()
         return [line.split(":")[1] for line in lines]
     else:
         logging.warning("Skipping android install listing.")
         return []
 
-def extract_packages_labels_version(apk_installer_path: Path) -> list[tuple[str, str, str]]:
+def extract_packages_versions() -> list[tuple[str, str]] | None:
+    """
+    Single adb round-trip inventory : 'pm list packages -3 --show-versioncode'.
+    Return a tuple list : (package_name, version_code),
+    or None if the device does not report version codes (Android < 9).
+    Only a successful empty listing returns [].
+    """
+    result = pahad.get_client().shell(["pm", "list", "packages", "-3", "--show-versioncode"])
+    lines = result.stdout.splitlines()
+    if result.returncode != 0 or not any(line.strip().startswith("package:") for line in lines):
+        # Android <= 8 : "Error: Unknown option: --show-versioncode" (stdout or stderr,
+        # exit status only available with shell v2)
+        output = f"{result.stdout}\n{result.stderr}"
+        if result.returncode != 0 or "Error:" in output or "Unknown option" in output:
+            logging.debug(f"pm --show-versioncode rejected ({output.strip()})")
+            return None
+    packages = []
+    for line in lines:
+        # package:com.example.app versionCode:123
+        fields = dict(
+            part.split(":", 1) for part in line.strip().split() if ":" in part
+        )
+        pkg = fields.get("package", "")
+        vcode = fields.get("versionCode", "")
+        if not pkg:
+            continue
+        if not vcode.isdigit():
+            logging.debug(f"No versionCode in pm output ({line.strip()})")
+            return None
+        packages.append((pkg, vcode))
+    return packages
+
+def extract_packages_fast(apk_installer_path: Path, label_cache) -> list[tuple[str, str, str]]:
+    """
+    Miniapp-free inventory : versions from pm, labels from label_cache.
+    The miniapp is only launched for packages whose label was never seen.
+    Return a tuple list : (package_name, version_code, label).
+    """
+    packages = extract_packages_versions()
+    if packages is None:
+        logging.info("pm does not report version codes, using miniapp inventory.")
+        results = extract_packages_labels_version(apk_installer_path)
+        for pkg, _, label in results:
+            label_cache.update(pkg, label)
+        return results
+
+    unknown = [pkg for pkg, _ in packages if pkg not in label_cache]
+    if unknown:
+        logging.info(f"{len(unknown)} unknown label(s), launching miniapp.")
+        try:
+            installed = [pkg for pkg, _ in packages]
+            for pkg, _, label in extract_packages_labels_version(apk_installer_path, installed):
+                label_cache.update(pkg, label)
+            # not reported by the miniapp : remembered as seen, without label
+            for pkg in unknown:
+                label_cache.update(pkg, "")
+        except RuntimeError as e:
+            logging.warning(f"Labels unavailable for {len(unknown)} package(s): {e}")
+
+    return [(pkg, vcode, label_cache.get(pkg)) for pkg, vcode in packages]
+
+def extract_packages_labels_version(apk_installer_path: Path,
+                                    installed: list[str] = None) -> list[tuple[str, str, str]]:
     """
     use miniapp on the android device to extract a list of installed packages.
+    installed: user packages list if already known (skips 'pm list packages -3').
     Return a tuple list : (package_name, version_code, label).
     """
     pkg_name = "com.pah.miniapp"
@@ -396,7 +618,8 @@ def extract_packages_labels_version(apk_installer_path: Path) -> list[tuple[str,
     local_file = Path(__file__).parent / "extracted_apks" / "android_extracted_list.txt"
     results = []
 
-    installed = extract_user_packages_list()
+    if installed is None:
+        installed = extract_user_packages_list()
     if not installed:
         logging.warning("No user-installed packages detected on device.")
         return results
@@ -404,72 +627,94 @@ def extract_packages_labels_version(apk_installer_path: Path) -> list[tuple[str,
     # Vérifie si miniapp est installée
     if pkg_name not in installed:
         try:
-            subprocess.run(["adb", "install", str(apk_installer_path)], check=True)
-            logging.info("miniapp installed successfully.")
-        except subprocess.CalledProcessError as e:
+            res = pahad.get_client().install(apk_installer_path)
+        except (OSError, pahad.AdbError) as e:
             raise RuntimeError(f"Failed to install miniapp: {e}") from e
+        if res.returncode != 0:
+            raise RuntimeError(f"Failed to install miniapp: {res.stdout}")
+        logging.info("miniapp installed successfully.")
 
-    # Strating main activity from miniapp
+    # Starting main activity from miniapp (stale report removed first,
+    # so that only the report of this run is read ; -S stops an instance
+    # already running, which would not write the report again)
     try:
-        subprocess.run([
-            "adb", "shell", "am", "start", "-n",
-            "com.pah.miniapp/.MainActivity"
-        ], capture_output=True, check=True)
-        logging.info("miniapp launched (main activity).")
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Failed to launch miniapp: {e}") from e
-
-    # Wait before reading list file
-    max_attempts = 10
-    delay = 1.0
-    last_size = -1
-    for attempt in range(max_attempts):
-        time.sleep(delay)
-        logging.debug(f"adb check repport size via [shell stat -c %s]")
-        logging.debug(f"Attempt {attempt+1}/{max_attempts}")
-        res = subprocess.run(
-            ["adb", "shell", "stat", "-c", "%s", remote_path],
-            capture_output=True,
-            text=True
+        res = pahad.get_client().shell(
+            f"rm -f '{remote_path}'; am start -S -W -n com.pah.miniapp/.MainActivity"
         )
-        try:
-            size = int(res.stdout.strip())
-        except:
-            logging.debug(f"Scan repport not ready yet ({attempt+1}/{max_attempts})")
-            continue
-        logging.debug(f"file size : {size} bytes")
-
-        if size > 0 and size == last_size:
-            logging.info("File is stable, ready to pull")
-            break
-        last_size = size
-    else:
-        raise RuntimeError("Timeout (30s): Scan repport miniapp_package_list.txt not found on device.")
+    except (OSError, pahad.AdbError) as e:
+        raise RuntimeError(f"Failed to launch miniapp: {e}") from e
+    if res.returncode != 0:
+        raise RuntimeError(f"Failed to launch miniapp: {res.stderr or res.stdout}")
+    logging.info("miniapp launched (main activity).")
 
-    # Pull list file
+    # Wait on the device side for the report, then stream it back in the same call
+    report = _stream_miniapp_report(remote_path)
     try:
-        res2 = subprocess.run(["adb", "pull", remote_path, str(local_file)],
-                             capture_output=True, check=True)
-        logging.debug(f"[adb pull] {res2.stdout.strip()}")
-        logging.info(f"Pulled file {local_file.name}")
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Failed to pull file: {e}") from e
+        local_file.write_text(report, encoding='utf-8')
+        logging.info(f"Streamed report saved to {local_file.name}")
+    except OSError as e:
+        logging.warning(f"Unable to keep a copy of the report: {e}")
 
     # Reading and parsing
     try:
-        with local_file.open('r', encoding='utf-8') as f:
-            for line in f:
-                parts = line.strip().split(None, 2)
-                if len(parts) >= 2:
-                    pkg = parts[0]
-                    version = parts[1]
-                    label = parts[2] if len(parts) > 2 else ""
-                    results.append((pkg, version, label))
+        for line in report.splitlines():
+            parts = line.strip().split(None, 2)
+            if len(parts) >= 2:
+                pkg = parts[0]
+                version = parts[1]
+                label = parts[2] if len(parts) > 2 else ""
+                results.append((pkg, version, label))
     except Exception as e:
-        raise RuntimeError(f"Failed to parse pulled file: {e}") from e
+        raise RuntimeError(f"Failed to parse streamed report: {e}") from e
 
     return results
 
+# miniapp report : max wait and on-device check interval (seconds)
+MINIAPP_REPORT_TIMEOUT = 30.0
+MINIAPP_REPORT_INTERVAL = 0.1
+# checks with an unchanged size before the report is complete (~0.5 s) : the miniapp
+# may pause between buffered writes (label lookups)
+MINIAPP_REPORT_STABLE_CHECKS = 5
+# upper bound of the stat / test cost of one check on a slow device (seconds)
+MINIAPP_CHECK_OVERHEAD = 0.05
+
+def _stream_miniapp_report(remote_path: str, timeout: float = MINIAPP_REPORT_TIMEOUT) -> str:
+    """
+    Block on the device until the miniapp report is complete (non-empty and
+    size stable over MINIAPP_REPORT_STABLE_CHECKS checks), then stream it over the 'exec:' service.
+    One host round-trip : latency is bounded by the miniapp work, not by
+    host-side polling. Older toybox / mksh shells only sleep whole seconds :
+    the script then checks every second (size stable over one check).
+    """
+    checks = int(timeout / MINIAPP_REPORT_INTERVAL)
+    script = (
+        f"f='{remote_path}'; last=-1; stable=0; i=0; "
+        f"if sleep {MINIAPP_REPORT_INTERVAL} 2>/dev/null; then d={MINIAPP_REPORT_INTERVAL}; "
+        f"n={checks}; need={MINIAPP_REPORT_STABLE_CHECKS}; "
+        f"else d=1; n={int(timeout)}; need=1; fi; "
+        f"while [ $i -lt $n ]; do "
+        f"s=$(stat -c %s \"$f\" 2>/dev/null || echo -1); "
+        f"if [ \"$s\" -gt 0 ] && [ \"$s\" = \"$last\" ]; then stable=$((stable+1)); else stable=0; fi; "
+        f"if [ $stable -ge $need ]; then cat \"$f\"; exit 0; fi; "
+        f"last=$s; i=$((i+1)); sleep $d; "
+        f"done; exit 1"
+    )
+    # socket timeout above the worst case of the loop (sleep probe + every check)
+    loop_bound = MINIAPP_REPORT_INTERVAL + max(checks * (MINIAPP_REPORT_INTERVAL + MINIAPP_CHECK_OVERHEAD),
+                                               int(timeout) * (1 + MINIAPP_CHECK_OVERHEAD))
+    try:
+        report = pahad.get_client().exec_out(script, timeout=loop_bound + 5)
+    except TimeoutError as e:
+        raise RuntimeError(f"Timeout ({timeout:.0f}s): miniapp report not received.") from e
+    except (OSError, pahad.AdbError) as e:
+        raise RuntimeError(f"Failed to read miniapp report: {e}") from e
+    # exec: does not forward the remote exit status : an empty stream means timeout
+    if not report:
+        raise RuntimeError(
+            f"Timeout ({timeout:.0f}s): Scan repport {Path(remote_path).name} not found on device.")
+    logging.debug(f"miniapp report received : {len(report)} bytes")
+    return report.decode("utf-8", errors="replace")
+
 # Not used yet (NeoBackup)
 def read_meta_info(meta_file: Path) -> tuple[str, bool]:
     """Read package_name and is_split_apk from a meta_v2.am.json file."""
@@ -0,0 +1,315 @@
+import bisect
+import difflib
+import re
+
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Dict, List, Optional, Set, Tuple
+
+# === Index de recherche (tokens + trigrammes) sur les packages du PackageMap ===
+# Un document = un package (toutes ses versions partagent nom et label).
+
+TOKEN_SPLIT = re.compile(r"[^\w]+|_")
+
+# Scores par type de correspondance d'un terme
+SCORE_EXACT = 4.0
+SCORE_PREFIX = 3.0
+SCORE_SUBSTRING = 2.0
+SCORE_FUZZY = 1.0  # + ratio de similarité (0..1)
+
+FUZZY_MIN_RATIO = 0.7
+
+QUALIFIERS = ("installed", "local", "multi")
+YES_VALUES = {"yes", "y", "true", "1", "on"}
+NO_VALUES = {"no", "n", "false", "0", "off"}
+
+
+def tokenize(text: str) -> Set[str]:
+    """Tokens en minuscules d'un nom de package ou d'un label."""
+    return {token for token in TOKEN_SPLIT.split(text.lower()) if token}
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"$${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def short_grams(token: str) -> Set[str]:
+    """Sous-chaînes de 1 et 2 caractères : candidats des termes trop courts pour un trigramme."""
+    return set(token) | {token[i:i + 2] for i in range(len(token) - 1)}
+
+
+def document_text(pkg: str, labels) -> str:
+    """Texte de vérification d'un package : nom et labels en minuscules."""
+    return "\0".join([pkg.lower(), *sorted(label.lower() for label in labels)])
+
+
+@dataclass
+class SearchQuery:
+    """Requête analysée : termes texte (ET) + qualificateurs (installed: / local: / multi:)."""
+    terms: List[str] = field(default_factory=list)
+    qualifiers: Dict[str, bool] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        return not self.terms and not self.qualifiers
+
+
+def parse_query(text: str) -> SearchQuery:
+    query = SearchQuery()
+    for word in text.lower().split():
+        name, sep, value = word.partition(":")
+        if sep and name in QUALIFIERS and (value in YES_VALUES or value in NO_VALUES):
+            query.qualifiers[name] = value in YES_VALUES
+        else:
+            query.terms.append(word)
+    return query
+
+
+class SearchIndex:
+    """Index inversé token -> packages, trigramme -> tokens, listes triées pour les préfixes.
+    Mis à jour incrémentalement par update_package() à chaque ajout / suppression de version."""
+
+    def __init__(self):
+        self._doc_tokens: Dict[str, Set[str]] = {}  # pkg -> tokens
+        self._token_pkgs: Dict[str, Set[str]] = {}  # token -> pkgs
+        self._trigram_tokens: Dict[str, Set[str]] = {}  # trigramme -> tokens
+        self._short_tokens: Dict[str, Set[str]] = {}  # 1 / 2 caractères -> tokens
+        self._doc_text: Dict[str, str] = {}  # pkg -> texte (sous-chaîne du terme entier)
+        self._sorted_tokens: List[str] = []
+        self._sorted_pkgs: List[str] = []  # noms en minuscules
+        self._pkg_by_lower: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def rebuild(self, labels_by_pkg: Dict[str, Set[str]]) -> None:
+        """Reconstruction complète (chargement / reset du modèle)."""
+        self.clear()
+        for pkg, labels in labels_by_pkg.items():
+            tokens = self._document_tokens(pkg, labels)
+            self._doc_tokens[pkg] = tokens
+            self._doc_text[pkg] = document_text(pkg, labels)
+            for token in tokens:
+                self._token_pkgs.setdefault(token, set()).add(pkg)
+            self._pkg_by_lower[pkg.lower()] = pkg
+        for token in self._token_pkgs:
+            for trigram in trigrams(token):
+                self._trigram_tokens.setdefault(trigram, set()).add(token)
+            for gram in short_grams(token):
+                self._short_tokens.setdefault(gram, set()).add(token)
+        self._sorted_tokens = sorted(self._token_pkgs)
+        self._sorted_pkgs = sorted(self._pkg_by_lower)
+
+    @staticmethod
+    def _document_tokens(pkg: str, labels) -> Set[str]:
+        tokens = tokenize(pkg)
+        for label in labels:
+            tokens |= tokenize(label)
+        return tokens
+
+    def update_package(self, pkg: str, labels) -> None:
+        """(Ré)indexe un package ; labels=None = package supprimé."""
+        old_tokens = self._doc_tokens.get(pkg, set())
+        new_tokens = self._document_tokens(pkg, labels) if labels is not None else set()
+        if labels is None:
+            self._doc_tokens.pop(pkg, None)
+            self._doc_text.pop(pkg, None)
+            lower = pkg.lower()
+            if self._pkg_by_lower.pop(lower, None) is not None:
+                pos = bisect.bisect_left(self._sorted_pkgs, lower)
+                if pos < len(self._sorted_pkgs) and self._sorted_pkgs[pos] == lower:
+                    del self._sorted_pkgs[pos]
+        else:
+            self._doc_tokens[pkg] = new_tokens
+            self._doc_text[pkg] = document_text(pkg, labels)
+            lower = pkg.lower()
+            if lower not in self._pkg_by_lower:
+                self._pkg_by_lower[lower] = pkg
+                bisect.insort(self._sorted_pkgs, lower)
+
+        for token in old_tokens - new_tokens:
+            pkgs = self._token_pkgs.get(token)
+            if pkgs is None:
+                continue
+            pkgs.discard(pkg)
+            if not pkgs:
+                del self._token_pkgs[token]
+                pos = bisect.bisect_left(self._sorted_tokens, token)
+                if pos < len(self._sorted_tokens) and self._sorted_tokens[pos] == token:
+                    del self._sorted_tokens[pos]
+                for index, grams in ((self._trigram_tokens, trigrams(token)),
+                                     (self._short_tokens, short_grams(token))):
+                    for gram in grams:
+                        tokens = index.get(gram)
+                        if tokens is not None:
+                            tokens.discard(token)
+                            if not tokens:
+                                del index[gram]
+        for token in new_tokens - old_tokens:
+            pkgs = self._token_pkgs.get(token)
+            if pkgs is None:
+                pkgs = self._token_pkgs[token] = set()
+                bisect.insort(self._sorted_tokens, token)
+                for trigram in trigrams(token):
+                    self._trigram_tokens.setdefault(trigram, set()).add(token)
+                for gram in short_grams(token):
+                    self._short_tokens.setdefault(gram, set()).add(token)
+            pkgs.add(pkg)
+
+    # --- Requêtes ---
+
+    def _prefix_range(self, sorted_list: List[str], prefix: str) -> List[str]:
+        start = bisect.bisect_left(sorted_list, prefix)
+        end = bisect.bisect_left(sorted_list, prefix + "\uffff")
+        return sorted_list[start:end]
+
+    @staticmethod
+    def _intersect(per_token: List[Dict[str, float]]) -> Dict[str, float]:
+        """ET entre les tokens d'un terme : un package garde le score de son moins bon token."""
+        per_token = sorted(per_token, key=len)
+        result = per_token[0]
+        for scores in per_token[1:]:
+            result = {pkg: min(score, scores[pkg]) for pkg, score in result.items() if pkg in scores}
+        return result
+
+    def _match_token(self, token: str) -> Dict[str, float]:
+        """pkg -> score pour un token. Les niveaux sont évalués du meilleur au moins bon :
+        un package garde le score du premier niveau qui le trouve."""
+        scores: Dict[str, float] = {}
+
+        def hit(pkgs, score):
+            for pkg in pkgs:
+                scores.setdefault(pkg, score)
+
+        if token in self._token_pkgs:
+            hit(self._token_pkgs[token], SCORE_EXACT)
+        for other in self._prefix_range(self._sorted_tokens, token):
+            if other != token:
+                hit(self._token_pkgs[other], SCORE_PREFIX)
+        # Sous-chaîne : tous les trigrammes internes du token sont dans l'autre token,
+        # index 1 / 2 caractères pour les tokens plus courts
+        inner = [t for t in trigrams(token) if "$" not in t]
+        if inner:
+            candidates = set.intersection(*(self._trigram_tokens.get(t, set()) for t in inner))
+        else:
+            candidates = self._short_tokens.get(token, ())
+        for other in candidates:
+            if token in other and not other.startswith(token):
+                hit(self._token_pkgs[other], SCORE_SUBSTRING)
+        return scores
+
+    def _fuzzy_token(self, token: str) -> Dict[str, float]:
+        """Approché ("whtsap" -> whatsapp) : candidats partageant des trigrammes, puis similarité."""
+        fuzzy = []
+        term_trigrams = trigrams(token)
+        counts: Dict[str, int] = {}
+        for t in term_trigrams:
+            for other in self._trigram_tokens.get(t, ()):
+                counts[other] = counts.get(other, 0) + 1
+        needed = max(2, len(term_trigrams) // 3)
+        matcher = difflib.SequenceMatcher(a=token)
+        for other, shared in counts.items():
+            if shared < needed:
+                continue
+            matcher.set_seq2(other)
+            if matcher.quick_ratio() < FUZZY_MIN_RATIO:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= FUZZY_MIN_RATIO:
+                fuzzy.append((ratio, other))
+        scores: Dict[str, float] = {}
+        for ratio, other in sorted(fuzzy, reverse=True):
+            for pkg in self._token_pkgs[other] - scores.keys():
+                scores[pkg] = SCORE_FUZZY + ratio
+        return scores
+
+    def _match_term(self, term: str) -> Dict[str, float]:
+        """pkg -> score pour un terme. Hors approché, le résultat est exactement l'ancien
+        filtre : le terme entier est une sous-chaîne du nom ou d'un label. Les tokens du
+        terme donnent les candidats (ET), le texte du package les vérifie."""
+        scores: Dict[str, float] = {}
+
+        # Préfixe de nom de domaine inversé : "com.google." / "org.mozilla"
+        if "." in term:
+            exact = self._pkg_by_lower.get(term)
+            if exact:
+                scores[exact] = SCORE_EXACT
+            for lower in self._prefix_range(self._sorted_pkgs, term):
+                scores.setdefault(self._pkg_by_lower[lower], SCORE_PREFIX)
+
+        tokens = sorted(tokenize(term))
+        if not tokens:
+            # séparateurs seuls ("_", "-") : pas de token, vérification directe (rare)
+            for pkg, text in self._doc_text.items():
+                if term in text:
+                    scores.setdefault(pkg, SCORE_SUBSTRING)
+            return scores
+        candidates = self._intersect([self._match_token(token) for token in tokens])
+        for pkg, score in candidates.items():
+            if term in self._doc_text[pkg]:
+                scores.setdefault(pkg, score)
+        if scores or len(term) < 3:
+            return scores
+        return self._intersect([self._fuzzy_token(token) for token in tokens])
+
+    def search(self, query: SearchQuery) -> Optional[Dict[str, float]]:
+        """pkg -> score (tous les termes doivent correspondre), None si aucun terme texte."""
+        if not query.terms:
+            return None
+        result: Optional[Dict[str, float]] = None
+        for term in query.terms:
+            scores = self._match_term(term)
+            if result is None:
+                result = scores
+            else:
+                result = {pkg: result[pkg] + score for pkg, score in scores.items() if pkg in result}
+            if not result:
+                return {}
+        return result
+
+    def ranked(self, query: SearchQuery) -> List[Tuple[str, float]]:
+        """Packages correspondants, meilleur score d'abord."""
+        items = sorted((self.search(query) or {}).items())
+        items.sort(key=itemgetter(1), reverse=True)  # tri stable : nom en départage
+        return items
+
+
+# === Micro-benchmark : latence de requête à 100k entrées ===
+# Usage : python pah_search.py
+if __name__ == "__main__":
+    import random
+    import time
+
+    random.seed(1)
+    syllables = ["ka", "lo", "mi", "ra", "te", "zu", "pho", "vin", "sel", "dro", "ne", "qua", "bri", "to", "gle"]
+
+    def word():
+        return "".join(random.choice(syllables) for _ in range(random.randint(2, 4)))
+
+    vendors = [word() for _ in range(300)] + ["google", "mozilla", "facebook", "samsung"]
+    apps = [word() for _ in range(5000)]
+    labels_by_pkg: Dict[str, Set[str]] = {}
+    # 25k packages x 4 versions = 100k entrées
+    while len(labels_by_pkg) < 25_000:
+        vendor, app = random.choice(vendors), random.choice(apps)
+        labels_by_pkg[f"com.{vendor}.{app}"] = {f"{app.title()} {random.choice(apps).title()}"}
+    labels_by_pkg["com.whatsapp"] = {"WhatsApp Messenger"}
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.rebuild(labels_by_pkg)
+    print(f"build : {(time.perf_counter() - start) * 1e3:.0f} ms for {len(index)} packages")
+
+    for text in ("whatsapp", "whtsap", "com.google.", "messenger", "mess", "essen", "kalo", "qu", "w",
+                 "whatsapp installed:yes"):
+        query = parse_query(text)
+        runs = 100
+        start = time.perf_counter()
+        for _ in range(runs):
+            results = index.ranked(query)
+        elapsed = (time.perf_counter() - start) / runs
+        top = results[0][0] if results else "-"
+        print(f"{text!r:>26} : {elapsed * 1e3:7.3f} ms, {len(results):>6} hits, top={top}")
@@ -0,0 +1,259 @@
+import logging
+import sqlite3
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PyQt5.QtCore import QTimer
+
+import pah_data as pahd
+import pah_utils as pahu
+
+# === SQLite storage backend for PackageMap ===
+# Only dirty / removed rows are written, in a single transaction.
+# Both backends debounce save() : a burst of saves is one write.
+
+SAVE_DEBOUNCE_MS = 500
+# Lignes lues par page au chargement (l'UI reprend la main entre deux pages)
+LOAD_PAGE_SIZE = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS packages (
+    pkg       TEXT    NOT NULL,
+    vcode     INTEGER NOT NULL,
+    label     TEXT    NOT NULL DEFAULT '',
+    android   INTEGER NOT NULL DEFAULT 0,
+    local     INTEGER NOT NULL DEFAULT 0,
+    checked   INTEGER NOT NULL DEFAULT 0,
+    file_hash TEXT    NOT NULL DEFAULT '',
+    file_name TEXT    NOT NULL DEFAULT '',
+    min_sdk   INTEGER NOT NULL DEFAULT 0,
+    abis      TEXT    NOT NULL DEFAULT '',
+    PRIMARY KEY (pkg, vcode)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Colonnes ajoutées après la première version du schéma (bases existantes)
+MIGRATIONS = {
+    "min_sdk": "ALTER TABLE packages ADD COLUMN min_sdk INTEGER NOT NULL DEFAULT 0",
+    "abis": "ALTER TABLE packages ADD COLUMN abis TEXT NOT NULL DEFAULT ''",
+}
+
+
+class SqlitePackageStore:
+    """Persistance SQLite (WAL) du PackageMap, écritures incrémentales."""
+
+    def __init__(self, db_path: Path = None, debounce_ms: int = SAVE_DEBOUNCE_MS):
+        self.db_path = db_path or Path(__file__).parent / "extracted_apks" / "packagemap.db"
+        self._conn = None
+        self._pkg_map = None
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._write_dirty)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate(self._conn)
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(packages)")}
+        with conn:
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+                    logging.info(f"PackageMap database : column {column} added")
+
+    def close(self) -> None:
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _get_meta(self, key: str) -> str:
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else ""
+
+    def load_into(self, pkg_map) -> int:
+        """Charge toutes les lignes dans pkg_map. Retourne le nombre d'entrées."""
+        loaded_count = 0
+        for loaded_count in self.iter_load(pkg_map):
+            pass
+        return loaded_count
+
+    def iter_load(self, pkg_map, page_size: int = LOAD_PAGE_SIZE):
+        """Charge les lignes par pages de page_size (import unique de packagemap.json
+        au premier lancement). Produit le nombre d'entrées chargées après chaque page."""
+        conn = self._connection()
+        if not self._get_meta("json_imported"):
+            self.import_json(pkg_map.get_save_file_path(), pkg_map)
+        pkg_map.clear_dirty()
+
+        loaded_count = 0
+        last_key = ("", -1)
+        while True:
+            # Pagination sur la clé primaire : pas de curseur ouvert entre deux pages
+            page = conn.execute(
+                "SELECT pkg, vcode, label, android, local, checked, file_hash, file_name, min_sdk, abis "
+                "FROM packages WHERE (pkg, vcode) > (?, ?) ORDER BY pkg, vcode LIMIT ?",
+                (*last_key, page_size),
+            ).fetchall()
+            for pkg, vcode, label, android, local, checked, file_hash, file_name, min_sdk, abis in page:
+                pkg_map.load_entry(pkg, vcode, pahd.PackageInfo(
+                    label=label,
+                    android=bool(android),
+                    local=bool(local),
+                    checked=bool(checked),
+                    file_hash=file_hash,
+                    file_name=file_name,
+                    min_sdk=min_sdk,
+                    abis=abis,
+                ))
+            loaded_count += len(page)
+            if len(page) < page_size:
+                break
+            last_key = page[-1][:2]
+            yield loaded_count
+        logging.info(f"PackageMap loaded {loaded_count} entries from {self.db_path}")
+        yield loaded_count
+
+    def import_json(self, json_path: Path, pkg_map) -> int:
+        """Import unique du packagemap.json historique."""
+        imported = 0
+        if json_path.exists():
+            legacy = pahd.PackageMap()
+            imported = legacy.load_from_file(json_path)
+            self._write(((key, info) for key, info in legacy.items()), ())
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', '1')")
+        if imported:
+            logging.info(f"Imported {imported} entries from {json_path}")
+        return imported
+
+    def save_dirty(self, pkg_map) -> int:
+        """Planifie l'écriture des entrées modifiées / supprimées (debounce).
+        Retourne le nombre d'entrées en attente."""
+        dirty, removed = pkg_map.get_dirty()
+        if not dirty and not removed:
+            return 0
+        self._pkg_map = pkg_map
+        self._timer.start()  # redémarre le délai si une écriture est déjà planifiée
+        return len(dirty) + len(removed)
+
+    def _write_dirty(self) -> int:
+        """Écrit uniquement les entrées modifiées / supprimées. Retourne le nombre de lignes."""
+        pkg_map = self._pkg_map
+        if pkg_map is None:
+            return 0
+        dirty, removed = pkg_map.get_dirty()
+        if not dirty and not removed:
+            return 0
+        rows = [(key, info) for key in dirty if (info := pkg_map.get(key[0], key[1]))]
+        try:
+            self._write(rows, removed)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to save PackageMap: {e}")
+            return 0
+        pkg_map.clear_dirty()
+        logging.debug(f"PackageMap : {len(rows)} rows written, {len(removed)} removed")
+        return len(rows) + len(removed)
+
+    def flush(self) -> None:
+        """Écrit immédiatement une sauvegarde en attente."""
+        if self._timer.isActive():
+            self._timer.stop()
+            self._write_dirty()
+
+    def _write(self, rows, removed) -> None:
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO packages "
+                "(pkg, vcode, label, android, local, checked, file_hash, file_name, min_sdk, abis) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (pkg, vcode, info.label, int(info.android), int(info.local),
+                     int(info.checked), info.file_hash, info.file_name, info.min_sdk, info.abis)
+                    for (pkg, vcode), info in rows
+                ),
+            )
+            conn.executemany("DELETE FROM packages WHERE pkg = ? AND vcode = ?", list(removed))
+
+
+# === JSON storage backend (debounced background save) ===
+
+
+class JsonPackageStore:
+    """Persistance JSON : les rafales de save() sont regroupées en une seule écriture,
+    faite en arrière-plan depuis un snapshot puis remplacée atomiquement."""
+
+    def __init__(self, json_path: Path = None, debounce_ms: int = SAVE_DEBOUNCE_MS):
+        self.json_path = json_path
+        self._pkg_map = None
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._write_snapshot)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pah-save")
+        self._pending_write = None
+
+    def load_into(self, pkg_map) -> int:
+        if self.json_path is None:
+            self.json_path = pkg_map.get_save_file_path()
+        loaded_count = pkg_map.load_from_file(self.json_path)
+        pkg_map.clear_dirty()
+        return loaded_count
+
+    def iter_load(self, pkg_map):
+        """Le fichier JSON se lit d'un bloc : une seule page."""
+        yield self.load_into(pkg_map)
+
+    def save_dirty(self, pkg_map) -> int:
+        """Planifie une écriture (debounce). Retourne le nombre d'entrées modifiées."""
+        dirty, removed = pkg_map.get_dirty()
+        if not dirty and not removed:
+            return 0
+        if self.json_path is None:
+            self.json_path = pkg_map.get_save_file_path()
+        self._pkg_map = pkg_map
+        pkg_map.clear_dirty()
+        self._timer.start()  # redémarre le délai si une écriture est déjà planifiée
+        return len(dirty) + len(removed)
+
+    def _write_snapshot(self) -> None:
+        """Thread UI : snapshot immuable, écriture déléguée au thread de sauvegarde."""
+        if self._pkg_map is None:
+            return
+        snapshot = self._pkg_map.to_serializable()
+        self._pending_write = self._executor.submit(self._write_file, self.json_path, snapshot)
+
+    @staticmethod
+    def _write_file(json_path: Path, snapshot: dict) -> None:
+        try:
+            pahu.write_json_atomic(json_path, snapshot, indent=2)
+            logging.info(f"PackageMap saved to {json_path}")
+        except Exception as e:
+            logging.error(f"Failed to save PackageMap: {e}")
+
+    def flush(self) -> None:
+        """Écrit immédiatement une sauvegarde en attente et attend sa fin."""
+        if self._timer.isActive():
+            self._timer.stop()
+            self._write_snapshot()
+        if self._pending_write is not None:
+            self._pending_write.result()
+            self._pending_write = None
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown(wait=True)
@@ -1,4 +1,6 @@
 import logging
+import json
+import os
 import subprocess
 import shutil
 import hashlib
@@ -20,12 +22,42 @@ def clean_tmp_dir(tmpdir: Path):
         shutil.rmtree(tmpdir)
     tmpdir.mkdir(parents=True, exist_ok=True)
 
+def write_json_atomic(file_path: Path, data, indent=None):
+    """Write data as JSON to a temp file, fsync it, then atomically replace file_path.
+    A crash mid-write leaves the previous file intact instead of a truncated one."""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Persist the rename itself (POSIX)
+        dir_fd = os.open(file_path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def connected_devices() -> list[str]:
+    """Serials of the devices ready for commands (state 'device')."""
+    import pah_adb as pahad  # pah_adb depends on this module
+    try:
+        serials = [serial for serial, state in pahad.get_client().devices() if state == "device"]
+    except (OSError, PAHError) as e:
+        logging.debug(f"adb server unreachable: {e}")
+        return []
+    pahad.forget_disconnected(serials)
+    return serials
+
 def check_adb_connection():
     """Check that at least one device is connected via ADB."""
-    result = subprocess.run(
-        ["adb", "devices"], capture_output=True, text=True
-    )
-    devices = [line for line in result.stdout.splitlines() if line.strip().endswith("device")]
+    devices = connected_devices()
     adb_connect = bool(devices)
     if not adb_connect:
         logging.debug("\nNo ADB device detected.")
@@ -1,22 +1,387 @@
+import bisect
 import logging
 
-from collections import defaultdict
-from PyQt5.QtCore import Qt, QObject, QModelIndex, QItemSelectionModel
-from PyQt5.QtGui import QColor, QStandardItemModel, QStandardItem
+from PyQt5.QtCore import (Qt, QObject, QModelIndex, QItemSelection, QItemSelectionModel,
+                          QAbstractTableModel, QSortFilterProxyModel, QTimer, pyqtSignal)
+from PyQt5.QtGui import QBrush, QColor
 from PyQt5.QtWidgets import QAbstractItemView, QTableView
 
 import pah_data as pahd
+import pah_search as pahse
+
+# Délai entre la dernière frappe dans la recherche et l'application du filtre
+FILTER_DEBOUNCE_MS = 150
+# Période d'application des mises à jour des workers (~10 Hz)
+UPDATE_BUS_INTERVAL_MS = 100
+
+
+class PackageTableModel(QAbstractTableModel):
+    """
+    Modèle virtuel au-dessus de PackageMap.
+    - aucune cellule n'est allouée : data() lit PackageMap à la demande (lignes visibles uniquement)
+    - une ligne par clé (pkg, vcode_int), dans l'ordre d'ajout : filtre et tri sont faits par le proxy
+    - colonne 5 = état coché exposé via Qt.CheckStateRole (état UI, non persisté)
+    - paquets rejetés par le contrôle pré-installation : fond rouge, raison en info-bulle
+    """
+
+    HEADERS = ["Label", "Package", "Version", "Android", "Local", "Select"]
+    COL_LABEL, COL_PKG, COL_VERSION, COL_ANDROID, COL_LOCAL, COL_SELECT = range(6)
+
+    OLDEST_BRUSH = QBrush(QColor(255, 230, 180))
+    MIDDLE_BRUSH = QBrush(QColor(255, 255, 180))
+    NEWEST_BRUSH = QBrush(QColor(200, 255, 200))
+    REJECTED_BRUSH = QBrush(QColor(255, 190, 190))
+
+    # Au-delà, un delta de scan est appliqué par reset plutôt que ligne à ligne
+    RESET_THRESHOLD = 500
+
+    # Émis quand l'index de recherche a changé (le proxy recalcule la requête courante)
+    search_index_changed = pyqtSignal()
+
+    def __init__(self, pkg_map: pahd.PackageMap, parent=None):
+        super().__init__(parent)
+        self.pkg_map = pkg_map
+        self._keys: list[tuple[str, int]] = []
+        # clé -> ligne (maintenu à travers insertions / suppressions)
+        self._rows: dict[tuple[str, int], int] = {}
+        # pkg -> version codes présents dans le modèle (lignes à rafraîchir pour un package)
+        self._pkg_versions: dict[str, set[int]] = {}
+        # index tokens / trigrammes, mis à jour avec les lignes
+        self.search_index = pahse.SearchIndex()
+        self.checked: set[tuple[str, int]] = set()
+        # clé -> raison d'incompatibilité avec l'appareil (dernier contrôle pré-installation)
+        self.rejected: dict[tuple[str, int], str] = {}
+
+    # --- Interface Qt ---
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        key = self._keys[index.row()]
+        info = self.pkg_map.get_by_key(key)
+        if info is None:
+            return None
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            if col == self.COL_LABEL:
+                return info.label
+            if col == self.COL_PKG:
+                return key[0]
+            if col == self.COL_VERSION:
+                return str(key[1])
+            if col == self.COL_ANDROID:
+                return "✓" if info.android else ""
+            if col == self.COL_LOCAL:
+                return "✓" if info.local else ""
+            return None
+        if role == Qt.CheckStateRole and col == self.COL_SELECT:
+            return Qt.Checked if key in self.checked else Qt.Unchecked
+        if role == Qt.BackgroundRole:
+            if key in self.rejected:
+                return self.REJECTED_BRUSH
+            return self._version_brush(key)
+        if role == Qt.ToolTipRole:
+            return self.rejected.get(key)
+        return None
+
+    # --- Lignes ---
+
+    def key_at(self, row: int) -> tuple[str, int]:
+        return self._keys[row]
+
+    def row_of(self, key: tuple[str, int]) -> int | None:
+        return self._rows.get(key)
+
+    def _package_labels(self, pkg: str):
+        """Labels des versions d'un package (None si plus aucune version : désindexation)."""
+        versions = self.pkg_map.get_versions(pkg)
+        if not versions:
+            return None
+        return {info.label for _, info in versions if info.label}
+
+    def sort_key(self, row: int, column: int):
+        """Valeur de tri d'une cellule (utilisée par le proxy)."""
+        key = self._keys[row]
+        if column == self.COL_PKG:
+            return key
+        if column == self.COL_VERSION:
+            return key[1], key[0]
+        if column == self.COL_SELECT:
+            return key in self.checked, key
+        info = self.pkg_map.get_by_key(key)
+        if column == self.COL_ANDROID:
+            return info.android, key
+        if column == self.COL_LOCAL:
+            return info.local, key
+        return info.label, key
+
+    def _reindex(self, start: int = 0) -> None:
+        """Met à jour clé -> ligne à partir de start."""
+        keys = self._keys
+        rows = self._rows
+        for row in range(start, len(keys)):
+            rows[keys[row]] = row
+
+    def _append_row(self, key: tuple[str, int]) -> None:
+        row = len(self._keys)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._keys.append(key)
+        self._rows[key] = row
+        self._pkg_versions.setdefault(key[0], set()).add(key[1])
+        self.endInsertRows()
+
+    def _remove_rows(self, rows) -> None:
+        """Supprime des lignes par plages contiguës (de la fin vers le début),
+        clé -> ligne recalculé une seule fois pour tout le lot."""
+        rows = sorted(set(rows), reverse=True)
+        if not rows:
+            return
+        start = 0
+        while start < len(rows):
+            end = start
+            while end + 1 < len(rows) and rows[end + 1] == rows[end] - 1:
+                end += 1
+            first, last = rows[end], rows[start]
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for key in self._keys[first:last + 1]:
+                del self._rows[key]
+                versions = self._pkg_versions.get(key[0])
+                if versions is not None:
+                    versions.discard(key[1])
+                    if not versions:
+                        del self._pkg_versions[key[0]]
+            del self._keys[first:last + 1]
+            self.endRemoveRows()
+            start = end + 1
+        self._reindex(rows[-1])
+
+    def _version_brush(self, key: tuple[str, int]):
+        versions = self.pkg_map.version_codes(key[0])
+        if len(versions) <= 1:
+            return None
+        pos = bisect.bisect_left(versions, key[1])
+        if pos == 0:
+            return self.OLDEST_BRUSH
+        if pos == len(versions) - 1:
+            return self.NEWEST_BRUSH
+        return self.MIDDLE_BRUSH
+
+    def reload(self) -> None:
+        """Recalcule les lignes depuis PackageMap : aucune allocation de cellule."""
+        self.beginResetModel()
+        self._keys = []
+        self._pkg_versions = {}
+        labels_by_pkg: dict[str, set[str]] = {}
+        for key, info in self.pkg_map.items():
+            self._keys.append(key)
+            self._pkg_versions.setdefault(key[0], set()).add(key[1])
+            labels = labels_by_pkg.setdefault(key[0], set())
+            if info.label:
+                labels.add(info.label)
+        self._rows = {}
+        self._reindex()
+        self.search_index.rebuild(labels_by_pkg)
+        self.checked = {key for key in self.checked if self.pkg_map.get_by_key(key) is not None}
+        self.endResetModel()
+        self.search_index_changed.emit()
+
+    def update_keys(self, keys) -> None:
+        """Met à jour des lignes précises : dataChanged, insertion ou suppression.
+        Le proxy re-filtre / re-trie uniquement les lignes concernées."""
+        last_col = len(self.HEADERS) - 1
+        packages = set()
+        removed_rows = []
+        for key in keys:
+            info = self.pkg_map.get_by_key(key)
+            row = self.row_of(key)
+            packages.add(key[0])
+            if info is None:
+                self.checked.discard(key)
+                self.rejected.pop(key, None)
+                if row is not None:
+                    removed_rows.append(row)
+            elif row is None:
+                self._append_row(key)
+            else:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_col))
+        # suppressions en fin de passe : les lignes ajoutées le sont en fin de table
+        self._remove_rows(removed_rows)
+        for pkg in packages:
+            self.search_index.update_package(pkg, self._package_labels(pkg))
+        if packages:
+            self.search_index_changed.emit()
+
+    def refresh_package(self, pkg: str) -> None:
+        """Met à jour toutes les versions d'un package (couleurs de version incluses)."""
+        self.refresh_packages((pkg,))
+
+    def refresh_packages(self, packages) -> None:
+        """Met à jour les groupes de versions des packages donnés, en un seul passage."""
+        keys = set()
+        for pkg in packages:
+            keys.update((pkg, v) for v in self._pkg_versions.get(pkg, ()))
+            keys.update((pkg, v) for v in self.pkg_map.version_codes(pkg))
+        self.update_keys(sorted(keys))
+
+    def apply_delta(self, delta) -> None:
+        """Applique un ScanDelta : mises à jour ciblées, ou reset si le delta est volumineux."""
+        if delta.is_empty():
+            return
+        if len(delta.added) + len(delta.removed) + len(delta.modified) > self.RESET_THRESHOLD:
+            self.reload()
+            return
+        self.refresh_packages(delta.changed_packages())
+
+    # --- État coché ---
+
+    def set_checked(self, key: tuple[str, int], checked: bool) -> None:
+        if (key in self.checked) == checked:
+            return
+        if checked:
+            self.checked.add(key)
+        else:
+            self.checked.discard(key)
+        row = self.row_of(key)
+        if row is not None:
+            index = self.index(row, self.COL_SELECT)
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+
+    def set_rows_checked(self, top: int, bottom: int, checked: bool) -> None:
+        for key in self._keys[top:bottom + 1]:
+            if checked:
+                self.checked.add(key)
+            else:
+                self.checked.discard(key)
+        self.dataChanged.emit(
+            self.index(top, self.COL_SELECT), self.index(bottom, self.COL_SELECT), [Qt.CheckStateRole])
+
+    def checked_keys(self) -> list[tuple[str, int]]:
+        """Clés cochées encore présentes dans PackageMap, triées (pkg, vcode)."""
+        return sorted(key for key in self.checked if self.pkg_map.get_by_key(key) is not None)
+
+    def set_rejected(self, reasons: dict[tuple[str, int], str]) -> None:
+        """Remplace les raisons de rejet pré-installation (lignes concernées seulement)."""
+        changed = self.rejected.keys() | reasons.keys()
+        self.rejected = dict(reasons)
+        last_col = len(self.HEADERS) - 1
+        for key in changed:
+            row = self.row_of(key)
+            if row is not None:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_col),
+                                      [Qt.BackgroundRole, Qt.ToolTipRole])
+
+    def set_checked_keys(self, keys: set[tuple[str, int]]) -> None:
+        """Remplace l'état coché en une seule notification."""
+        self.checked = set(keys)
+        if self._keys:
+            self.dataChanged.emit(
+                self.index(0, self.COL_SELECT),
+                self.index(len(self._keys) - 1, self.COL_SELECT),
+                [Qt.CheckStateRole],
+            )
+
+
+class PackageFilterProxyModel(QSortFilterProxyModel):
+    """Filtre et tri devant PackageTableModel.
+    Le filtre est une requête pah_search (termes approchés / préfixes + installed: local: multi:)
+    évaluée une fois sur l'index ; filterAcceptsRow ne fait qu'un lookup par ligne.
+    Tant qu'aucune colonne n'est choisie, les résultats sont classés par pertinence."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filter_text = ""
+        self._query = pahse.SearchQuery()
+        self._scores: dict[str, float] | None = None  # None = pas de terme texte
+        self.rank_by_relevance = False
+        self.setDynamicSortFilter(True)
+
+    def setSourceModel(self, model) -> None:
+        super().setSourceModel(model)
+        model.search_index_changed.connect(self.refresh_query)
+
+    def set_filter_text(self, text: str) -> None:
+        text = text.lower().strip()
+        if text == self.filter_text:
+            return
+        self.filter_text = text
+        self._query = pahse.parse_query(text)
+        self._scores = self.sourceModel().search_index.search(self._query)
+        self.rank_by_relevance = bool(self._scores)
+        self.invalidate()
+
+    def refresh_query(self) -> None:
+        """L'index a changé : réévalue la requête courante (inutile sans filtre)."""
+        if self._query.is_empty():
+            return
+        self._scores = self.sourceModel().search_index.search(self._query)
+        self.invalidateFilter()
+
+    def set_rank_by_relevance(self, enabled: bool) -> None:
+        if enabled != self.rank_by_relevance:
+            self.rank_by_relevance = enabled
+            self.invalidate()
+
+    def filterAcceptsRow(self, source_row: int, source_parent) -> bool:
+        query = self._query
+        if query.is_empty():
+            return True
+        source = self.sourceModel()
+        key = source.key_at(source_row)
+        if self._scores is not None and key[0] not in self._scores:
+            return False
+        if query.qualifiers:
+            info = source.pkg_map.get_by_key(key)
+            values = {
+                "installed": info.android,
+                "local": info.local,
+                "multi": len(source.pkg_map.version_codes(key[0])) > 1,
+            }
+            return all(values[name] == wanted for name, wanted in query.qualifiers.items())
+        return True
+
+    def accepts_key(self, key: tuple[str, int]) -> bool:
+        """La ligne de cette clé passe le filtre courant (False si absente du modèle)."""
+        row = self.sourceModel().row_of(key)
+        return row is not None and self.filterAcceptsRow(row, QModelIndex())
+
+    def lessThan(self, left, right) -> bool:
+        source = self.sourceModel()
+        column = left.column()
+        if self.rank_by_relevance and self._scores:
+            left_score = self._scores.get(source.key_at(left.row())[0], 0.0)
+            right_score = self._scores.get(source.key_at(right.row())[0], 0.0)
+            if left_score != right_score:
+                # meilleur score en tête quel que soit le sens du tri
+                if self.sortOrder() == Qt.DescendingOrder:
+                    return left_score < right_score
+                return left_score > right_score
+        return source.sort_key(left.row(), column) < source.sort_key(right.row(), column)
 
 
 class PackageTableAdapter(QObject):
     """
-    Adaptateur QTableView + QStandardItemModel.
+    Adaptateur QTableView + PackageFilterProxyModel + PackageTableModel.
     - colonne 5 = case cochable native Qt
-    - l’état coché est conservé côté UI via checked_state
-    - is_checked() lit l’état réel du modèle affiché
+    - l’état coché est conservé côté UI dans le modèle source (PackageTableModel.checked)
+    - la sélection de lignes (coordonnées proxy) pilote l’état coché
     """
 
-    HEADERS = ["Label", "Package", "Version", "Android", "Local", "Select"]
+    HEADERS = PackageTableModel.HEADERS
 
     def __init__(self, table: QTableView, pkg_map: pahd.PackageMap):
         super().__init__()
@@ -24,14 +389,22 @@ class PackageTableAdapter(QObject):
         self.view = table  # ← IMPORTANT : définir AVANT utilisation
         self.pkg_map = pkg_map
 
-        self.model = QStandardItemModel(0, len(self.HEADERS), self.view)
-        self.view.setModel(self.model)
+        self.model = PackageTableModel(pkg_map, self.view)
+        self.proxy = PackageFilterProxyModel(self.view)
+        self.proxy.setSourceModel(self.model)
+        self.view.setModel(self.proxy)
         self.view.setSortingEnabled(True)
         self.view.sortByColumn(0, Qt.AscendingOrder)
+        # un clic sur une colonne remplace le classement par pertinence
+        self.view.horizontalHeader().sectionClicked.connect(
+            lambda _section: self.proxy.set_rank_by_relevance(False))
 
-        self._row_index: dict[tuple[str, str], int] = {}
-        self.checked_state: dict[tuple[str, str], bool] = {}
-        self.filter_text = ""
+        # filtre différé : une seule passe après la dernière frappe
+        self._pending_filter = ""
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self._filter_timer.timeout.connect(self._apply_filter)
 
         self.last_clicked_row: int | None = None
         self._dragging = False
@@ -44,232 +417,130 @@ class PackageTableAdapter(QObject):
 
         self.view.selectionModel().selectionChanged.connect(self._on_selection_changed)
 
+    @property
+    def filter_text(self) -> str:
+        return self.proxy.filter_text
+
     def _on_selection_changed(self, selected, deselected) -> None:
         self._switch_state_selection(selected, True)
         self._switch_state_selection(deselected, False)
 
-    def _switch_state_selection(self, selection, state:bool) -> None:
-        for selection_range in selection:
-            top = selection_range.top()
-            bottom = selection_range.bottom()
-
-            for row in range(top, bottom + 1):
-                pkg_item = self.model.item(row, 1)
-                vcode_item = self.model.item(row, 2)
-
-                if not pkg_item or not vcode_item:
-                    continue
-                key = (pkg_item.text(), vcode_item.text())
-                self.checked_state[key] = state
-                item = self.model.item(row, 5)
-                # UI sync immédiate (LOCAL ONLY)
-                if (item.text()=="●" and state) or ( item.text()=="" and not state):
-                    logging.debug(f"{pkg_item.text()}: check state ≠ selected state")
-                if item:
-                    item.setText("●" if state else "")
-                    logging.debug(f"{pkg_item.text()}: checked" if state else f"{pkg_item.text()}: unchecked")
+    def _switch_state_selection(self, selection, state: bool) -> None:
+        for selection_range in self.proxy.mapSelectionToSource(selection):
+            self.model.set_rows_checked(selection_range.top(), selection_range.bottom(), state)
+            logging.debug(f"rows {selection_range.top()}-{selection_range.bottom()}: "
+                          f"{'checked' if state else 'unchecked'}")
 
     def refresh(self) -> None:
-        """Reconstruit le modèle depuis PackageMap."""
-        data = sorted(
-            self.pkg_map.get_all_packages().items(),
-            key=lambda x: (x[0][0], x[0][1])
-        )
-        if self.filter_text:
-            filtered = []
-            for (pkg, vcode), info in data:
-                if (
-                    self.filter_text in pkg.lower()
-                    or self.filter_text in (info.label or "").lower()
-                ):
-                    filtered.append(((pkg, vcode), info))
-            data = filtered
-
-        self.model.setRowCount(len(data))
-        self.model.blockSignals(True)
-        try:
-            self.model.clear()
-            self.model.setColumnCount(len(self.HEADERS))
-            self.model.setHorizontalHeaderLabels(self.HEADERS)
-            self.model.setRowCount(len(data))
-            self._row_index.clear()
-            pkg_name_to_rows = defaultdict(list)
-
-            for row, ((pkg, vcode_int), info) in enumerate(data):
-                vcode_str = str(vcode_int)
-                self.model.setItem(row, 0, self._ro_item(info.label))
-                self.model.setItem(row, 1, self._ro_item(pkg))
-                self.model.setItem(row, 2, self._ro_item(vcode_str))
-                self.model.setItem(row, 3, self._ro_item("✓" if info.android else ""))
-                self.model.setItem(row, 4, self._ro_item("✓" if info.local else ""))
-                chk = QStandardItem()
-                chk.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-                self.model.setItem(row, 5, chk)
-                pkg_name_to_rows[pkg].append(row)
-            self.render_checked_state()
-            self._apply_version_colors(pkg_name_to_rows)
-        finally:
-            self.model.blockSignals(False)
+        """Recalcule les lignes depuis PackageMap (sans allouer de cellules)."""
+        self.model.reload()
 
-        self.view.setSortingEnabled(True)
-        self.view.sortByColumn(
-            self.view.horizontalHeader().sortIndicatorSection(),
-            self.view.horizontalHeader().sortIndicatorOrder()
-        )
+    def refresh_package(self, pkg: str) -> None:
+        """Mise à jour ciblée des lignes d'un package (dataChanged, pas de reset)."""
+        self.model.refresh_package(pkg)
+
+    def refresh_packages(self, packages) -> None:
+        self.model.refresh_packages(packages)
 
-    def _ro_item(self, text) -> QStandardItem:
-        item = QStandardItem(str(text))
-        item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-        return item
+    def apply_delta(self, delta) -> None:
+        """Applique un ScanDelta au modèle affiché sans le reconstruire."""
+        self.model.apply_delta(delta)
 
     def is_checked(self, pkg: str, vcode: str) -> bool:
-        index = self.find_index(pkg, vcode)
-        if not index.isValid():
-            return False
-        item = self.model.item(index.row(), 5)
-        return item and item.text() == "●"
+        """Coché et affiché : une ligne masquée par le filtre n'est pas sélectionnée."""
+        key = (pkg, int(vcode))
+        return key in self.model.checked and self.proxy.accepts_key(key)
 
     def set_checked(self, pkg: str, vcode: str, checked: bool) -> None:
-        index = self.find_index(pkg, vcode)
-        if not index.isValid():
-            return
-        item = self.model.item(index.row(), 5)
-        if item:
-            item.setText("●" if checked else "")
+        self.model.set_checked((pkg, int(vcode)), checked)
 
-    def set_filter(self, text: str) -> None:
-        self.filter_text = text.lower().strip()
-        self.refresh()
+    def checked_keys(self) -> list[tuple[str, int]]:
+        """Sélection courante en une passe : [(pkg, vcode_int), ...] triée.
+        Les lignes cochées puis masquées par le filtre n'en font pas partie."""
+        accepts = self.proxy.accepts_key
+        return [key for key in self.model.checked_keys() if accepts(key)]
 
-    def toggle_all_checked(self) -> None:
-        if not self.model.rowCount():
-            return
-        # état global courant
-        all_checked = all(
-            self.is_checked(
-                self.model.item(row, 1).text(),
-                self.model.item(row, 2).text()
-            )
-            for row in range(self.model.rowCount())
-            if self.model.item(row, 1) and self.model.item(row, 2)
-        )
-        new_state = not all_checked
+    def set_rejected(self, reasons: dict[tuple[str, int], str]) -> None:
+        """Affiche les paquets rejetés par le contrôle pré-installation et leur raison."""
+        self.model.set_rejected(reasons)
+
+    def set_filter(self, text: str) -> None:
+        """Appelé à chaque frappe : le filtre est appliqué après FILTER_DEBOUNCE_MS."""
+        self._pending_filter = text
+        self._filter_timer.start()
+
+    def _apply_filter(self) -> None:
+        self.proxy.set_filter_text(self._pending_filter)
+
+    def _visible_keys(self) -> list[tuple[str, int]]:
+        """Clés affichées (après filtre), dans l'ordre de la vue."""
+        proxy = self.proxy
+        return [
+            self.model.key_at(proxy.mapToSource(proxy.index(row, 0)).row())
+            for row in range(proxy.rowCount())
+        ]
+
+    def _select_rows(self, rows) -> None:
+        """Sélectionne les lignes de la vue (plages contiguës), signaux de sélection bloqués."""
         sel_model = self.view.selectionModel()
-        if sel_model:
-            sel_model.blockSignals(True)
-        self.model.blockSignals(True)
+        if not sel_model:
+            return
+        selection = QItemSelection()
+        last_col = self.proxy.columnCount() - 1
+        start = prev = None
+        for row in rows:
+            if start is None:
+                start = prev = row
+            elif row == prev + 1:
+                prev = row
+            else:
+                selection.select(self.proxy.index(start, 0), self.proxy.index(prev, last_col))
+                start = prev = row
+        if start is not None:
+            selection.select(self.proxy.index(start, 0), self.proxy.index(prev, last_col))
+
+        sel_model.blockSignals(True)
         try:
             # reset sélection dans tous les cas
-            if sel_model:
-                sel_model.clearSelection()
-                sel_model.setCurrentIndex(QModelIndex(), QItemSelectionModel.NoUpdate)
-
-            for row in range(self.model.rowCount()):
-                pkg_item = self.model.item(row, 1)
-                vcode_item = self.model.item(row, 2)
-                item = self.model.item(row, 5)
-                if not pkg_item or not vcode_item or not item:
-                    continue
-                key = (pkg_item.text(), vcode_item.text())
-
-                # --- LOGIQUE ---
-                self.checked_state[key] = new_state
-                item.setText("●" if new_state else "")
-
-                # --- UI SELECTION ---
-                if sel_model and new_state:
-                    index = self.model.index(row, 0)
-                    sel_model.select(
-                        index,
-                        QItemSelectionModel.Select | QItemSelectionModel.Rows
-                    )
+            sel_model.clearSelection()
+            sel_model.setCurrentIndex(QModelIndex(), QItemSelectionModel.NoUpdate)
+            if not selection.isEmpty():
+                sel_model.select(selection, QItemSelectionModel.Select)
         finally:
-            self.model.blockSignals(False)
-            if sel_model:
-                sel_model.blockSignals(False)
-        self.render_checked_state()
+            sel_model.blockSignals(False)
         self.view.viewport().update()
+
+    def toggle_all_checked(self) -> None:
+        keys = self._visible_keys()
+        if not keys:
+            return
+        # état global courant
+        new_state = not self.model.checked.issuperset(keys)
+        if new_state:
+            self.model.set_checked_keys(self.model.checked.union(keys))
+            self._select_rows(range(len(keys)))
+        else:
+            self.model.set_checked_keys(self.model.checked.difference(keys))
+            self._select_rows(())
         logging.debug("Select+Check all toggled -> %s", new_state)
 
     def select_and_check_all(self) -> None:
-        if not self.model.rowCount():
+        keys = self._visible_keys()
+        if not keys:
             return
-        sel_model = self.view.selectionModel()
-        if sel_model:
-            sel_model.blockSignals(True)
-
-        self.model.blockSignals(True)
-        try:
-            # reset sélection
-            if sel_model:
-                sel_model.clearSelection()
-                sel_model.setCurrentIndex(QModelIndex(), QItemSelectionModel.NoUpdate)
-
-            for row in range(self.model.rowCount()):
-                pkg_item = self.model.item(row, 1)
-                vcode_item = self.model.item(row, 2)
-
-                if not pkg_item or not vcode_item:
-                    continue
-                key = (pkg_item.text(), vcode_item.text())
-                # --- CHECK ---
-                self.checked_state[key] = True
-                # --- SELECT ---
-                if sel_model:
-                    index = self.model.index(row, 0)
-                    sel_model.select(
-                        index,
-                        QItemSelectionModel.Select | QItemSelectionModel.Rows
-                    )
-        finally:
-            self.model.blockSignals(False)
-            if sel_model:
-                sel_model.blockSignals(False)
-        # rendu des checks
-        self.render_checked_state()
-        self.view.viewport().update()
+        self.model.set_checked_keys(self.model.checked.union(keys))
+        self._select_rows(range(len(keys)))
         logging.debug("Select + Check ALL applied")
 
     def invert_all(self) -> None:
-        if not self.model.rowCount():
+        keys = self._visible_keys()
+        if not keys:
             return
-        sel_model = self.view.selectionModel()
-
-        if sel_model:
-            sel_model.blockSignals(True)
-        self.model.blockSignals(True)
-
-        try:
-            if sel_model:
-                sel_model.clearSelection()
-                sel_model.setCurrentIndex(QModelIndex(), QItemSelectionModel.NoUpdate)
-
-            for row in range(self.model.rowCount()):
-                pkg_item = self.model.item(row, 1)
-                vcode_item = self.model.item(row, 2)
-                item = self.model.item(row, 5)
-                if not pkg_item or not vcode_item or not item:
-                    continue
-                key = (pkg_item.text(), vcode_item.text())
-                # état actuel (UI = source de vérité ici)
-                current_state = (item.text() == "●")
-                new_state = not current_state
-                # --- DATA ---
-                self.checked_state[key] = new_state
-                # --- UI CHECK ---
-                item.setText("●" if new_state else "")
-                # --- UI SELECTION ---
-                if sel_model and new_state:
-                    index = self.model.index(row, 0)
-                    sel_model.select(
-                        index,
-                        QItemSelectionModel.Select | QItemSelectionModel.Rows
-                    )
-        finally:
-            self.model.blockSignals(False)
-            if sel_model:
-                sel_model.blockSignals(False)
-        self.view.viewport().update()
+        visible = set(keys)
+        checked = self.model.checked
+        new_checked = (checked - visible) | (visible - checked)
+        self.model.set_checked_keys(new_checked)
+        self._select_rows(row for row, key in enumerate(keys) if key in new_checked)
         logging.debug("Invert selection + checked")
 
     # Clear_1=> selection
@@ -278,55 +549,56 @@ class PackageTableAdapter(QObject):
         if sel_model:
             sel_model.clearSelection() # Selection
             sel_model.setCurrentIndex(QModelIndex(), QItemSelectionModel.NoUpdate)
-        self.clear_all_checked() # checked_state + item ""
+        self.clear_all_checked() # état coché du modèle
 
     # Clear 2 => checked
     def clear_all_checked(self):
-        self.checked_state.clear()
-        for row in range(self.model.rowCount()):
-            item = self.model.item(row, 5)
-            if item:
-                item.setText("")
+        self.model.set_checked_keys(set())
 
     def find_index(self, pkg: str, vcode: str):
-        for row in range(self.model.rowCount()):
-            p = self.model.item(row, 1)
-            v = self.model.item(row, 2)
-            if p and v and (p.text(), v.text()) == (pkg, str(vcode)):
-                return self.model.index(row, 0)
-        return QModelIndex()
-
-    def _apply_version_colors(self, pkg_rows):
-        for pkg, rows in pkg_rows.items():
-            if len(rows) <= 1:
-                continue
-            versions = []
-
-            for r in rows:
-                v = int(self.model.item(r, 2).text())
-                versions.append((r, v))
-            versions.sort(key=lambda x: x[1])
-
-            for i, (row, _) in enumerate(versions):
-                color = (
-                    QColor(255, 230, 180) if i == 0 else
-                    QColor(200, 255, 200) if i == len(versions) - 1 else
-                    QColor(255, 255, 180)
-                )
-                for c in range(self.model.columnCount()):
-                    item = self.model.item(row, c)
-                    if item:
-                        item.setBackground(color)
-
-    # pas encore utilisée
-    def render_checked_state(self) -> None:
-        for row in range(self.model.rowCount()):
-            pkg_item = self.model.item(row, 1)
-            vcode_item = self.model.item(row, 2)
-            item = self.model.item(row, 5)
-            if not pkg_item or not vcode_item or not item:
-                continue
-            key = (pkg_item.text(), vcode_item.text())
-            state = self.checked_state.get(key, False)
-            item.setText("●" if state else "")
+        """Index (coordonnées de la vue) d'un package, invalide s'il est filtré."""
+        row = self.model.row_of((pkg, int(vcode)))
+        if row is None:
+            return QModelIndex()
+        return self.proxy.mapFromSource(self.model.index(row, 0))
+
 
+class ModelUpdateBus(QObject):
+    """
+    Regroupe les mises à jour émises par les workers (signaux success) et les applique
+    au plus toutes les UPDATE_BUS_INTERVAL_MS :
+    - handler(pkg, vcode) modifie PackageMap (et l'état coché)
+    - puis un seul passage ciblé sur le modèle pour les packages touchés (dataChanged,
+      insertions / suppressions, couleurs de version du groupe) et une seule sauvegarde
+    """
+
+    def __init__(self, pkg_map: pahd.PackageMap, table_adapter: PackageTableAdapter,
+                 interval_ms: int = UPDATE_BUS_INTERVAL_MS):
+        super().__init__()
+        self.pkg_map = pkg_map
+        self.table_adapter = table_adapter
+        self._pending: list[tuple[object, str, str]] = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def post(self, handler, pkg: str, vcode: str) -> None:
+        """Enfile un changement ; le premier d'une rafale arme le timer (débit plafonné)."""
+        self._pending.append((handler, pkg, vcode))
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Applique immédiatement les changements en attente (fin de worker, fermeture)."""
+        self._timer.stop()
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        packages = set()
+        for handler, pkg, vcode in pending:
+            handler(pkg, vcode)
+            packages.add(pkg)
+        self.table_adapter.refresh_packages(packages)
+        self.pkg_map.save()
+        logging.debug(f"Update bus : {len(pending)} changes applied to {len(packages)} packages")
@@ -0,0 +1,266 @@
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pah_adb as pahad
+
+SERIAL = "emu-1"
+
+
+# === Stand-in adb server : smart-socket framing, shell v2, sync, exec ===
+
+class FakeAdbHandler(socketserver.BaseRequestHandler):
+
+    def recv_exact(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client closed")
+            data += chunk
+        return data
+
+    def read_service(self) -> str:
+        return self.recv_exact(int(self.recv_exact(4), 16)).decode()
+
+    def okay(self, payload: bytes = None) -> None:
+        self.request.sendall(b"OKAY" + (b"%04x" % len(payload) + payload if payload is not None else b""))
+
+    def fail(self, message: str) -> None:
+        self.request.sendall(b"FAIL" + b"%04x" % len(message) + message.encode())
+
+    def handle(self):
+        try:
+            service = self.read_service()
+            if service == "host:devices":
+                return self.okay(f"{SERIAL}\tdevice\nother\toffline\n".encode())
+            if service == f"host-serial:{SERIAL}:features":
+                return self.okay(b"shell_v2,cmd")
+            if service != f"host:transport:{SERIAL}":
+                return self.fail(f"device '{service.rsplit(':', 1)[-1]}' not found")
+            self.okay()
+            service = self.read_service()
+            if service.startswith("shell,v2,raw:"):
+                self.okay()
+                self.shell_v2(service.split(":", 1)[1])
+            elif service == "exec:sh":
+                self.okay()
+                self.shell_session()
+            elif service.startswith("exec:upper "):
+                self.okay()
+                self.request.sendall(self.recv_exact(int(service.split()[1])).upper())
+            elif service == "sync:":
+                self.okay()
+                self.server.sync_sockets.append(self.request)
+                self.sync()
+            else:
+                self.fail(f"unknown service {service}")
+        except (ConnectionError, OSError):
+            pass
+
+    def shell_v2(self, command: str) -> None:
+        def packet(packet_id, data):
+            self.request.sendall(bytes([packet_id]) + struct.pack("<I", len(data)) + data)
+        if command.startswith("echo "):
+            packet(pahad.SHELL_STDOUT, command[5:].encode() + b"\n")
+            packet(pahad.SHELL_EXIT, b"\x00")
+        else:
+            packet(pahad.SHELL_STDERR, b"Error: Unknown option\n")
+            packet(pahad.SHELL_EXIT, b"\x03")
+
+    def shell_session(self) -> None:
+        buffer = b""
+        while True:
+            while b"\n" not in buffer:
+                buffer += self.request.recv(4096)
+            line, _, buffer = buffer.partition(b"\n")
+            command = line.decode().split(" 2>&1;")[0]
+            if command == "exit":
+                return
+            package = command.rsplit(" ", 1)[-1]
+            out = "Failure [DELETE_FAILED_INTERNAL_ERROR]" if package == "bad" else "Success"
+            # marker split over two writes, output over several lines
+            reply = f"line 1\r\n{out}\n{pahad.ShellSession.MARKER}\n".encode()
+            self.request.sendall(reply[:-5])
+            self.request.sendall(reply[-5:])
+
+    def sync(self) -> None:
+        files = self.server.files
+        while True:
+            header = self.recv_exact(8)
+            cmd, length = header[:4], struct.unpack("<I", header[4:])[0]
+            arg = self.recv_exact(length).decode()
+            if cmd == b"QUIT":
+                return
+            if cmd == b"STAT":
+                data = files.get(arg)
+                mode = 0o100644 if data is not None else 0
+                self.request.sendall(b"STAT" + struct.pack("<III", mode, len(data or b""), 0))
+            elif cmd == b"RECV":
+                if arg not in files:
+                    self.sync_fail("No such file or directory")
+                    return
+                data = files[arg]
+                for start in range(0, len(data), 1000):
+                    chunk = data[start:start + 1000]
+                    self.request.sendall(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                self.request.sendall(b"DONE" + struct.pack("<I", 0))
+            elif cmd == b"SEND":
+                path = arg.rsplit(",", 1)[0]
+                data = b""
+                while True:
+                    header = self.recv_exact(8)
+                    if header[:4] == b"DONE":
+                        break
+                    data += self.recv_exact(struct.unpack("<I", header[4:])[0])
+                if path.startswith("/ro/"):
+                    self.sync_fail("Read-only file system")
+                    return
+                files[path] = data
+                self.request.sendall(b"OKAY" + struct.pack("<I", 0))
+
+    def sync_fail(self, message: str) -> None:
+        self.request.sendall(b"FAIL" + struct.pack("<I", len(message)) + message.encode())
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeAdbHandler)
+        self.files = {}
+        self.sync_sockets = []
+
+    def drop_sync_connections(self) -> None:
+        """Device reconnected : the sockets of the pooled sync sessions are dead."""
+        for sock in self.sync_sockets:
+            sock.shutdown(socket.SHUT_RDWR)
+        self.sync_sockets.clear()
+
+
+@pytest.fixture
+def server():
+    srv = FakeAdbServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def client(server):
+    adb = pahad.AdbClient(SERIAL, port=server.server_address[1])
+    yield adb
+    adb.close()
+
+
+# === host services ===
+
+def test_devices(client):
+    assert client.devices() == [(SERIAL, "device"), ("other", "offline")]
+
+
+def test_features(client):
+    assert client.features() == {"shell_v2", "cmd"}
+
+
+def test_transport_fail(server):
+    adb = pahad.AdbClient("missing", port=server.server_address[1])
+    with pytest.raises(pahad.AdbError, match="not found"):
+        adb.open_service("shell:true")
+
+
+# === shell v2 / exec ===
+
+def test_shell_v2_success(client):
+    result = client.shell(["echo", "hello"])
+    assert (result.returncode, result.stdout, result.stderr) == (0, "hello\n", "")
+
+
+def test_shell_v2_exit_code(client):
+    result = client.shell("pm list packages --show-versioncode")
+    assert result.returncode == 3
+    assert result.stdout == ""
+    assert "Unknown option" in result.stderr
+
+
+def test_exec_stdin_streaming(client, tmp_path):
+    payload = b"abc" * 50_000  # several SYNC_CHUNK writes
+    src = tmp_path / "in.bin"
+    src.write_bytes(payload)
+    with open(src, "rb") as f:
+        assert client.exec_out(["upper", len(payload)], stdin=f) == payload.upper()
+
+
+# === sync ===
+
+def test_sync_push_stat_pull(client, server, tmp_path):
+    src = tmp_path / "app.apk"
+    src.write_bytes(b"x" * 150_000)
+    assert client.push(src, "/data/local/tmp/app.apk") == 150_000
+    assert server.files["/data/local/tmp/app.apk"] == src.read_bytes()
+
+    mode, size, _ = client.stat("/data/local/tmp/app.apk")
+    assert mode and size == 150_000
+    assert client.stat("/data/local/tmp/none")[0] == 0
+
+    dst = tmp_path / "back.apk"
+    assert client.pull("/data/local/tmp/app.apk", dst) == 150_000
+    assert dst.read_bytes() == src.read_bytes()
+    # one connection reused for all the sync requests
+    assert len(server.sync_sockets) == 1
+
+
+def test_sync_fail(client, server, tmp_path):
+    with pytest.raises(pahad.AdbError, match="No such file"):
+        client.pull("/sdcard/missing.apk", tmp_path / "missing.apk")
+    src = tmp_path / "app.apk"
+    src.write_bytes(b"data")
+    with pytest.raises(pahad.AdbError, match="Read-only"):
+        client.push(src, "/ro/app.apk")
+    # a failed session is not pooled
+    assert client._sync_pool == []
+
+
+def test_sync_retry_after_reconnect(client, server, tmp_path):
+    server.files["/sdcard/a.apk"] = b"a" * 5000
+    assert client.pull("/sdcard/a.apk", tmp_path / "a.apk") == 5000
+    server.drop_sync_connections()
+    src = tmp_path / "b.apk"
+    src.write_bytes(b"b" * 5000)
+    assert client.push(src, "/sdcard/b.apk") == 5000
+    assert server.files["/sdcard/b.apk"] == src.read_bytes()
+    dst = tmp_path / "a2.apk"
+    server.drop_sync_connections()
+    assert client.pull("/sdcard/a.apk", dst) == 5000
+    assert dst.read_bytes() == server.files["/sdcard/a.apk"]
+
+
+# === ShellSession (batched uninstall) ===
+
+def test_shell_session_markers(client):
+    with client.shell_session() as session:
+        assert session.run("pm uninstall com.a") == "line 1\nSuccess"
+        assert session.run("pm uninstall bad") == "line 1\nFailure [DELETE_FAILED_INTERNAL_ERROR]"
+
+
+def test_uninstall_many(client):
+    results = list(client.uninstall_many(["com.a", "bad", "com.b"]))
+    assert [(pkg, r.returncode) for pkg, r in results] == [("com.a", 0), ("bad", 1), ("com.b", 0)]
+
+
+def test_uninstall_many_stop(client):
+    done = []
+    for pkg, _ in client.uninstall_many(["com.a", "com.b", "com.c"], should_stop=lambda: len(done) >= 1):
+        done.append(pkg)
+    assert done == ["com.a"]
@@ -0,0 +1,99 @@
+import random
+import sys
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pah_search as pahse
+
+LABELS = {
+    "com.android.chrome": {"Chrome"},
+    "com.google.android.gm": {"Gmail"},
+    "com.google.android.youtube": {"YouTube"},
+    "com.google.android.apps.maps": {"Maps"},
+    "com.whatsapp": {"WhatsApp Messenger"},
+    "org.mozilla.firefox": {"Firefox Browser"},
+    "org.fdroid.fdroid": {"F-Droid"},
+    "com.foo_bar.app": {"Foo Bar"},
+    "de.danoeh.antennapod": {"AntennaPod", "AntennaPod Beta"},
+    "net.osmand.plus": set(),
+}
+
+TERMS = [
+    "google.android", "gle.andr", "oo_b", "com.google.", "com.google", "android", "andr",
+    "droid", "oid", "o", "gm", "g", "fire", "firefox browser", "messenger", "f-droid",
+    "antennapod beta", "pod", "osm", "and.plus", "plus", "whatsapp", "app", "apps.maps",
+    "s.m", "_", "e.a", "a.d", "ch", "hrom",
+]
+
+
+def old_filter(labels_by_pkg, term):
+    """Filtre d'avant l'index : sous-chaîne du nom ou du label, en minuscules."""
+    return {pkg for pkg, labels in labels_by_pkg.items()
+            if term in pkg.lower() or any(term in label.lower() for label in labels)}
+
+
+@pytest.fixture
+def index():
+    idx = pahse.SearchIndex()
+    idx.rebuild(LABELS)
+    return idx
+
+
+def search(index, text):
+    return set(index.search(pahse.parse_query(text)) or {})
+
+
+@pytest.mark.parametrize("term", [t for t in TERMS if " " not in t])
+def test_term_matches_old_substring_filter(index, term):
+    assert search(index, term) == old_filter(LABELS, term)
+
+
+def test_tokens_of_a_term_are_and_ed(index):
+    assert search(index, "google.android") == {
+        "com.google.android.gm", "com.google.android.youtube", "com.google.android.apps.maps"}
+    assert "com.android.chrome" not in search(index, "gle.andr")
+    assert search(index, "oo_b") == {"com.foo_bar.app"}
+
+
+def test_terms_are_and_ed(index):
+    assert search(index, "firefox browser") == {"org.mozilla.firefox"}
+    assert search(index, "google maps") == {"com.google.android.apps.maps"}
+
+
+def test_fuzzy_only_without_substring_match(index):
+    scores = index.search(pahse.parse_query("whtsap"))
+    assert set(scores) == {"com.whatsapp"}
+    assert all(score < pahse.SCORE_SUBSTRING for score in scores.values())
+
+
+def test_qualifiers_are_not_terms():
+    query = pahse.parse_query("chrome installed:yes local:no multi:maybe")
+    assert query.terms == ["chrome", "multi:maybe"]
+    assert query.qualifiers == {"installed": True, "local": False}
+
+
+def test_incremental_updates_match_rebuild():
+    random.seed(3)
+    words = ["alpha", "beta", "gamma", "delta", "omega", "zeta", "ab", "x"]
+    labels_by_pkg = {}
+    index = pahse.SearchIndex()
+    index.rebuild({})
+    for _ in range(300):
+        pkg = f"com.{random.choice(words)}.{random.choice(words)}"
+        if pkg in labels_by_pkg and random.random() < 0.4:
+            del labels_by_pkg[pkg]
+            index.update_package(pkg, None)
+        else:
+            labels_by_pkg[pkg] = {f"{random.choice(words).title()} {random.choice(words)}"}
+            index.update_package(pkg, labels_by_pkg[pkg])
+    rebuilt = pahse.SearchIndex()
+    rebuilt.rebuild(labels_by_pkg)
+    for term in ["a", "ab", "lph", "ta", "com.beta", "a.x", "eta ome", "x"]:
+        expected = {t: old_filter(labels_by_pkg, t) for t in term.split()}
+        assert search(index, term) == search(rebuilt, term)
+        if all(expected.values()):
+            assert search(index, term) == set.intersection(*expected.values())